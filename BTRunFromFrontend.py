@@ -1,6 +1,8 @@
 ############################################################################## importing libraries
-from flask import Flask, request
+from flask import Flask, Response, request, send_file
 from datetime import datetime
+from functools import partial
+from BacktestJobs import BacktestJobs
 from Util import Util
 import pandas as pd
 import traceback
@@ -14,7 +16,7 @@ STRATEGYWISE_RESULTS = True # if True, strategy wise transaction and result shee
 
 app = Flask(__name__)
 
-def getBtOutputJson(btParaToTest: dict) -> dict:
+def getBtOutputJson(btParaToTest: dict, onEvent=None, layout: str = "") -> dict:
     
     folderPath = "Trades"
     os.makedirs(folderPath, exist_ok=True)
@@ -23,17 +25,26 @@ def getBtOutputJson(btParaToTest: dict) -> dict:
 
     btResultFileExcel = os.path.join(folderPath, f"FRONTEND {datetimealias}.xlsx")
     btResultFileJson = os.path.join(folderPath, f"FRONTEND {datetimealias}.json")
+    resultId = f"FRONTEND {datetimealias}"
 
     try:
 
         btParaToTest = Util.convertFrontendJsonToBtRequiredJson(inputJson=btParaToTest)
 
+        layout = Util.getOutputJsonLayout(layout=layout)
+        resultKey = Util.getResultCacheKey(payload=[btParaToTest, layout])
+        cachedResult = Util.getCachedResult(resultKey=resultKey)
+        if cachedResult is not None:
+            return cachedResult
+
         Util.runNeccesaryFunctionsBeforeStartingBT()
 
         with open("frontendbtpara.json", "+w") as ff:
             ff.write(json.dumps(btParaToTest, indent=4))
         
         btResp = Util.getBacktestResults(btPara=btParaToTest)
+        if onEvent:
+            onEvent("engine responded", {"orders": len(btResp['strategies']['orders']) if btResp else 0})
         if (len(btResp) == 0) or (len(btResp['strategies']['orders']) == 0):
             return {"status": "error", "version": config.VERSION_NO['FRONTEND'], "message": "no trade generated on given parameters."}
 
@@ -41,100 +52,41 @@ def getBtOutputJson(btParaToTest: dict) -> dict:
         if parsedOrderDf.empty:
             return {"status": "error", "version": config.VERSION_NO['FRONTEND'], "message": "no trade generated on given parameters."}
 
-        portfolioPnLDf, finalStatsDf = pd.DataFrame(), pd.DataFrame()
-        stgywiseTransactionDf, stgyDayWiseStats, stgyMonthWiseStats, stgyMarginPercentageWiseStats = {"portfolio": pd.DataFrame()}, {}, {}, {}
+        if onEvent:
+            onEvent("orders parsed", {"orders": len(parsedOrderDf)})
 
         parsedOrderDf = parsedOrderDf.sort_values(by=['entry_datetime'])
         parsedOrderDf = parsedOrderDf.reset_index(drop=True)
 
-        for strategyName in sorted(parsedOrderDf['strategy'].unique()):
-
-            strategyOrderDf = parsedOrderDf[parsedOrderDf['strategy'] == strategyName]
-
-            stgyPnL = strategyOrderDf[['entry_datetime', 'netPnlAfterExpenses']].copy()
-            stgyPnL['entry_datetime'] = stgyPnL['entry_datetime'].dt.date
-            stgyPnL = stgyPnL.groupby(by=['entry_datetime'], as_index=False).sum()
-            stgyPnL = stgyPnL.rename(columns={"entry_datetime": "entryDate", 'netPnlAfterExpenses': "bookedPnL"})
-
-            portfolioPnLDf = pd.concat([stgyPnL, portfolioPnLDf])
-            portfolioPnLDf = portfolioPnLDf.reset_index(drop=True)
-
-            statsdf = Util.getBacktestStats(tradesDf=stgyPnL, initialCapital=marginReqByEachStgy.get(strategyName, 0))
-            statsdf = pd.DataFrame.from_dict(statsdf, orient="index").reset_index().rename(columns={"index": "Particulars", 0: strategyName})
-
-            if finalStatsDf.empty:
-                finalStatsDf = statsdf.copy()
-            else:
-                finalStatsDf = pd.merge(left=finalStatsDf, right=statsdf, left_on="Particulars", right_on="Particulars")
-            
-            stgywiseTransactionDf[strategyName] = strategyOrderDf.copy()
-            
-            oldTrans = stgywiseTransactionDf['portfolio'].copy()
-            oldTrans = pd.concat([oldTrans, strategyOrderDf])
-            oldTrans = oldTrans.reset_index(drop=True)
-
-            stgywiseTransactionDf['portfolio'] = oldTrans.copy()
-
-            if STRATEGYWISE_RESULTS:
-                stgyDayWiseStats[strategyName] = Util.getDayWiseStats(tradesDf=stgyPnL)
-                stgyMonthWiseStats[strategyName] = Util.getMonthWiseStats(tradesDf=stgyPnL)
-
-                marginn = marginReqByEachStgy.get(strategyName, 0)
-
-                marginWiseDf = stgyPnL[["entryDate", "bookedPnL"]]
-                if marginn != 0:
-                    marginWiseDf['bookedPnL'] = marginWiseDf['bookedPnL'] / marginn
-                    marginWiseDf['bookedPnL'] *= 100
-                else:
-                    marginWiseDf['bookedPnL'] = 0
+        # streamed runs get each strategy event as soon as that strategy's stats and tables are ready
+        strategyWiseResults = Util.getStrategyWiseResults(
+            parsedOrderDf=parsedOrderDf, marginReqByEachStgy=marginReqByEachStgy, strategyWiseTables=STRATEGYWISE_RESULTS, 
+            onResult=(lambda **streamEventArgs: onEvent("strategy", Util.getStrategyStreamEvent(**streamEventArgs))) if onEvent else None
+        )
 
-                stgyMarginPercentageWiseStats[strategyName] = Util.getMonthWiseStats(tradesDf=marginWiseDf)
-
-        ############################################################################################################################################ for portfolio stats
-        if not portfolioPnLDf.empty:
-
-            portfolioPnLDf = portfolioPnLDf.groupby(by=['entryDate'], as_index=False).sum()
-
-            statsdf = Util.getBacktestStats(tradesDf=portfolioPnLDf, initialCapital=sum(list(marginReqByEachStgy.values())))
-            statsdf = pd.DataFrame.from_dict(statsdf, orient="index").reset_index().rename(columns={"index": "Particulars", 0: "Combined"})
-
-            portfolioPl = stgywiseTransactionDf['portfolio'][['entry_datetime', 'netPnlAfterExpenses']].copy()
-            portfolioPl['entry_datetime'] = portfolioPl['entry_datetime'].dt.date
-            portfolioPl = portfolioPl.groupby(by=['entry_datetime'], as_index=False).sum()
-            portfolioPl = portfolioPl.rename(columns={"entry_datetime": "entryDate", 'netPnlAfterExpenses': "bookedPnL"})
-
-            stgyDayWiseStats['portfolio'] = Util.getDayWiseStats(tradesDf=portfolioPl)
-            stgyMonthWiseStats['portfolio'] = Util.getMonthWiseStats(tradesDf=portfolioPl)
-
-            marginn = sum(list(marginReqByEachStgy.values()))
-            marginWiseDf = portfolioPl[["entryDate", "bookedPnL"]]
-            if marginn != 0:
-                marginWiseDf['bookedPnL'] = marginWiseDf['bookedPnL'] / marginn
-                marginWiseDf['bookedPnL'] *= 100
-            else:
-                marginWiseDf['bookedPnL'] = 0
-
-            stgyMarginPercentageWiseStats['portfolio'] = Util.getMonthWiseStats(tradesDf=marginWiseDf)
+        finalStatsDf, stgywiseTransactionDf = strategyWiseResults['statsDf'], strategyWiseResults['transactions']
+        stgyDayWiseStats, stgyMonthWiseStats, stgyMarginPercentageWiseStats = strategyWiseResults['dayWise'], strategyWiseResults['monthWise'], strategyWiseResults['marginPercentWise']
+        if onEvent:
+            onEvent("stats computed", {"strategies": len(stgywiseTransactionDf)-1})
 
         if not finalStatsDf.empty:
-
-            finalStatsDf = pd.merge(left=statsdf, right=finalStatsDf, left_on="Particulars", right_on="Particulars")
             
-            Util.prepareOutputJson(
-                btResultFile=btResultFileJson, btStatsTableData=finalStatsDf, stgywiseTransactionDf=stgywiseTransactionDf, stgyDayWiseStats=stgyDayWiseStats, 
-                stgyMonthWiseStats=stgyMonthWiseStats, stgyMarginPercentageWiseStats=stgyMarginPercentageWiseStats
+            outputJson = Util.getOutputJson(
+                btStatsTableData=finalStatsDf, stgywiseTransactionDf=stgywiseTransactionDf, stgyDayWiseStats=stgyDayWiseStats, 
+                stgyMonthWiseStats=stgyMonthWiseStats, stgyMarginPercentageWiseStats=stgyMarginPercentageWiseStats, layout=layout
             )
+            Util.persistOutputJson(btResultFile=btResultFileJson, outputJson=outputJson)
+            Util.storeResultTransactions(resultId=resultId, transactions=outputJson['transactions'])
         
-            Util.prepareOutputFile(
+            excelExport = Util.prepareOutputExport(
                 btResultFile=btResultFileExcel, btStatsTableData=finalStatsDf, stgywiseTransactionDf=stgywiseTransactionDf, stgyDayWiseStats=stgyDayWiseStats, 
                 stgyMonthWiseStats=stgyMonthWiseStats, stgyMarginPercentageWiseStats=stgyMarginPercentageWiseStats, onlyStgyResults=STRATEGYWISE_RESULTS, 
-                excelFileExists=False, dailyMaxProfitLossDf=maxProfitLossDf
+                dailyMaxProfitLossDf=maxProfitLossDf
             )
         
-        if os.path.exists(btResultFileJson):
-            with open(btResultFileJson, "+r") as f:
-                dta = json.loads(f.read())
-            return {"status": "success", "version": config.VERSION_NO['FRONTEND'], "data": dta}
+            btResult = {"status": "success", "version": config.VERSION_NO['FRONTEND'], "data": outputJson, "resultId": resultId}
+            Util.storeCachedResult(resultKey=resultKey, response=btResult, excelFile=excelExport)
+            return btResult
     
     except Exception as errormsg:
         logging.error(traceback.format_exc())
@@ -179,7 +131,7 @@ def run_standard_backtest():
         }
 
         # Run backtest with combined parameters
-        return getBtOutputJson(btParaToTest=combined_params)
+        return Response(Util.toJsonBytes(getBtOutputJson(btParaToTest=combined_params)), mimetype="application/json")
 
     except Exception as e:
         logging.error(f"Error in run_standard_backtest: {str(e)}")
@@ -257,8 +209,98 @@ def backtest():
     if reqpara is None:
         return {"status": "error", "version": config.VERSION_NO['FRONTEND'], "message": "backtest parameters missing"}
     else:
-        return getBtOutputJson(btParaToTest=reqpara)
+        btResult = getBtOutputJson(btParaToTest=reqpara, layout=request.json.get("layout", ""))
+        if Util.isPagedResponse(transactions=request.json.get("transactions", "")):
+            btResult = Util.getResponseWithoutTransactions(btResult=btResult)
+        return Response(Util.toJsonBytes(btResult), mimetype="application/json")
+
+@app.route("/backtest/stream", methods=['POST'])
+def streamBacktest():
+
+    reqpara = request.json.get("parameters")
+    if reqpara is None:
+        return {"status": "error", "version": config.VERSION_NO['FRONTEND'], "message": "backtest parameters missing"}
+    
+    return Response(
+        BacktestJobs.streamRun(runFunc=partial(getBtOutputJson, layout=request.json.get("layout", "")), btParaToTest=reqpara), mimetype="text/event-stream", 
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route("/backtest/jobs", methods=['POST'])
+def submitBacktestJob():
+
+    reqpara = request.json.get("parameters")
+    if reqpara is None:
+        return {"status": "error", "version": config.VERSION_NO['FRONTEND'], "message": "backtest parameters missing"}
+    
+    jobId = BacktestJobs.submit(jobType="FRONTEND", runFunc=partial(getBtOutputJson, layout=request.json.get("layout", "")), btParaToTest=reqpara)
+    return {"status": "success", "version": config.VERSION_NO['FRONTEND'], "data": {"jobId": jobId}}
+
+@app.route("/backtest/jobs/<jobId>", methods=['GET'])
+def getBacktestJobStatus(jobId: str):
+
+    jobStatus = BacktestJobs.getJobStatus(jobId=jobId)
+    if jobStatus is None:
+        return {"status": "error", "version": config.VERSION_NO['FRONTEND'], "message": f"unknown job id {jobId}"}, 404
+    
+    return {"status": "success", "version": config.VERSION_NO['FRONTEND'], "data": jobStatus}
+
+@app.route("/backtest/jobs/<jobId>/result", methods=['GET'])
+def getBacktestJobResult(jobId: str):
+
+    job = BacktestJobs.getJob(jobId=jobId)
+    if job is None:
+        return {"status": "error", "version": config.VERSION_NO['FRONTEND'], "message": f"unknown job id {jobId}"}, 404
+    
+    if job['result'] is None:
+        return {"status": "pending", "version": config.VERSION_NO['FRONTEND'], "message": f"job is {job['status']}", "data": {"progress": job['progress']}}, 202
+    
+    btResult = job['result']
+    if Util.isPagedResponse(transactions=request.args.get("transactions", "")):
+        btResult = Util.getResponseWithoutTransactions(btResult=btResult)
+    return Response(Util.toJsonBytes(btResult), mimetype="application/json")
+
+@app.route("/backtest/results/<resultId>/transactions", methods=['GET'])
+def getBacktestTransactions(resultId: str):
+    """
+    Page of the transactions of a backtest by the resultId of its response. Query parameters: page, pageSize, strategy, legId, symbol, side, 
+    instrumentType, reason, fromDate/toDate (yymmdd entry dates), sortBy (transaction column), order (asc/desc), layout (records/columns). 
+    202 while the transactions are still being stored, the client retries as with job results.
+    """
+
+    try:
+        transactions = Util.getResultTransactions(
+            resultId=resultId, filters=request.args.to_dict(), fromDate=request.args.get("fromDate", ""), toDate=request.args.get("toDate", ""), 
+            page=int(request.args.get("page", 1)), pageSize=int(request.args.get("pageSize", 500)), sortBy=request.args.get("sortBy", ""), 
+            descending=request.args.get("order", "asc").lower() == "desc", layout=Util.getOutputJsonLayout(layout=request.args.get("layout", ""))
+        )
+    except RuntimeError as errormsg:
+        return {"status": "error", "version": config.VERSION_NO['FRONTEND'], "message": str(errormsg)}, 500
+    except ValueError as errormsg:
+        return {"status": "error", "version": config.VERSION_NO['FRONTEND'], "message": str(errormsg)}, 400
+
+    if transactions is None:
+        return {"status": "error", "version": config.VERSION_NO['FRONTEND'], "message": f"unknown result id {resultId}"}, 404
+    
+    if transactions.get("pending"):
+        return {"status": "pending", "version": config.VERSION_NO['FRONTEND'], "message": "transactions are still being stored"}, 202
+
+    return Response(Util.toJsonBytes({"status": "success", "version": config.VERSION_NO['FRONTEND'], "data": transactions}), mimetype="application/json")
+
+@app.route("/backtest/results/<resultId>/excel", methods=['GET'])
+def downloadBacktestExcel(resultId: str):
+    """Result workbook of a backtest by the resultId of its response, written on the first download when EXCEL_EXPORT is lazy"""
+
+    if (os.path.basename(resultId) != resultId) or (not resultId.startswith("FRONTEND ")):
+        return {"status": "error", "version": config.VERSION_NO['FRONTEND'], "message": f"unknown result id {resultId}"}, 404
+
+    btResultFileExcel = Util.renderOutputFile(btResultFile=os.path.join("Trades", f"{resultId}.xlsx"))
+    if btResultFileExcel is None:
+        return {"status": "error", "version": config.VERSION_NO['FRONTEND'], "message": f"unknown result id {resultId}"}, 404
+    
+    return send_file(os.path.abspath(btResultFileExcel), as_attachment=True, download_name=f"{resultId}.xlsx")
 
 
 if __name__ == "__main__":
+    Util.startWorkerServices()
     app.run(host="localhost", port=8009)
\ No newline at end of file
@@ -1,6 +1,8 @@
 ############################################################################## importing libraries
-from flask import Flask, request
+from flask import Flask, Response, request, send_file
 from datetime import datetime
+from functools import partial
+from BacktestJobs import BacktestJobs
 from Util import Util
 import pandas as pd
 import traceback
@@ -14,7 +16,7 @@ STRATEGYWISE_RESULTS = True # if True, strategy wise transaction and result shee
 
 app = Flask(__name__)
 
-def getBtOutputJson(btParaToTest: dict) -> dict:
+def getBtOutputJson(btParaToTest: dict, onEvent=None, layout: str = "") -> dict:
     
     folderPath = "Trades"
     os.makedirs(folderPath, exist_ok=True)
@@ -23,6 +25,7 @@ def getBtOutputJson(btParaToTest: dict) -> dict:
 
     btResultFileExcel = os.path.join(folderPath, f"FRONTENDTV {datetimealias}.xlsx")
     btResultFileJson = os.path.join(folderPath, f"FRONTENDTV {datetimealias}.json")
+    resultId = f"FRONTENDTV {datetimealias}"
 
     try:
 
@@ -62,14 +65,19 @@ def getBtOutputJson(btParaToTest: dict) -> dict:
         
         tvSignalDict = Util.getTVIntraSignals(
             rolloverIndex=list(__indexRunning)[0] if mainparadict['DoRollover'] else "",  uPara=mainparadict, 
-            signalDf=Util.getTVSignalsInDf(signalfilepath="", signals=btParaToTest['tvsignals'])
+            signalDf=Util.getTVSignalsInDf(signalfilepath="", signals=btParaToTest['tvsignals'], uPara=mainparadict)
         )
         if len(tvSignalDict) == 0:
             return {"status": "error", "version": config.VERSION_NO['FRONTENDTV'], "message": "no tv signal found"}
+        
+        if onEvent:
+            onEvent("signals parsed", {__signalType: len(tvSignalDict[__signalType]) for __signalType in tvSignalDict})
 
         transactionDict = {}
         dailyMaxProfitLossDict = {"strategy_profits": {}, "strategy_losses": {}}
 
+        tvBtJobs, tvBtResultKeys = [], []
+
         for __signalType in tvSignalDict:
             for __signal in tvSignalDict[__signalType]:
 
@@ -81,40 +89,42 @@ def getBtOutputJson(btParaToTest: dict) -> dict:
                 }
 
                 for __pNo in portfolioForBt:
+                    tvBtJobs.append((__signalType, __pNo, portfolioForBt[__pNo], __signal.get('tradeno', '')))
+                    tvBtResultKeys.append(Util.getTVSignalResultKey(btPara=portfolioForBt[__pNo]))
+
+        layout = Util.getOutputJsonLayout(layout=layout)
+        resultKey = Util.getResultCacheKey(payload=[mainparadict, [__btPara for __, __, __btPara, __ in tvBtJobs], layout])
+        cachedResult = Util.getCachedResult(resultKey=resultKey)
+        if cachedResult is not None:
+            return cachedResult
+
+        # responses come back in signal order, so merging below stays deterministic irrespective of completion order
+        def onSignalResult(__pos: int, __btResp: dict) -> None:
+            if __btResp and (len(__btResp['strategies']['orders']) != 0):
+                onEvent("orders", Util.getOrdersStreamEvent(signalType=tvBtJobs[__pos][0], tradeNo=tvBtJobs[__pos][3], btResp=__btResp))
+
+        tvBtResponses = Util.getBacktestResultsStored(
+            btParas=[__btPara for __, __, __btPara, __ in tvBtJobs], signalKeys=[__signalKey for __, __, __, __signalKey in tvBtJobs], resultKeys=tvBtResultKeys, 
+            batchSize=Util.getTVSignalSettings()['batchSize'], onResult=onSignalResult if onEvent else None
+        )
 
-                    __btResp = Util.getBacktestResults(btPara=portfolioForBt[__pNo])
-                    if (not __btResp) or (not __btResp['strategies']['orders']):
-                        continue
+        if onEvent:
+            onEvent("signals dispatched", {"signals": len(tvBtJobs), "responses": sum(1 for __btResp in tvBtResponses if __btResp)})
 
-                    if __signalType not in transactionDict:
-                        transactionDict[__signalType] = {}
+        for (__signalType, __pNo, __, __), __btResp in zip(tvBtJobs, tvBtResponses):
 
-                    if __pNo not in transactionDict[__signalType]:
-                        transactionDict[__signalType][__pNo] = []
-                    
-                    transactionDict[__signalType][__pNo] += __btResp['strategies']['orders']
-
-                    for __tradingdate in __btResp['strategies']['strategy_profits']:
-                        
-                        if __tradingdate not in dailyMaxProfitLossDict['strategy_profits']:
-                            dailyMaxProfitLossDict['strategy_profits'][__tradingdate] = {}
-                        
-                        if __tradingdate not in dailyMaxProfitLossDict['strategy_losses']:
-                            dailyMaxProfitLossDict['strategy_losses'][__tradingdate] = {}
-
-                        for __tradingtime in __btResp['strategies']['strategy_profits'][__tradingdate]:
-
-                            if __tradingtime not in dailyMaxProfitLossDict['strategy_profits'][__tradingdate]:
-                                dailyMaxProfitLossDict['strategy_profits'][__tradingdate][__tradingtime] = __btResp['strategies']['strategy_profits'][__tradingdate][__tradingtime]
-                            else:
-                                dailyMaxProfitLossDict['strategy_profits'][__tradingdate][__tradingtime] += __btResp['strategies']['strategy_profits'][__tradingdate][__tradingtime]
-                            
-                        for __tradingtime in __btResp['strategies']['strategy_losses'][__tradingdate]:
-                            
-                            if __tradingtime not in dailyMaxProfitLossDict['strategy_losses'][__tradingdate]:
-                                dailyMaxProfitLossDict['strategy_losses'][__tradingdate][__tradingtime] = __btResp['strategies']['strategy_losses'][__tradingdate][__tradingtime]
-                            else:
-                                dailyMaxProfitLossDict['strategy_losses'][__tradingdate][__tradingtime] += __btResp['strategies']['strategy_losses'][__tradingdate][__tradingtime]
+            if (not __btResp) or (len(__btResp['strategies']['orders']) == 0):
+                continue
+
+            if __signalType not in transactionDict:
+                transactionDict[__signalType] = {}
+
+            if __pNo not in transactionDict[__signalType]:
+                transactionDict[__signalType][__pNo] = []
+            
+            transactionDict[__signalType][__pNo].append(__btResp['strategies']['orders'])
+
+            Util.mergeTickPnlDict(mergeInto=dailyMaxProfitLossDict, toMerge=__btResp['strategies'])
 
         portfolioPnLDf, finalStatsDf = pd.DataFrame(), pd.DataFrame()
         stgywiseTransactionDf, stgyDayWiseStats, stgyMonthWiseStats, stgyMarginPercentageWiseStats, marginReqByEachStgy = {"portfolio": pd.DataFrame()}, {}, {}, {}, {}
@@ -123,13 +133,15 @@ def getBtOutputJson(btParaToTest: dict) -> dict:
             for __pNoo in transactionDict[__signalType]:
                 
                 parsedOrderDf, stgyMarginn, __ = Util.parseBacktestingResponse(
-                    btResponse={"orders": transactionDict[__signalType][__pNoo], "strategy_profits": {}, "strategy_losses": {}}, 
+                    btResponse={"orders": Util.concatOrders(ordersChunks=transactionDict[__signalType][__pNoo]), "strategy_profits": {}, "strategy_losses": {}}, 
                     slippagePercent=portfolioForBt[__pNoo]['slippage_percent']
                 )
                 if parsedOrderDf.empty:
                     continue
 
                 marginReqByEachStgy.update(stgyMarginn)
+                if onEvent:
+                    onEvent("orders parsed", {"signalType": __signalType, "orders": len(parsedOrderDf)})
 
                 parsedOrderDf = parsedOrderDf.sort_values(by=['entry_datetime'])
                 parsedOrderDf = parsedOrderDf.reset_index(drop=True)
@@ -177,6 +189,12 @@ def getBtOutputJson(btParaToTest: dict) -> dict:
 
                         stgyMarginPercentageWiseStats[strategyName] = Util.getMonthWiseStats(tradesDf=marginWiseDf)
 
+                    if onEvent:
+                        onEvent("strategy", Util.getStrategyStreamEvent(
+                            strategyName=strategyName, statsDf=statsdf, dayWiseDf=stgyDayWiseStats.get(strategyName, pd.DataFrame()), 
+                            monthWiseDf=stgyMonthWiseStats.get(strategyName, pd.DataFrame()), marginPercentWiseDf=stgyMarginPercentageWiseStats.get(strategyName, pd.DataFrame())
+                        ))
+
         ############################################################################################################################################ for portfolio stats
         if not portfolioPnLDf.empty:
 
@@ -203,27 +221,36 @@ def getBtOutputJson(btParaToTest: dict) -> dict:
 
             stgyMarginPercentageWiseStats['portfolio'] = Util.getMonthWiseStats(tradesDf=marginWiseDf)
 
+            if onEvent:
+                onEvent("strategy", Util.getStrategyStreamEvent(
+                    strategyName="portfolio", statsDf=statsdf, dayWiseDf=stgyDayWiseStats['portfolio'], monthWiseDf=stgyMonthWiseStats['portfolio'], 
+                    marginPercentWiseDf=stgyMarginPercentageWiseStats['portfolio'], statsColumn="Combined"
+                ))
+
+        if onEvent:
+            onEvent("stats computed", {"strategies": len(stgywiseTransactionDf)-1})
+
         if not finalStatsDf.empty:
             finalStatsDf = pd.merge(left=statsdf, right=finalStatsDf, left_on="Particulars", right_on="Particulars")
                     
             dailyMaxProfitLossDf = Util.convertTickPnlDictToDaywiseDf(toConvert=dailyMaxProfitLossDict)
 
-            Util.prepareOutputJson(
-                btResultFile=btResultFileJson, btStatsTableData=finalStatsDf, stgywiseTransactionDf=stgywiseTransactionDf, stgyDayWiseStats=stgyDayWiseStats, 
-                stgyMonthWiseStats=stgyMonthWiseStats, stgyMarginPercentageWiseStats=stgyMarginPercentageWiseStats
+            outputJson = Util.getOutputJson(
+                btStatsTableData=finalStatsDf, stgywiseTransactionDf=stgywiseTransactionDf, stgyDayWiseStats=stgyDayWiseStats, 
+                stgyMonthWiseStats=stgyMonthWiseStats, stgyMarginPercentageWiseStats=stgyMarginPercentageWiseStats, layout=layout
             )
+            Util.persistOutputJson(btResultFile=btResultFileJson, outputJson=outputJson)
+            Util.storeResultTransactions(resultId=resultId, transactions=outputJson['transactions'])
             
-            Util.prepareOutputFile(
+            excelExport = Util.prepareOutputExport(
                 btResultFile=btResultFileExcel, btStatsTableData=finalStatsDf, stgywiseTransactionDf=stgywiseTransactionDf, stgyDayWiseStats=stgyDayWiseStats, 
                 stgyMonthWiseStats=stgyMonthWiseStats, stgyMarginPercentageWiseStats=stgyMarginPercentageWiseStats, onlyStgyResults=STRATEGYWISE_RESULTS, 
-                excelFileExists=False, dailyMaxProfitLossDf=dailyMaxProfitLossDf
+                dailyMaxProfitLossDf=dailyMaxProfitLossDf
             )
 
-            if os.path.exists(btResultFileJson):
-                with open(btResultFileJson, "+r") as f:
-                    dta = json.loads(f.read())
-
-                return {"status": "success", "version": config.VERSION_NO['FRONTENDTV'], "data": dta}
+            btResult = {"status": "success", "version": config.VERSION_NO['FRONTENDTV'], "data": outputJson, "resultId": resultId}
+            Util.storeCachedResult(resultKey=resultKey, response=btResult, excelFile=excelExport)
+            return btResult
     
     except Exception as errormsg:
         logging.error(traceback.format_exc())
@@ -279,7 +306,7 @@ def run_tradingview_backtest():
         }
 
         # Run backtest with combined parameters
-        return getBtOutputJson(btParaToTest=combined_params)
+        return Response(Util.toJsonBytes(getBtOutputJson(btParaToTest=combined_params)), mimetype="application/json")
 
     except Exception as e:
         logging.error(f"Error in run_tradingview_backtest: {str(e)}")
@@ -355,7 +382,98 @@ def backtest():
     if reqpara is None:
         return {"status": "error", "version": config.VERSION_NO['FRONTENDTV'], "message": "backtest parameters missing"}
     else:
-        return getBtOutputJson(btParaToTest=reqpara)
+        btResult = getBtOutputJson(btParaToTest=reqpara, layout=request.json.get("layout", ""))
+        if Util.isPagedResponse(transactions=request.json.get("transactions", "")):
+            btResult = Util.getResponseWithoutTransactions(btResult=btResult)
+        return Response(Util.toJsonBytes(btResult), mimetype="application/json")
+
+@app.route("/backtest/stream", methods=['POST'])
+def streamBacktest():
+
+    reqpara = request.json.get("parameters")
+    if reqpara is None:
+        return {"status": "error", "version": config.VERSION_NO['FRONTENDTV'], "message": "backtest parameters missing"}
+    
+    return Response(
+        BacktestJobs.streamRun(runFunc=partial(getBtOutputJson, layout=request.json.get("layout", "")), btParaToTest=reqpara), mimetype="text/event-stream", 
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route("/backtest/jobs", methods=['POST'])
+def submitBacktestJob():
+
+    reqpara = request.json.get("parameters")
+    if reqpara is None:
+        return {"status": "error", "version": config.VERSION_NO['FRONTENDTV'], "message": "backtest parameters missing"}
+    
+    jobId = BacktestJobs.submit(jobType="FRONTENDTV", runFunc=partial(getBtOutputJson, layout=request.json.get("layout", "")), btParaToTest=reqpara)
+    return {"status": "success", "version": config.VERSION_NO['FRONTENDTV'], "data": {"jobId": jobId}}
+
+@app.route("/backtest/jobs/<jobId>", methods=['GET'])
+def getBacktestJobStatus(jobId: str):
+
+    jobStatus = BacktestJobs.getJobStatus(jobId=jobId)
+    if jobStatus is None:
+        return {"status": "error", "version": config.VERSION_NO['FRONTENDTV'], "message": f"unknown job id {jobId}"}, 404
+    
+    return {"status": "success", "version": config.VERSION_NO['FRONTENDTV'], "data": jobStatus}
+
+@app.route("/backtest/jobs/<jobId>/result", methods=['GET'])
+def getBacktestJobResult(jobId: str):
+
+    job = BacktestJobs.getJob(jobId=jobId)
+    if job is None:
+        return {"status": "error", "version": config.VERSION_NO['FRONTENDTV'], "message": f"unknown job id {jobId}"}, 404
+    
+    if job['result'] is None:
+        return {"status": "pending", "version": config.VERSION_NO['FRONTENDTV'], "message": f"job is {job['status']}", "data": {"progress": job['progress']}}, 202
+    
+    btResult = job['result']
+    if Util.isPagedResponse(transactions=request.args.get("transactions", "")):
+        btResult = Util.getResponseWithoutTransactions(btResult=btResult)
+    return Response(Util.toJsonBytes(btResult), mimetype="application/json")
+
+@app.route("/backtest/results/<resultId>/transactions", methods=['GET'])
+def getBacktestTransactions(resultId: str):
+    """
+    Page of the transactions of a backtest by the resultId of its response. Query parameters: page, pageSize, strategy, legId, symbol, side, 
+    instrumentType, reason, fromDate/toDate (yymmdd entry dates), sortBy (transaction column), order (asc/desc), layout (records/columns). 
+    202 while the transactions are still being stored, the client retries as with job results.
+    """
+
+    try:
+        transactions = Util.getResultTransactions(
+            resultId=resultId, filters=request.args.to_dict(), fromDate=request.args.get("fromDate", ""), toDate=request.args.get("toDate", ""), 
+            page=int(request.args.get("page", 1)), pageSize=int(request.args.get("pageSize", 500)), sortBy=request.args.get("sortBy", ""), 
+            descending=request.args.get("order", "asc").lower() == "desc", layout=Util.getOutputJsonLayout(layout=request.args.get("layout", ""))
+        )
+    except RuntimeError as errormsg:
+        return {"status": "error", "version": config.VERSION_NO['FRONTENDTV'], "message": str(errormsg)}, 500
+    except ValueError as errormsg:
+        return {"status": "error", "version": config.VERSION_NO['FRONTENDTV'], "message": str(errormsg)}, 400
+
+    if transactions is None:
+        return {"status": "error", "version": config.VERSION_NO['FRONTENDTV'], "message": f"unknown result id {resultId}"}, 404
+    
+    if transactions.get("pending"):
+        return {"status": "pending", "version": config.VERSION_NO['FRONTENDTV'], "message": "transactions are still being stored"}, 202
+
+    return Response(Util.toJsonBytes({"status": "success", "version": config.VERSION_NO['FRONTENDTV'], "data": transactions}), mimetype="application/json")
+
+@app.route("/backtest/results/<resultId>/excel", methods=['GET'])
+def downloadBacktestExcel(resultId: str):
+    """Result workbook of a backtest by the resultId of its response, written on the first download when EXCEL_EXPORT is lazy"""
+
+    if (os.path.basename(resultId) != resultId) or (not resultId.startswith("FRONTENDTV ")):
+        return {"status": "error", "version": config.VERSION_NO['FRONTENDTV'], "message": f"unknown result id {resultId}"}, 404
+
+    btResultFileExcel = Util.renderOutputFile(btResultFile=os.path.join("Trades", f"{resultId}.xlsx"))
+    if btResultFileExcel is None:
+        return {"status": "error", "version": config.VERSION_NO['FRONTENDTV'], "message": f"unknown result id {resultId}"}, 404
+    
+    return send_file(os.path.abspath(btResultFileExcel), as_attachment=True, download_name=f"{resultId}.xlsx")
+
 
 if __name__ == "__main__":
+    Util.startWorkerServices()
     app.run(host="localhost", port=8011)
@@ -0,0 +1,309 @@
+############################################################################## importing libraries
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional
+import numpy as np
+import simplejson
+import traceback
+import threading
+import logging
+import sqlite3
+import socket
+import config
+import queue
+import json
+import uuid
+import os
+
+class BacktestJobs:
+    """
+    In-process backtest job queue: submit returns a job id straight away, a thread pool runs the backtest function and status,
+    progress and result are fetched by id. With JOB_STORE_PATH set, jobs are also kept in SQLite so that any worker process
+    serving the same folder can answer status/result requests and results survive a restart. Stored jobs carry the process 
+    that runs them, so unfinished jobs are only failed once that process is gone.
+    """
+
+    JOBS = {}
+    JOBS_LOCK = threading.Lock()
+    EXECUTOR = None
+    STORE_PATH = None
+    STORE_LOCK = threading.Lock()
+    MAX_FINISHED_JOBS = 200 # finished jobs kept in memory, older ones are only available from SQLite
+    DATA_EVENTS = {"strategy", "orders"} # partial results, jobs only count them in progress
+    STREAM_KEEPALIVE_SECONDS = 15
+    INTERRUPTED_RESULT = {"status": "error", "message": "backtest interrupted by service restart."}
+    HOST_ID = None # host name and boot id, jobs are owned by HOST_ID|pid
+
+    @staticmethod
+    def getExecutor() -> ThreadPoolExecutor:
+
+        with BacktestJobs.JOBS_LOCK:
+
+            if BacktestJobs.EXECUTOR is None:
+
+                toggles = config.get_effective_toggles(logger=logging)
+                BacktestJobs.EXECUTOR = ThreadPoolExecutor(max_workers=max(toggles['JOB_MAX_WORKERS'] or 1, 1), thread_name_prefix="btjob")
+                BacktestJobs.STORE_PATH = toggles['JOB_STORE_PATH'].strip()
+
+                if BacktestJobs.STORE_PATH != "":
+                    BacktestJobs.initStore()
+
+        return BacktestJobs.EXECUTOR
+
+    @staticmethod
+    def getProcessStartTime(pid: int) -> str:
+        """Start time of a process in clock ticks since boot (Linux), tells a reused pid apart. Empty where /proc is unavailable"""
+
+        try:
+            with open(f"/proc/{pid}/stat", "r") as f:
+                return f.read().rsplit(")", 1)[1].split()[19]
+        except (OSError, IndexError):
+            return ""
+
+    @staticmethod
+    def getOwner() -> str:
+        """host|boot id|pid|start time of this process, stored with every job it runs"""
+
+        if BacktestJobs.HOST_ID is None:
+            try:
+                with open("/proc/sys/kernel/random/boot_id", "r") as f:
+                    bootId = f.read().strip()
+            except OSError:
+                bootId = ""
+            BacktestJobs.HOST_ID = f"{socket.gethostname()}|{bootId}"
+
+        return f"{BacktestJobs.HOST_ID}|{os.getpid()}|{BacktestJobs.getProcessStartTime(pid=os.getpid())}"
+
+    @staticmethod
+    def isOwnerGone(owner: Optional[str]) -> bool:
+        """
+        Whether the process that stored a job no longer runs. Jobs stored before owners were kept count as gone, jobs of other hosts 
+        (e.g. another container sharing the store) are never treated as gone since their processes cannot be checked from here.
+        """
+
+        if not owner:
+            return True
+
+        host, bootId, pid, startTime = owner.rsplit("|", 3)
+        thisHost, thisBootId, __, __ = BacktestJobs.getOwner().rsplit("|", 3)
+
+        if host != thisHost:
+            return False
+        if bootId != thisBootId:
+            return True
+
+        pid = int(pid)
+        if os.name == "nt":
+            import ctypes
+            handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid) # PROCESS_QUERY_LIMITED_INFORMATION
+            if handle:
+                ctypes.windll.kernel32.CloseHandle(handle)
+            return not handle
+
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+        
+        # the pid is in use, by the owner unless it was reused after a restart
+        return (startTime != "") and (BacktestJobs.getProcessStartTime(pid=pid) != startTime)
+
+    @staticmethod
+    def initStore() -> None:
+        """Create the jobs table, jobs left queued/running by a process that is gone are marked as interrupted"""
+
+        os.makedirs(os.path.dirname(BacktestJobs.STORE_PATH) or ".", exist_ok=True)
+
+        with BacktestJobs.STORE_LOCK, sqlite3.connect(BacktestJobs.STORE_PATH) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, type TEXT, status TEXT, progress TEXT, result TEXT, "
+                "submitted_at TEXT, started_at TEXT, finished_at TEXT, owner TEXT)"
+            )
+            if "owner" not in [__column[1] for __column in conn.execute("PRAGMA table_info(jobs)")]:
+                conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+
+            interruptedJobs = [
+                (json.dumps(BacktestJobs.INTERRUPTED_RESULT), __jobId) 
+                for __jobId, __owner in conn.execute("SELECT id, owner FROM jobs WHERE status IN ('queued', 'running')").fetchall() 
+                if BacktestJobs.isOwnerGone(owner=__owner)
+            ]
+            conn.executemany("UPDATE jobs SET status = 'error', result = ? WHERE id = ?", interruptedJobs)
+
+        if len(interruptedJobs) != 0:
+            logging.info(f"Marked {len(interruptedJobs)} backtest job(s) of stopped processes as interrupted")
+
+    @staticmethod
+    def saveJob(job: dict, withResult: bool = False) -> None:
+
+        if not BacktestJobs.STORE_PATH:
+            return
+
+        try:
+            with BacktestJobs.STORE_LOCK, sqlite3.connect(BacktestJobs.STORE_PATH) as conn:
+                conn.execute(
+                    "INSERT INTO jobs (id, type, status, progress, submitted_at, started_at, finished_at, owner) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET status = excluded.status, progress = excluded.progress, started_at = excluded.started_at, "
+                    "finished_at = excluded.finished_at",
+                    (
+                        job['id'], job['type'], job['status'], json.dumps(job['progress'], default=str), job['submittedAt'], job['startedAt'], 
+                        job['finishedAt'], BacktestJobs.getOwner()
+                    )
+                )
+                if withResult:
+                    conn.execute("UPDATE jobs SET result = ? WHERE id = ?", (BacktestJobs.toEventJson(job['result']), job['id']))
+        except Exception:
+            logging.error(f"Unable to persist job {job['id']}. {traceback.format_exc()}")
+
+    @staticmethod
+    def loadJob(jobId: str) -> Optional[dict]:
+        """Job from SQLite, used for jobs submitted to another worker process or before a restart"""
+
+        if not BacktestJobs.STORE_PATH:
+            return None
+
+        with BacktestJobs.STORE_LOCK, sqlite3.connect(BacktestJobs.STORE_PATH) as conn:
+            row = conn.execute(
+                "SELECT id, type, status, progress, result, submitted_at, started_at, finished_at FROM jobs WHERE id = ?", (jobId,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            "id": row[0], "type": row[1], "status": row[2], "progress": json.loads(row[3] or "{}"), "result": json.loads(row[4]) if row[4] else None,
+            "submittedAt": row[5], "startedAt": row[6], "finishedAt": row[7]
+        }
+
+    @staticmethod
+    def submit(jobType: str, runFunc, btParaToTest: dict) -> str:
+        """Queue runFunc(btParaToTest=..., onEvent=...) and return the job id, runFunc returns the usual service response dict"""
+
+        executor = BacktestJobs.getExecutor()
+
+        jobId = uuid.uuid4().hex
+        job = {
+            "id": jobId, "type": jobType, "status": "queued", "progress": {}, "result": None,
+            "submittedAt": datetime.now().isoformat(timespec="seconds"), "startedAt": None, "finishedAt": None
+        }
+
+        with BacktestJobs.JOBS_LOCK:
+            BacktestJobs.JOBS[jobId] = job
+        BacktestJobs.saveJob(job=job)
+
+        executor.submit(BacktestJobs.runJob, jobId, runFunc, btParaToTest)
+        logging.info(f"Backtest job {jobId} ({jobType}) queued")
+
+        return jobId
+
+    @staticmethod
+    def runJob(jobId: str, runFunc, btParaToTest: dict) -> None:
+
+        job = BacktestJobs.JOBS[jobId]
+        job['status'], job['startedAt'] = "running", datetime.now().isoformat(timespec="seconds")
+        BacktestJobs.saveJob(job=job)
+
+        def onEvent(stage: str, info: dict = {}) -> None:
+            if stage in BacktestJobs.DATA_EVENTS:
+                job['progress'] = {**job['progress'], stage: job['progress'].get(stage, 0) + 1}
+                return
+            job['progress'] = {**job['progress'], stage: info, "stage": stage}
+            BacktestJobs.saveJob(job=job)
+
+        try:
+            result = runFunc(btParaToTest=btParaToTest, onEvent=onEvent)
+        except Exception as errormsg:
+            logging.error(traceback.format_exc())
+            result = {"status": "error", "message": str(errormsg)}
+
+        job['result'], job['finishedAt'] = result, datetime.now().isoformat(timespec="seconds")
+        job['status'] = "success" if result.get("status") == "success" else "error"
+        BacktestJobs.saveJob(job=job, withResult=True)
+
+        with BacktestJobs.JOBS_LOCK:
+            finishedJobs = [__jobId for __jobId, __job in BacktestJobs.JOBS.items() if __job['finishedAt'] is not None]
+            for __jobId in finishedJobs[:max(len(finishedJobs)-BacktestJobs.MAX_FINISHED_JOBS, 0)]:
+                BacktestJobs.JOBS.pop(__jobId)
+
+        logging.info(f"Backtest job {jobId} finished with status {job['status']}")
+
+    @staticmethod
+    def getJob(jobId: str) -> Optional[dict]:
+        """Job dict (id, type, status, progress, result, timestamps), None for unknown ids"""
+
+        BacktestJobs.getExecutor()
+
+        job = BacktestJobs.JOBS.get(jobId)
+        if job is not None:
+            return job
+
+        return BacktestJobs.loadJob(jobId=jobId)
+
+    @staticmethod
+    def getJobStatus(jobId: str) -> Optional[dict]:
+        """Job without its result"""
+
+        job = BacktestJobs.getJob(jobId=jobId)
+        if job is None:
+            return None
+
+        return {__key: __value for __key, __value in job.items() if __key != "result"}
+
+    @staticmethod
+    def shutdown() -> None:
+        """Let running jobs finish, queued ones are cancelled and marked as interrupted (also in SQLite with JOB_STORE_PATH)"""
+
+        if BacktestJobs.EXECUTOR is None:
+            return
+
+        BacktestJobs.EXECUTOR.shutdown(wait=True, cancel_futures=True)
+
+        with BacktestJobs.JOBS_LOCK:
+            cancelledJobs = [__job for __job in BacktestJobs.JOBS.values() if __job['status'] == "queued"]
+
+        for __job in cancelledJobs:
+            __job['result'], __job['finishedAt'] = BacktestJobs.INTERRUPTED_RESULT, datetime.now().isoformat(timespec="seconds")
+            __job['status'] = "error"
+            BacktestJobs.saveJob(job=__job, withResult=True)
+
+        if len(cancelledJobs) != 0:
+            logging.info(f"Cancelled {len(cancelledJobs)} queued backtest job(s) on shutdown")
+
+    @staticmethod
+    def toEventJson(value) -> str:
+        return simplejson.dumps(value, ignore_nan=True, default=lambda x: x.item() if isinstance(x, np.generic) else str(x))
+
+    @staticmethod
+    def streamRun(runFunc, btParaToTest: dict):
+        """
+        Run runFunc on the job pool and yield its events as server-sent events: progress stages, "strategy" (metrics and tables of a
+        finished strategy), "orders" (orders of a finished TV signal) and finally "result" with the usual service response
+        """
+
+        events = queue.Queue()
+
+        def onEvent(stage: str, info: dict = {}) -> None:
+            events.put((stage, info))
+
+        def run() -> None:
+            try:
+                result = runFunc(btParaToTest=btParaToTest, onEvent=onEvent)
+            except Exception as errormsg:
+                logging.error(traceback.format_exc())
+                result = {"status": "error", "message": str(errormsg)}
+            events.put(("result", result))
+
+        BacktestJobs.getExecutor().submit(run)
+
+        while True:
+
+            try:
+                stage, info = events.get(timeout=BacktestJobs.STREAM_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+
+            yield f"event: {stage}\ndata: {BacktestJobs.toEventJson(info)}\n\n"
+            if stage == "result":
+                break
@@ -1,15 +1,30 @@
 ############################################################################## importing libraries
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 from dateutil.relativedelta import relativedelta
-from datetime import datetime, timedelta
+from urllib3.util.retry import Retry
+from datetime import datetime, timedelta, date
+from decimal import Decimal
+from urllib.parse import urlsplit
+from openpyxl.cell import WriteOnlyCell
+from collections import OrderedDict
 from typing import Optional
+from array import array
 import mysql.connector as mysql
 import pandas as pd
-import torch
 import simplejson
 import subprocess
+import importlib.util
+import openpyxl
 import traceback
+import threading
 import warnings
 import requests
+import gzip
+import hashlib
+import pickle
+import sqlite3
+import csv
 import logging
 import shutil
 import config
@@ -28,10 +43,6 @@ logging.basicConfig(filename=LOG_FILE_PATH, format="%(asctime)s: [BTRUN] %(messa
 pd.set_option('mode.chained_assignment', None)
 warnings.simplefilter('ignore')
 
-# Configure PyTorch to use GPU if available
-device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-torch.set_default_device(device)
-
 class Util:
 
     COLUMN_RENAME_MAPPING = {
@@ -111,9 +122,61 @@ class Util:
 
     MARGIN_SYMBOL_INFO_FILE_PATH = "marginSymbolInfo.json"
     MARGIN_INFO = {}
+    MARGIN_CACHE_FILE_PATH = "marginCache.json"
+    MARGIN_CACHE = {}
+    MARGIN_CACHE_LOCK = threading.Lock()
+    MARGIN_SETTINGS = {}
+    REFERENCE_DATA_MTIMES = {}
+    REFERENCE_DATA_THREAD = None
+    REFERENCE_DATA_STARTED = False
+    REFERENCE_DATA_LOCK = threading.Lock()
+    REFERENCE_DATA_REFRESH_LOCK = threading.Lock()
 
     LOTSIZE_FILE_PATH = "LOTSIZE.csv"
 
+    ENGINE_SESSIONS = {}
+    ENGINE_SESSIONS_LOCK = threading.Lock()
+    ENGINE_WIRE_SETTINGS = {}
+    PARALLEL_SETTINGS = {}
+    TV_SIGNAL_SETTINGS = {}
+    NUMERIC_BACKEND = None
+    TORCH = None
+    TORCH_DEVICE = None
+    HISTORICAL_DB_POOL = None
+    HISTORICAL_DB_POOL_LOCK = threading.Lock()
+    NEXT_BAR_KEY_COLUMNS = ["date", "time", "expiry", "strike"]
+    WORKBOOK_CACHE = OrderedDict()
+    WORKBOOK_CACHE_SIZE = None
+    WORKBOOK_SIDECAR_CACHE = None
+    WORKBOOK_SIDECAR_FOLDER = ".sheetcache"
+    SIGNAL_DIAGNOSTICS = None
+    RESULT_CACHE = OrderedDict()
+    RESULT_CACHE_SIZE = None
+    RESULT_CACHE_TTL_SECONDS = None
+    RESULT_CACHE_LOCK = threading.Lock()
+    WORKBOOK_CACHE_STATS = {"hits": 0, "misses": 0}
+    EXCEL_WRITE_CHUNK_ROWS = 10000 # rows converted at once by the streaming result workbook writer
+    EXCEL_WRITER = None
+    EXCEL_EXPORT = None
+    OUTPUT_JSON_LAYOUT = None
+    OUTPUT_RENDER_LOCK = threading.Lock()
+    OUTPUT_PERSIST_EXECUTOR = None
+    OUTPUT_PERSIST_LOCK = threading.Lock()
+    TRANSACTION_STORE_LOCK = threading.Lock()
+    TRANSACTION_STORE_READY = set() # store paths whose tables exist
+    TRANSACTION_FILTERS = {
+        "strategy": "strategy", "legId": "leg_id", "symbol": "symbol", "side": "side", "instrumentType": "instrument_type", "reason": "reason"
+    } # query parameter -> transaction column, filtered on equality
+    TRANSACTION_MAX_PAGE_SIZE = 5000
+    TRANSACTION_STORE_FAILED = -1 # transaction_count of results whose transactions could not be written
+    TRANSACTION_STORE_ABANDON_SECONDS = 600 # results pending for longer are treated as failed, the process writing them stopped
+    TRANSACTION_STORE_SETTINGS = {}
+    WORKBOOK_CACHE_LOCK = threading.Lock()
+    ENGINE_WIRE_MODULES = {"zstd": ["zstandard"], "msgpack": ["msgpack"], "arrow": ["msgpack", "pyarrow"]} # optional packages (requirements-optional.txt)
+    ENGINE_RESPONSE_ACCEPT = {
+        "json": "application/json", "msgpack": "application/x-msgpack, application/json;q=0.5", "arrow": "application/x-msgpack, application/json;q=0.5"
+    }
+
     BT_FIELDS = {
         'VwapExitCondition', 'TgtTrackingFrom', 'StartTime', 'OnExpiryDayTradeNextExpiry', 'EntryCombination', 'ConsiderVolSmaForEntry', 'Expiry', 
         'ConsiderSTForExit', 'EmaEntryCondition', 'TGT_ReEntryNo', 'LockMinProfitAt', 'StrategyLossReExecuteNo', 'StrikeSelectionTime', 
@@ -146,32 +209,122 @@ class Util:
     
     @staticmethod
     def runNeccesaryFunctionsBeforeStartingBT():
+        """Request path: reference data is read from the snapshot loaded by startWorkerServices, it is only loaded here by a process started without it"""
         
-        Util.populateSymbolInfoForMargin()
-        Util.populateLotSize()
+        if not Util.REFERENCE_DATA_STARTED:
+            logging.warning("Reference data was not loaded at worker start, loading it now.")
+            Util.startReferenceDataService()
+
+    @staticmethod
+    def startWorkerServices() -> None:
+        """Per-process startup: validate engine wire toggles, then load reference data and start its refresher"""
+
+        Util.getEngineWireSettings()
+        Util.startReferenceDataService()
+
+    @staticmethod
+    def startReferenceDataService() -> None:
+        """Load lot sizes and margin contracts once per process, then keep them fresh (file changes and the day-rollover margin contract download) 
+        from a background thread every REFERENCE_DATA_REFRESH_SECONDS, so requests are served from memory. A failed first load is retried by that thread only"""
+
+        with Util.REFERENCE_DATA_LOCK:
+
+            if Util.REFERENCE_DATA_STARTED:
+                return
+
+            try:
+                Util.refreshReferenceData()
+            finally:
+                Util.REFERENCE_DATA_STARTED = True
+
+                refreshInterval = config.get_effective_toggles(logger=logging)['REFERENCE_DATA_REFRESH_SECONDS'] or 0
+                if refreshInterval > 0:
+                    Util.REFERENCE_DATA_THREAD = threading.Thread(target=Util.runReferenceDataRefresher, args=(refreshInterval,), name="reference-data", daemon=True)
+                    Util.REFERENCE_DATA_THREAD.start()
+
+    @staticmethod
+    def runReferenceDataRefresher(refreshInterval: int) -> None:
+
+        while True:
+
+            time.sleep(refreshInterval)
+
+            try:
+                Util.refreshReferenceData()
+            except Exception:
+                logging.error(traceback.format_exc())
+
+    @staticmethod
+    def refreshReferenceData() -> None:
+        """Reload reference files whose mtime changed since the last load, margin contracts are also re-downloaded once the file is from an earlier day. 
+        Loaders build the new mapping fully before assigning it, so readers always see a complete one"""
+
+        with Util.REFERENCE_DATA_REFRESH_LOCK:
+
+            for filePath, populateFunc in [(Util.LOTSIZE_FILE_PATH, Util.populateLotSize), (Util.MARGIN_SYMBOL_INFO_FILE_PATH, Util.populateSymbolInfoForMargin)]:
+
+                fileMtime = os.path.getmtime(filePath) if os.path.exists(filePath) else None
+                isOutdated = (filePath == Util.MARGIN_SYMBOL_INFO_FILE_PATH) and ((fileMtime is None) or (datetime.fromtimestamp(fileMtime).date() != datetime.now().date()))
+
+                if (not isOutdated) and (filePath in Util.REFERENCE_DATA_MTIMES) and (Util.REFERENCE_DATA_MTIMES[filePath] == fileMtime):
+                    continue
+
+                populateFunc()
+                Util.REFERENCE_DATA_MTIMES[filePath] = os.path.getmtime(filePath) if os.path.exists(filePath) else None
+                logging.info(f"Reference data loaded from {filePath}")
     
+    @staticmethod
+    def getNumericBackend() -> str:
+        """Resolve NUMERIC_BACKEND once per process, torch is only imported when selected and falls back to numpy when unavailable"""
+
+        if Util.NUMERIC_BACKEND is None:
+
+            numericBackend = config.get_effective_toggles(logger=logging)['NUMERIC_BACKEND'].strip().lower()
+
+            if numericBackend == "torch":
+                try:
+                    import torch
+                    Util.TORCH = torch
+                    Util.TORCH_DEVICE = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+                except ImportError:
+                    logging.info("NUMERIC_BACKEND torch requested but torch is not installed, using numpy.")
+                    numericBackend = "numpy"
+
+            elif numericBackend != "numpy":
+                logging.info(f"Invalid NUMERIC_BACKEND received i.e. {numericBackend}, using numpy.")
+                numericBackend = "numpy"
+
+            Util.NUMERIC_BACKEND = numericBackend
+
+        return Util.NUMERIC_BACKEND
+
     @staticmethod
     def to_tensor(data):
-        """Convert numpy arrays or pandas objects to PyTorch tensors on GPU if available."""
-        if isinstance(data, pd.DataFrame):
-            return torch.tensor(data.values, dtype=torch.float32, device=device)
-        elif isinstance(data, pd.Series):
-            return torch.tensor(data.values, dtype=torch.float32, device=device)
-        elif isinstance(data, np.ndarray):
-            return torch.tensor(data, dtype=torch.float32, device=device)
+        """Convert numpy arrays or pandas objects to the configured numeric backend, float64 arrays for numpy and float32 tensors (GPU if available) for torch."""
+
+        if isinstance(data, (pd.DataFrame, pd.Series)):
+            data = data.values
         elif isinstance(data, (int, float)):
-            return torch.tensor([data], dtype=torch.float32, device=device)
-        elif isinstance(data, list):
-            return torch.tensor(data, dtype=torch.float32, device=device)
-        elif isinstance(data, torch.Tensor):
-            return data.to(device)
+            data = [data]
+
+        if Util.getNumericBackend() == "numpy":
+            if Util.TORCH is not None and isinstance(data, Util.TORCH.Tensor):
+                return data.cpu().numpy()
+            if isinstance(data, (np.ndarray, list)):
+                return np.asarray(data, dtype=np.float64)
         else:
-            raise TypeError(f"Unsupported data type for tensor conversion: {type(data)}")
+            torch = Util.TORCH
+            if isinstance(data, torch.Tensor):
+                return data.to(Util.TORCH_DEVICE)
+            if isinstance(data, (np.ndarray, list)):
+                return torch.tensor(data, dtype=torch.float32, device=Util.TORCH_DEVICE)
+
+        raise TypeError(f"Unsupported data type for tensor conversion: {type(data)}")
     
     @staticmethod
     def from_tensor(tensor):
-        """Convert PyTorch tensor back to numpy array."""
-        if isinstance(tensor, torch.Tensor):
+        """Convert backend tensor back to numpy array."""
+        if Util.TORCH is not None and isinstance(tensor, Util.TORCH.Tensor):
             return tensor.cpu().numpy()
         return tensor
     
@@ -569,21 +722,22 @@ class Util:
         
         if fetchLatest:
 
+            marginCalcUrl = config.get_effective_toggles(logger=logging)['MARGIN_CALC_URL'].rstrip("/")
             for ii in range(1,6):
 
                 try:
                     
-                    r1 = requests.get("https://margin-calc-arom-prod.angelbroking.com/exchange/BFO/product/OPTION/contract")
+                    r1 = requests.get(f"{marginCalcUrl}/exchange/BFO/product/OPTION/contract")
                     r1 = pd.DataFrame(r1.json()['contract'])
                     r1 = r1[r1['symbol'].str.contains("SENSEX-|BANKEX-")]
                     r1['exchange'] = "BFO"
 
-                    r2 = requests.get("https://margin-calc-arom-prod.angelbroking.com/exchange/NFO/product/OPTION/contract")
+                    r2 = requests.get(f"{marginCalcUrl}/exchange/NFO/product/OPTION/contract")
                     r2 = pd.DataFrame(r2.json()['contract'])
                     r2 = r2[r2['symbol'].str.contains("NIFTY-")]
                     r2['exchange'] = "NFO"
 
-                    r3 = requests.get("https://margin-calc-arom-prod.angelbroking.com/exchange/MCX/product/OPTION/contract")
+                    r3 = requests.get(f"{marginCalcUrl}/exchange/MCX/product/OPTION/contract")
                     r3 = pd.DataFrame(r3.json()['contract'])
                     r3['exchange'] = "MCX"
 
@@ -620,8 +774,118 @@ class Util:
             return 
         
     @staticmethod
-    def getTVSignalsInDf(signalfilepath: str, signals: list) -> pd.DataFrame:
+    def getTVSignalDateRange(uPara: dict) -> tuple:
+        """StartDate and EndDate of TV parameters as dates"""
+
+        # Handle both formats: with underscores (01_01_2024) and as integer (1012024)
+        start_date_str = str(uPara['StartDate'])
+        end_date_str = str(uPara['EndDate'])
+        
+        if '_' in start_date_str:
+            # Format: 01_01_2024
+            start_date = datetime.strptime(start_date_str, "%d_%m_%Y").date()
+            end_date = datetime.strptime(end_date_str, "%d_%m_%Y").date()
+        else:
+            # Format: integer like 1012024 (should be 01012024)
+            # Pad with zeros to ensure 8 digits DDMMYYYY
+            start_date_str = start_date_str.zfill(8)
+            end_date_str = end_date_str.zfill(8)
+            start_date = datetime.strptime(start_date_str, "%d%m%Y").date()
+            end_date = datetime.strptime(end_date_str, "%d%m%Y").date()
+        
+        return start_date, end_date
+    
+    @staticmethod
+    def iterTVSignalFileRows(signalfilepath: str):
+        """Yield rows of a TradingView "List of trades" export one by one, header first (.xlsx/.xlsm via openpyxl read-only mode, .csv)"""
+
+        if signalfilepath.lower().endswith(".csv"):
+            with open(signalfilepath, newline="", encoding="utf-8-sig") as f:
+                yield from csv.reader(f)
+            return
+
+        workbook = openpyxl.load_workbook(signalfilepath, read_only=True, data_only=True)
+        try:
+            yield from workbook["List of trades"].iter_rows(values_only=True)
+        finally:
+            workbook.close()
+    
+    @staticmethod
+    def streamTVSignalFile(signalfilepath: str, uPara: dict={}) -> pd.DataFrame:
+        """
+        Read only trade no, type, date/time, contracts and price columns of a TradingView export row by row into typed arrays.
+        When TV parameters are given, date/time is parsed with SignalDateFormat and rows outside StartDate-EndDate are skipped.
+        """
+
+        signalRows = Util.iterTVSignalFileRows(signalfilepath=signalfilepath)
+        header = [str(__column).strip() if __column is not None else "" for __column in next(signalRows, [])]
+
+        # Handle different column names for contracts/position size
+        if 'Contracts' in header:
+            contracts_column = 'Contracts'
+        elif 'Position size (qty)' in header:
+            contracts_column = 'Position size (qty)'
+        else:
+            logging.error("Neither 'Contracts' nor 'Position size (qty)' column found in signal file")
+            return pd.DataFrame()
+        
+        tradeNoIdx, typeIdx, datetimeIdx, lotsIdx = [header.index(__column) for __column in ['Trade #', 'Type', 'Date/Time', contracts_column]]
+        priceIdx = header.index('Price INR') if 'Price INR' in header else None
+        
+        # Include Price INR column if it exists (for DB Exit functionality)
+        if priceIdx is not None:
+            logging.info(f"Found 'Price INR' column in signal file - will use for DB Exit searches")
+        else:
+            logging.info(f"No 'Price INR' column found - DB Exit will use default logic")
+        
+        dateFormat = uPara.get('SignalDateFormat', "")
+        if uPara:
+            startDate, endDate = Util.getTVSignalDateRange(uPara=uPara)
+            startAt, endBefore = datetime.combine(startDate, datetime.min.time()), datetime.combine(endDate + timedelta(days=1), datetime.min.time())
+        
+        tradeNos, lots, prices = array("q"), array("d"), array("d")
+        signalTypes, signalDatetimes = [], []
+        rowCount = 0
+
+        for row in signalRows:
+
+            rowCount += 1
+            tradeNo, signalType, signalDatetime, lot = row[tradeNoIdx], row[typeIdx], row[datetimeIdx], row[lotsIdx]
+            if any(__value is None or __value == "" for __value in (tradeNo, signalType, signalDatetime, lot)):
+                continue
+            
+            if isinstance(signalDatetime, str) and dateFormat:
+                signalDatetime = datetime.strptime(signalDatetime, dateFormat)
+            
+            if uPara and isinstance(signalDatetime, datetime) and not (startAt <= signalDatetime < endBefore):
+                continue
+
+            tradeNos.append(int(float(tradeNo)))
+            signalTypes.append(str(signalType))
+            signalDatetimes.append(signalDatetime)
+            lots.append(float(lot))
+
+            if priceIdx is not None:
+                price = row[priceIdx]
+                prices.append(float(price) if price not in (None, "") else np.nan)
         
+        logging.info(f"Streamed {len(tradeNos)} of {rowCount} TV signals from {signalfilepath}")
+
+        lots = np.frombuffer(lots, dtype=np.float64) if len(lots) else np.array([], dtype=np.float64)
+        signalDf = pd.DataFrame({
+            "tradeno": np.frombuffer(tradeNos, dtype=np.int64) if len(tradeNos) else np.array([], dtype=np.int64), 
+            "signal": signalTypes, "datetime": signalDatetimes, 
+            "lots": lots.astype(np.int64) if np.array_equal(lots, np.floor(lots)) else lots
+        })
+        if priceIdx is not None:
+            signalDf['exit_price'] = np.frombuffer(prices, dtype=np.float64) if len(prices) else np.array([], dtype=np.float64)
+
+        return signalDf
+    
+    @staticmethod
+    def getTVSignalsInDf(signalfilepath: str, signals: list, uPara: dict={}) -> pd.DataFrame:
+        """Signals of a TV export file or of the request signal list, rows outside StartDate-EndDate are dropped here when TV parameters are given"""
+
         if (signalfilepath == "") and (not signals):
             return pd.DataFrame()
         
@@ -631,7 +895,10 @@ class Util:
                 logging.info(f"Unable to find TV signal file, given location: {signalfilepath}")
                 return pd.DataFrame()
             
-            signalDf = pd.read_excel(signalfilepath, sheet_name="List of trades")
+            if signalfilepath.lower().endswith((".csv", ".xlsx", ".xlsm")):
+                return Util.streamTVSignalFile(signalfilepath=signalfilepath, uPara=uPara)
+            
+            signalDf = Util.readExcelSheet(excelFilePath=signalfilepath, sheetName="List of trades")
             # Handle different column names for contracts/position size
             if 'Contracts' in signalDf.columns:
                 contracts_column = 'Contracts'
@@ -660,6 +927,14 @@ class Util:
             signalDf = pd.DataFrame(signals)
             signalDf = signalDf.drop(columns=['signal'])
             signalDf = signalDf.rename(columns={"trade": "tradeno", "contracts": "lots", "type": "signal"})
+
+            # same ingestion-time StartDate-EndDate filter as streamTVSignalFile
+            if uPara and (not signalDf.empty):
+                startDate, endDate = Util.getTVSignalDateRange(uPara=uPara)
+                signalDatetimes = pd.to_datetime(signalDf['datetime'], format=uPara.get('SignalDateFormat') or None)
+                isInRange = (signalDatetimes >= pd.Timestamp(startDate)) & (signalDatetimes < pd.Timestamp(endDate) + pd.Timedelta(days=1))
+                signalDf = signalDf[isInRange].assign(datetime=signalDatetimes[isInRange])
+                logging.info(f"Kept {int(isInRange.sum())} of {len(isInRange)} TV signals within {uPara['StartDate']} to {uPara['EndDate']}")
         
         # Return all columns including exit_price if it exists
         base_columns = ["tradeno", "signal", "datetime", "lots"]
@@ -668,6 +943,128 @@ class Util:
         else:
             return signalDf[base_columns].dropna(how="any").reset_index(drop=True)
     
+    @staticmethod
+    def getYYMMDD(datetimes: pd.Series) -> np.ndarray:
+        """Dates of a datetime series as yymmdd integers"""
+
+        return ((datetimes.dt.year % 100) * 10000 + datetimes.dt.month * 100 + datetimes.dt.day).to_numpy(dtype=np.int64)
+    
+    @staticmethod
+    def getHHMMSS(datetimes: pd.Series) -> np.ndarray:
+        """Times of a datetime series as zero padded HHMMSS strings"""
+
+        hhmmss = (datetimes.dt.hour * 10000 + datetimes.dt.minute * 100 + datetimes.dt.second).to_numpy(dtype=np.int64)
+        return np.char.zfill(hhmmss.astype(str), 6).astype(object)
+    
+    @staticmethod
+    def getYYMMDDStrings(dates: pd.Series) -> np.ndarray:
+        """Zero padded yymmdd strings of a series of dates (date objects, datetimes or datetime64), each distinct date is converted once"""
+
+        codes, uniques = pd.factorize(dates)
+        days = np.asarray(uniques, dtype="datetime64[D]")
+        
+        years = days.astype("datetime64[Y]").astype(np.int64) + 1970
+        months = days.astype("datetime64[M]").astype(np.int64) % 12 + 1
+        monthDays = (days - days.astype("datetime64[M]")).astype(np.int64) + 1
+        
+        yymmdd = [f"{__date:06d}" for __date in ((years % 100) * 10000 + months * 100 + monthDays).tolist()]
+        return np.array(yymmdd + [None], dtype=object)[codes]
+    
+    @staticmethod
+    def getHHMMSSStrings(times: pd.Series) -> np.ndarray:
+        """Zero padded HHMMSS strings of a series of time objects or datetimes, each distinct time is converted once"""
+
+        codes, uniques = pd.factorize(times)
+        hhmmss = [f"{__time.hour * 10000 + __time.minute * 100 + __time.second:06d}" for __time in uniques]
+        return np.array(hhmmss + [None], dtype=object)[codes]
+    
+    @staticmethod
+    def shiftHHMMSS(hhmmss: np.ndarray, seconds: int) -> np.ndarray:
+        """Shift HHMMSS strings by given seconds, each distinct time is computed once"""
+
+        shifted = {
+            __time: (datetime.strptime(__time, "%H%M%S") + relativedelta(seconds=seconds)).strftime("%H%M%S") for __time in set(hhmmss.tolist())
+        }
+        return np.array([shifted[__time] for __time in hhmmss.tolist()], dtype=object)
+    
+    @staticmethod
+    def getSignalDiagnostics() -> dict:
+        """
+        Signal diagnostics settings, empty (disabled) unless SIGNAL_DIAGNOSTICS is on. Toggles are resolved once per process.
+        """
+
+        if Util.SIGNAL_DIAGNOSTICS is None:
+            toggles = config.get_effective_toggles(logger=logging)
+            Util.SIGNAL_DIAGNOSTICS = {
+                "dates": {int(__date) for __date in str(toggles['SIGNAL_DIAGNOSTICS_DATES']).split(",") if __date.strip().isdigit()},
+                "sample": max(toggles['SIGNAL_DIAGNOSTICS_SAMPLE'] or 0, 0)
+            } if toggles['SIGNAL_DIAGNOSTICS'] == "1" else {}
+
+        return Util.SIGNAL_DIAGNOSTICS
+    
+    @staticmethod
+    def logSignalStageDiagnostics(stage: str, signalDf: pd.DataFrame, diagnostics: dict) -> None:
+        """Log signal count, month-wise histogram and traced dates (count and sampled rows) of a signal frame at a processing stage"""
+
+        signalDates = Util.getYYMMDD(signalDf['datetime'])
+        monthHistogram = pd.Series(signalDates // 100).value_counts().sort_index()
+
+        logging.info(f"Signal diagnostics [{stage}]: {len(signalDf)} signals, by yymm {monthHistogram.to_dict()}")
+
+        for tracedDate in sorted(diagnostics['dates']):
+            tracedSignals = signalDf[signalDates == tracedDate]
+            logging.info(f"Signal diagnostics [{stage}]: {len(tracedSignals)} signals on {tracedDate}")
+            for __signal in tracedSignals.head(diagnostics['sample']).to_dict("records"):
+                logging.info(f"  Trade #{__signal['tradeno']}: {__signal['datetime']} - {__signal['signal']}")
+    
+    @staticmethod
+    def logFinalSignalDiagnostics(finalSignal: dict, diagnostics: dict) -> None:
+        """Log traced dates count and sampled signals of every signal type in getTVIntraSignals output"""
+
+        for signalType, signalList in finalSignal.items():
+            for tracedDate in sorted(diagnostics['dates']):
+                tracedSignals = [__signal for __signal in signalList if __signal['entrydate'] == tracedDate]
+                if not tracedSignals:
+                    continue
+                logging.info(f"Signal diagnostics [output]: {signalType} has {len(tracedSignals)} signals on {tracedDate}")
+                for __signal in tracedSignals[:diagnostics['sample']]:
+                    logging.info(f"  entry={__signal['entrytime']}, exit={__signal['exittime']}, lots={__signal['lots']}")
+    
+    @staticmethod
+    def getTVTradePairs(signalDf: pd.DataFrame) -> pd.DataFrame:
+        """
+        One row per trade number having an even signal count, in order of first appearance, with row positions of its first two
+        signals and which of them is the entry/exit. Entry/exit come from the original signal text, else from datetime order.
+        """
+
+        tradeCodes, tradeNos = pd.factorize(signalDf['tradeno'])
+        rowInTrade = pd.Series(tradeCodes).groupby(tradeCodes).cumcount().to_numpy()
+
+        firstRows = np.full(len(tradeNos), -1, dtype=np.int64)
+        secondRows = np.full(len(tradeNos), -1, dtype=np.int64)
+        firstRows[tradeCodes[rowInTrade == 0]] = np.flatnonzero(rowInTrade == 0)
+        secondRows[tradeCodes[rowInTrade == 1]] = np.flatnonzero(rowInTrade == 1)
+
+        isPaired = (np.bincount(tradeCodes, minlength=len(tradeNos)) % 2) == 0
+        firstRows, secondRows = firstRows[isPaired], secondRows[isPaired]
+
+        signalText = signalDf['original_signal'] if 'original_signal' in signalDf.columns else signalDf['signal']
+        signalText = signalText.str.upper()
+        isEntry = signalText.str.contains("ENTRY", regex=False).to_numpy(dtype=bool)
+        isExit = (~isEntry) & signalText.str.contains("EXIT", regex=False).to_numpy(dtype=bool)
+
+        isResolved = (isEntry[firstRows] | isEntry[secondRows]) & (isExit[firstRows] | isExit[secondRows])
+        signalDatetimes = signalDf['datetime'].to_numpy()
+        isFirstBefore = signalDatetimes[firstRows] < signalDatetimes[secondRows]
+
+        entryIsFirst = np.where(isResolved, isEntry[firstRows], isFirstBefore)
+        exitIsFirst = np.where(isResolved, isExit[firstRows], ~isFirstBefore)
+
+        return pd.DataFrame({
+            "firstRow": firstRows, "secondRow": secondRows, 
+            "entryRow": np.where(entryIsFirst, firstRows, secondRows), "exitRow": np.where(exitIsFirst, firstRows, secondRows)
+        })
+    
     @staticmethod
     def getTVIntraSignals(rolloverIndex: str, uPara: dict, signalDf: pd.DataFrame) -> dict:
 
@@ -689,60 +1086,29 @@ class Util:
         
         signalDf['datetime'] = pd.to_datetime(signalDf['datetime'], format=uPara['SignalDateFormat'])
         
-        entrySignalCount = signalDf[signalDf['signal'].str.contains("Entry ")]
-        entrySignalCount['datetime'] = entrySignalCount['datetime'].dt.strftime("%y%m%d").astype(int)
-        entrySignalCount = entrySignalCount[['datetime']]
-        entrySignalCount = entrySignalCount['datetime'].value_counts().to_dict()
-        
-        # Debug: Log date filtering
-        # Handle both formats: with underscores (01_01_2024) and as integer (1012024)
-        start_date_str = str(uPara['StartDate'])
-        end_date_str = str(uPara['EndDate'])
+        entrySignalDates = set(Util.getYYMMDD(signalDf.loc[signalDf['signal'].str.contains("Entry "), 'datetime']).tolist())
         
-        if '_' in start_date_str:
-            # Format: 01_01_2024
-            start_date = datetime.strptime(start_date_str, "%d_%m_%Y").date()
-            end_date = datetime.strptime(end_date_str, "%d_%m_%Y").date()
-        else:
-            # Format: integer like 1012024 (should be 01012024)
-            # Pad with zeros to ensure 8 digits DDMMYYYY
-            start_date_str = start_date_str.zfill(8)
-            end_date_str = end_date_str.zfill(8)
-            start_date = datetime.strptime(start_date_str, "%d%m%Y").date()
-            end_date = datetime.strptime(end_date_str, "%d%m%Y").date()
+        start_date, end_date = Util.getTVSignalDateRange(uPara=uPara)
         before_filter = len(signalDf)
         
-        # Debug: Log parsed dates
         logging.info(f"Date parsing debug: StartDate={uPara['StartDate']} -> {start_date}, EndDate={uPara['EndDate']} -> {end_date}")
-        
-        # Count Jan 1 signals before filtering
-        jan1_before = len(signalDf[signalDf['datetime'].dt.date == datetime(2024, 1, 1).date()])
-        logging.info(f"Jan 1, 2024 signals BEFORE date filter: {jan1_before}")
-        
-        # Show the first few Jan 1 signals before filtering
-        jan1_signals_before = signalDf[signalDf['datetime'].dt.date == datetime(2024, 1, 1).date()]
-        if not jan1_signals_before.empty:
-            for idx, row in jan1_signals_before.head(3).iterrows():
-                logging.info(f"  Trade #{row['tradeno']}: {row['datetime']} - {row['signal']}")
+
+        signalDiagnostics = Util.getSignalDiagnostics()
+        if signalDiagnostics:
+            Util.logSignalStageDiagnostics(stage="parsed", signalDf=signalDf, diagnostics=signalDiagnostics)
         
         signalDf = signalDf[
-            (signalDf['datetime'].dt.date >= start_date) & 
-            (signalDf['datetime'].dt.date <= end_date)
+            (signalDf['datetime'] >= pd.Timestamp(start_date)) & 
+            (signalDf['datetime'] < pd.Timestamp(end_date) + pd.Timedelta(days=1))
         ]
         
         after_filter = len(signalDf)
         logging.info(f"Date filter: {uPara['StartDate']} to {uPara['EndDate']}")
         logging.info(f"Signals before filter: {before_filter}, after filter: {after_filter}")
-        
-        # Check Jan 1 specifically after filtering
-        jan1_count = len(signalDf[signalDf['datetime'].dt.date == datetime(2024, 1, 1).date()])
-        logging.info(f"Jan 1, 2024 signals AFTER date filter: {jan1_count}")
-        
-        # Show the Jan 1 signals after filtering
-        jan1_signals_after = signalDf[signalDf['datetime'].dt.date == datetime(2024, 1, 1).date()]
-        if not jan1_signals_after.empty:
-            for idx, row in jan1_signals_after.head(3).iterrows():
-                logging.info(f"  Trade #{row['tradeno']}: {row['datetime']} - {row['signal']}")
+
+        if signalDiagnostics:
+            Util.logSignalStageDiagnostics(stage="date filtered", signalDf=signalDf, diagnostics=signalDiagnostics)
+
         signalDf = signalDf.sort_values(by=['datetime'])
         signalDf = signalDf.reset_index(drop=True)
         # Store original signal for debugging before transformation
@@ -756,12 +1122,10 @@ class Util:
             manualsignalentrytime = datetime.strptime(str(int(uPara['ManualTradeEntryTime'])), "%H%M%S").time()
             manualsignallasttime = datetime.strptime(str(int(uPara['IntradayExitTime'])), "%H%M%S").time()
 
-            uniquedts = sorted(signalDf['datetime'].dt.date.unique())
             manipulatedsignalafterconsideringmanualsignal = []
 
-            for udate in uniquedts:
+            for udate, ckdf in signalDf.groupby(signalDf['datetime'].dt.date, sort=True):
 
-                ckdf = signalDf[signalDf['datetime'].dt.date == udate]
                 datewisesignals = ckdf.to_dict("records")
 
                 if manualsignalentrytime < ckdf.iloc[0]['datetime'].time(): # creating manual signal incase signal is after manual signal entry time
@@ -804,57 +1168,49 @@ class Util:
 
             signalDf = pd.DataFrame(manipulatedsignalafterconsideringmanualsignal)
             del manipulatedsignalafterconsideringmanualsignal
+
+            if signalDiagnostics:
+                Util.logSignalStageDiagnostics(stage="manual signals added", signalDf=signalDf, diagnostics=signalDiagnostics)
             
-        finalSignal = {"LONG": [], "SHORT": [], "MANUAL": []}
+        tradePairs = Util.getTVTradePairs(signalDf=signalDf)
 
-        for tradeno in signalDf['tradeno'].unique():
-            signals = signalDf[signalDf['tradeno'] == tradeno]
-            if (signals.shape[0] % 2 != 0):
-                continue
+        entryRows, exitRows = tradePairs['entryRow'].to_numpy(), tradePairs['exitRow'].to_numpy()
+        firstRows, secondRows = tradePairs['firstRow'].to_numpy(), tradePairs['secondRow'].to_numpy()
 
-            # Identify which row is entry vs exit based on original signal type
-            # Use original_signal column if available to properly identify entry vs exit
-            entry_idx = None
-            exit_idx = None
-            for i in range(min(2, len(signals))):
-                # Use original_signal if available, otherwise use signal
-                if 'original_signal' in signals.columns:
-                    signal_type = signals.iloc[i]['original_signal'].upper()
-                else:
-                    signal_type = signals.iloc[i]['signal'].upper()
-                
-                if 'ENTRY' in signal_type:
-                    if entry_idx is None:
-                        entry_idx = i
-                elif 'EXIT' in signal_type:
-                    if exit_idx is None:
-                        exit_idx = i
-            
-            # Fallback to original logic if we can't determine from signal type
-            if entry_idx is None or exit_idx is None:
-                # Check datetime order - entry should be before exit
-                if signals['datetime'].iloc[0] < signals['datetime'].iloc[1]:
-                    entry_idx, exit_idx = 0, 1
-                else:
-                    entry_idx, exit_idx = 1, 0
+        signalDates, signalTimes = Util.getYYMMDD(signalDf['datetime']), Util.getHHMMSS(signalDf['datetime'])
+        entryDates, exitDates = signalDates[entryRows], signalDates[exitRows]
+        entryTimes, exitTimes = signalTimes[entryRows], signalTimes[exitRows]
+
+        if uPara['FirstTradeEntryTime'] != 0: # first trade of every day having an entry signal
+            isFirstTradeOfDay = np.isin(entryDates, list(entrySignalDates)) & (~pd.Series(entryDates).duplicated().to_numpy())
+            entryTimes[isFirstTradeOfDay] = str(int(uPara['FirstTradeEntryTime']))
+        
+        if uPara['IncreaseEntrySignalTimeBy'] != 0:
+            entryTimes = Util.shiftHHMMSS(hhmmss=entryTimes, seconds=uPara['IncreaseEntrySignalTimeBy'])
+        
+        if uPara['IncreaseExitSignalTimeBy'] != 0:
+            exitTimes = Util.shiftHHMMSS(hhmmss=exitTimes, seconds=uPara['IncreaseExitSignalTimeBy'])
 
-            entrydate = int(signals['datetime'].iloc[entry_idx].date().strftime('%y%m%d'))
-            entrytime = signals['datetime'].iloc[entry_idx].time().strftime("%H%M%S")
+        tradeNos = signalDf['tradeno'].to_numpy()
+        signalTypes = signalDf['signal'].to_numpy()
+        signalLots = signalDf['lots'].to_numpy()
+        signalDays = signalDf['datetime'].dt.normalize().to_numpy()
+        signalPrices = signalDf['exit_price'].to_numpy(dtype=float) if 'exit_price' in signalDf.columns else None
 
-            if (entrydate in entrySignalCount) and (uPara['FirstTradeEntryTime'] != 0):
-                entrytime = str(int(uPara['FirstTradeEntryTime']))
-                entrySignalCount.pop(entrydate)
-            
-            exitdate = int(signals['datetime'].iloc[exit_idx].date().strftime('%y%m%d'))
-            exittime = signals['datetime'].iloc[exit_idx].time().strftime("%H%M%S")
+        if uPara['DoRollover']:
+            tradingDatePosition = {__tradingdate: __position for __position, __tradingdate in enumerate(rolloverInfo['tradingdates'])}
 
-            if uPara['IncreaseEntrySignalTimeBy'] != 0:
-                entrytime = (datetime.strptime(entrytime, "%H%M%S") + relativedelta(seconds=uPara['IncreaseEntrySignalTimeBy'])).strftime("%H%M%S")
-            
-            if uPara['IncreaseExitSignalTimeBy'] != 0:
-                exittime = (datetime.strptime(exittime, "%H%M%S") + relativedelta(seconds=uPara['IncreaseExitSignalTimeBy'])).strftime("%H%M%S")
+        intradayExitTime = int(uPara['IntradayExitTime'])
+        applyIntradaySqOff = (not uPara['TvExitApplicable']) and uPara['IntradaySqOffApplicable']
+        expiryDayExitTime = str(int(uPara['ExpiryDayExitTime']))
 
-            addEntry = True
+        finalSignal = {"LONG": [], "SHORT": [], "MANUAL": []}
+
+        for entryRow, exitRow, firstRow, secondRow, entrydate, entrytime, exitdate, exittime in zip(
+            entryRows, exitRows, firstRows, secondRows, entryDates.tolist(), entryTimes.tolist(), exitDates.tolist(), exitTimes.tolist()
+        ):
+
+            tradeno = tradeNos[entryRow]
 
             if uPara['DoRollover']:
 
@@ -864,82 +1220,67 @@ class Util:
 
                 currentexpiry = currentexpiry[0]
             
-                if exitdate > currentexpiry: # exit date is after current expiry
+                if exitdate > currentexpiry: # exit date is after current expiry, rollover legs replace the trade
 
-                    addEntry = False
                     logging.info(f"Rollover required for tradeno: {tradeno}")
 
-                    finalSignal[signals['signal'].iloc[0]].append({
+                    rolloverSignals = finalSignal[signalTypes[firstRow]]
+                    rolloverLots = int(signalLots[firstRow])
+
+                    rolloverSignals.append({
                         "entrydate": entrydate, "entrytime": entrytime, "exitdate": currentexpiry, "exittime": rolloverTime, 
-                        "lots": int(signals['lots'].iloc[0]), "ExpiryDayExitTime": rolloverTime, "isrollovertrade": False
+                        "lots": rolloverLots, "ExpiryDayExitTime": rolloverTime, "isrollovertrade": False
                     })
 
-                    loopTime = math.ceil((signals['datetime'].iloc[1].date() - signals['datetime'].iloc[0].date()).days / 5)
+                    loopTime = math.ceil(((signalDays[secondRow] - signalDays[firstRow]) // np.timedelta64(1, "D")) / 5)
                     for __ in range(loopTime):
 
-                        nexttradingdate = rolloverInfo['tradingdates'][rolloverInfo['tradingdates'].index(currentexpiry)+1]
+                        nexttradingdate = rolloverInfo['tradingdates'][tradingDatePosition[currentexpiry]+1]
                         nextexitdate = rolloverInfo['expirys'][nexttradingdate][0]
 
                         if nextexitdate >= exitdate:
 
-                            finalSignal[signals['signal'].iloc[0]].append({
+                            rolloverSignals.append({
                                 "entrydate": currentexpiry, "entrytime": rolloverTime, "exitdate": exitdate, "exittime": exittime, 
-                                "lots": int(signals['lots'].iloc[0]), "ExpiryDayExitTime": exittime, "isrollovertrade": True
+                                "lots": rolloverLots, "ExpiryDayExitTime": exittime, "isrollovertrade": True
                             })
                             break
 
-                        finalSignal[signals['signal'].iloc[0]].append({
+                        rolloverSignals.append({
                             "entrydate": currentexpiry, "entrytime": rolloverTime, "exitdate": nextexitdate, "exittime": rolloverTime, 
-                            "lots": int(signals['lots'].iloc[0]), "ExpiryDayExitTime": rolloverTime, "isrollovertrade": True
+                            "lots": rolloverLots, "ExpiryDayExitTime": rolloverTime, "isrollovertrade": True
                         })
                         currentexpiry = rolloverInfo['expirys'].get(nextexitdate)[0]
+                    
+                    continue
 
-            if (not uPara['TvExitApplicable']) and uPara['IntradaySqOffApplicable']:
-
-                if (exitdate != entrydate) or (int(exittime) > int(uPara['IntradayExitTime'])):
-                    exittime = str(int(uPara['IntradayExitTime']))
-                    exitdate = entrydate
-
-            if not addEntry:
-                continue
+            if applyIntradaySqOff and ((exitdate != entrydate) or (int(exittime) > intradayExitTime)):
+                exittime = str(intradayExitTime)
+                exitdate = entrydate
 
             signal_info = {
-                "entrydate": entrydate, "entrytime": entrytime, "exitdate": exitdate, "exittime": exittime, "lots": int(signals['lots'].iloc[entry_idx]), 
-                "ExpiryDayExitTime": str(int(uPara['ExpiryDayExitTime'])), "isrollovertrade": False,
+                "entrydate": entrydate, "entrytime": entrytime, "exitdate": exitdate, "exittime": exittime, "lots": int(signalLots[entryRow]), 
+                "ExpiryDayExitTime": expiryDayExitTime, "isrollovertrade": False,
                 "original_tv_exittime": exittime,  # Preserve original TV exit time for DB Exit display
                 "tradeno": tradeno  # Add trade number to track individual trades
             }
             
-            # Add entry price if available (for DB Entry functionality) 
-            # Note: Price INR column contains price for both entry and exit signals
-            if 'exit_price' in signals.columns and entry_idx is not None and not pd.isna(signals['exit_price'].iloc[entry_idx]):
-                signal_info['entry_price'] = float(signals['exit_price'].iloc[entry_idx])  # 'exit_price' column name but contains price for both signals
-                logging.info(f"Added entry_price {signal_info['entry_price']} for trade {tradeno}")
-            else:
-                logging.debug(f"No entry_price for trade {tradeno}")
+            # Add entry/exit price if available (for DB Entry/Exit functionality)
+            # Note: 'exit_price' column name but Price INR contains price for both entry and exit signals
+            if (signalPrices is not None) and (not np.isnan(signalPrices[entryRow])):
+                signal_info['entry_price'] = float(signalPrices[entryRow])
             
-            # Add exit price if available (for DB Exit functionality)
-            if 'exit_price' in signals.columns and exit_idx is not None and not pd.isna(signals['exit_price'].iloc[exit_idx]):
-                signal_info['exit_price'] = float(signals['exit_price'].iloc[exit_idx])
-                logging.info(f"Added exit_price {signal_info['exit_price']} for trade {tradeno} (entry: {entrydate} {entrytime}, exit: {exitdate} {exittime})")
-            else:
-                logging.debug(f"No exit_price for trade {tradeno} - columns: {signals.columns.tolist() if hasattr(signals, 'columns') else 'N/A'}, exit_idx: {exit_idx}")
+            if (signalPrices is not None) and (not np.isnan(signalPrices[exitRow])):
+                signal_info['exit_price'] = float(signalPrices[exitRow])
                 
-            finalSignal[signals['signal'].iloc[entry_idx]].append(signal_info)
-
-        # Debug: Log final signal counts
-        logging.info(f"getTVIntraSignals returning signals:")
-        for signal_type, signals_list in finalSignal.items():
-            logging.info(f"  {signal_type}: {len(signals_list)} signals")
-            # Count Jan 1 signals in final output
-            jan1_in_type = sum(1 for s in signals_list if s['entrydate'] == 240101)
-            if jan1_in_type > 0:
-                logging.info(f"    Including {jan1_in_type} signals on Jan 1, 2024")
-                # Show first Jan 1 signal details
-                for s in signals_list:
-                    if s['entrydate'] == 240101:
-                        logging.info(f"      Jan 1 signal: entry={s['entrytime']}, exit={s['exittime']}, lots={s['lots']}")
-                        break
+            finalSignal[signalTypes[entryRow]].append(signal_info)
+
+        if signalPrices is not None:
+            logging.info(f"Signal prices found for {int((~np.isnan(signalPrices[entryRows])).sum())} entries and {int((~np.isnan(signalPrices[exitRows])).sum())} exits of {len(tradePairs)} trades")
+
+        logging.info(f"getTVIntraSignals returning signals: { {__type: len(__signals) for __type, __signals in finalSignal.items()} }")
+        if signalDiagnostics:
+            Util.logFinalSignalDiagnostics(finalSignal=finalSignal, diagnostics=signalDiagnostics)
         
         return finalSignal
     
@@ -1028,6 +1369,134 @@ class Util:
             
         return None  # Return None if no precise exit found
     
+    @staticmethod
+    def readExcelSheet(excelFilePath: str, sheetName: str) -> pd.DataFrame:
+        """Read a sheet through the workbook cache, a workbook is parsed once per (path, mtime, size) and callers get their own copy"""
+
+        if Util.WORKBOOK_CACHE_SIZE is None:
+            toggles = config.get_effective_toggles(logger=logging)
+            Util.WORKBOOK_SIDECAR_CACHE = toggles['WORKBOOK_SIDECAR_CACHE'] == "1"
+            Util.WORKBOOK_CACHE_SIZE = max(toggles['WORKBOOK_CACHE_SIZE'] or 0, 0)
+
+        if Util.WORKBOOK_CACHE_SIZE == 0:
+            if Util.WORKBOOK_SIDECAR_CACHE:
+                workbookSheets = Util.loadWorkbookSheets(excelFilePath=excelFilePath)
+                if sheetName not in workbookSheets:
+                    raise ValueError(f"Worksheet named '{sheetName}' not found")
+                return workbookSheets[sheetName]
+            return pd.read_excel(excelFilePath, sheet_name=sheetName)
+
+        fileStat = os.stat(excelFilePath)
+        workbookKey = (os.path.realpath(excelFilePath), fileStat.st_mtime_ns, fileStat.st_size)
+
+        with Util.WORKBOOK_CACHE_LOCK:
+            workbookSheets = Util.WORKBOOK_CACHE.get(workbookKey)
+            if workbookSheets is not None:
+                Util.WORKBOOK_CACHE.move_to_end(workbookKey)
+                Util.WORKBOOK_CACHE_STATS['hits'] += 1
+
+        if workbookSheets is None:
+
+            workbookSheets = Util.loadWorkbookSheets(excelFilePath=excelFilePath)
+
+            with Util.WORKBOOK_CACHE_LOCK:
+                Util.WORKBOOK_CACHE_STATS['misses'] += 1
+
+                # older versions of a rewritten file can never be hit again
+                for __key in [__key for __key in Util.WORKBOOK_CACHE if __key[0] == workbookKey[0]]:
+                    del Util.WORKBOOK_CACHE[__key]
+
+                Util.WORKBOOK_CACHE[workbookKey] = workbookSheets
+                while len(Util.WORKBOOK_CACHE) > Util.WORKBOOK_CACHE_SIZE:
+                    Util.WORKBOOK_CACHE.popitem(last=False)
+
+        if sheetName not in workbookSheets:
+            raise ValueError(f"Worksheet named '{sheetName}' not found")
+
+        return workbookSheets[sheetName].copy()
+
+    @staticmethod
+    def loadWorkbookSheets(excelFilePath: str) -> dict:
+        """Parse every sheet of a workbook, going through the Feather sidecar cache when WORKBOOK_SIDECAR_CACHE is on"""
+
+        if not Util.WORKBOOK_SIDECAR_CACHE:
+            return pd.read_excel(excelFilePath, sheet_name=None)
+
+        try:
+            import pyarrow.feather as feather
+        except ImportError:
+            logging.info("WORKBOOK_SIDECAR_CACHE is on but pyarrow is not installed, parsing workbook directly.")
+            return pd.read_excel(excelFilePath, sheet_name=None)
+
+        with open(excelFilePath, "rb") as f:
+            contentHash = hashlib.sha1(f.read()).hexdigest()[:16]
+
+        sidecarFolder = os.path.join(os.path.dirname(os.path.abspath(excelFilePath)), Util.WORKBOOK_SIDECAR_FOLDER)
+        sidecarPrefix = os.path.join(sidecarFolder, f"{os.path.basename(excelFilePath)}.{contentHash}")
+        manifestPath = f"{sidecarPrefix}.json"
+
+        if os.path.exists(manifestPath):
+            try:
+                with open(manifestPath, "r") as f:
+                    sheetNames = json.load(f)['sheets']
+
+                if sheetNames is None:
+                    return pd.read_excel(excelFilePath, sheet_name=None)
+
+                workbookSheets = {}
+                for sheetNo, sheetName in enumerate(sheetNames):
+                    sheetDf = feather.read_table(f"{sidecarPrefix}.{sheetNo}.feather", memory_map=True).to_pandas()
+                    # arrow hands back missing strings as None, read_excel gives NaN
+                    for __col in sheetDf.columns[sheetDf.dtypes == object]:
+                        sheetDf[__col] = sheetDf[__col].where(sheetDf[__col].notna(), np.nan)
+                    workbookSheets[sheetName] = sheetDf
+
+                return workbookSheets
+
+            except Exception:
+                logging.error(f"Unable to load sidecar cache of {excelFilePath}, parsing workbook. {traceback.format_exc()}")
+
+        workbookSheets = pd.read_excel(excelFilePath, sheet_name=None)
+
+        try:
+            os.makedirs(sidecarFolder, exist_ok=True)
+
+            # drop sidecars of earlier contents of this workbook
+            for __fileName in os.listdir(sidecarFolder):
+                if __fileName.startswith(f"{os.path.basename(excelFilePath)}.") and not __fileName.startswith(f"{os.path.basename(excelFilePath)}.{contentHash}."):
+                    os.remove(os.path.join(sidecarFolder, __fileName))
+
+            for sheetNo, sheetDf in enumerate(workbookSheets.values()):
+                feather.write_feather(sheetDf, f"{sidecarPrefix}.{sheetNo}.feather.tmp", compression="uncompressed")
+                os.replace(f"{sidecarPrefix}.{sheetNo}.feather.tmp", f"{sidecarPrefix}.{sheetNo}.feather")
+
+            # manifest is written last so that a partial sidecar is never picked up
+            with open(f"{manifestPath}.tmp", "w") as f:
+                json.dump({"source": os.path.basename(excelFilePath), "sheets": list(workbookSheets.keys())}, f)
+            os.replace(f"{manifestPath}.tmp", manifestPath)
+
+        except Exception as errormsg:
+            # sheets with mixed type columns can not be stored as Feather, such workbooks are marked and always parsed
+            logging.info(f"Unable to write sidecar cache of {excelFilePath}: {errormsg}")
+            try:
+                for __fileName in os.listdir(sidecarFolder):
+                    if __fileName.startswith(f"{os.path.basename(excelFilePath)}.{contentHash}."):
+                        os.remove(os.path.join(sidecarFolder, __fileName))
+
+                with open(manifestPath, "w") as f:
+                    json.dump({"source": os.path.basename(excelFilePath), "sheets": None}, f)
+            except Exception:
+                pass
+
+        return workbookSheets
+
+    @staticmethod
+    def getWorkbookCacheStats() -> dict:
+        """Workbook cache hit/miss counts since process start, a miss is one workbook parse"""
+
+        with Util.WORKBOOK_CACHE_LOCK:
+            return {**Util.WORKBOOK_CACHE_STATS, "workbooks": len(Util.WORKBOOK_CACHE)}
+
     @staticmethod
     def getPortfolioJson(excelFilePath: str, tvSignalInfoo: dict={}, strategyNamePrefix: str="") -> tuple:
 
@@ -1042,7 +1511,7 @@ class Util:
             logging.error(f"Unable to find input file, location: {excelFilePath}")
             return toReturnPortJson, toReturnStgyParaDf
         
-        portfolioShtDf = pd.read_excel(_resolved_path, sheet_name="PortfolioSetting")
+        portfolioShtDf = Util.readExcelSheet(excelFilePath=_resolved_path, sheetName="PortfolioSetting")
         portfolioShtDf = portfolioShtDf[portfolioShtDf['Multiplier'] > 0]
         portfolioShtDf = portfolioShtDf.reset_index(drop=True)
         
@@ -1061,7 +1530,7 @@ class Util:
         if portfolioShtDf.empty:
             return toReturnPortJson, toReturnStgyParaDf
 
-        strategyShtDf = pd.read_excel(_resolved_path, sheet_name="StrategySetting")
+        strategyShtDf = Util.readExcelSheet(excelFilePath=_resolved_path, sheetName="StrategySetting")
         for colName in ["Enabled", "PortfolioName"]:
             strategyShtDf[colName] = strategyShtDf[colName].str.upper()
         
@@ -1090,7 +1559,7 @@ class Util:
         # If explicit QA env set, uplift indicator-related rows even if not enabled in the Excel
         if str(os.environ.get('TV007_INDICATOR_EVIDENCE', '0')).strip().lower() in {'1','true','yes','on'}:
             # Re-read full sheet to find candidate rows and merge
-            strategyShtDf_full = pd.read_excel(_resolved_path, sheet_name="StrategySetting")
+            strategyShtDf_full = Util.readExcelSheet(excelFilePath=_resolved_path, sheetName="StrategySetting")
             for colName in ["Enabled", "PortfolioName"]:
                 strategyShtDf_full[colName] = strategyShtDf_full[colName].str.upper()
             strategyShtDf_full['StrategyExcelFilePath'] = strategyShtDf_full['StrategyExcelFilePath'].apply(_resolve_path)
@@ -1159,7 +1628,7 @@ class Util:
                     }
 
                 for keyy in ["GeneralParameter", "LegParameter"]:
-                    toReturnStgyParaDf[pIndex][keyy] = pd.concat([toReturnStgyParaDf[pIndex][keyy], pd.read_excel(sInfo['StrategyExcelFilePath'], sheet_name=keyy)])
+                    toReturnStgyParaDf[pIndex][keyy] = pd.concat([toReturnStgyParaDf[pIndex][keyy], Util.readExcelSheet(excelFilePath=sInfo['StrategyExcelFilePath'], sheetName=keyy)])
                     toReturnStgyParaDf[pIndex][keyy] = toReturnStgyParaDf[pIndex][keyy].reset_index(drop=True)
             
             if len(strategiesLst) == 0:
@@ -1282,7 +1751,8 @@ class Util:
                         "final_trail_time": Util.getSeconds(timesting=pInfo["SqOff2Time"]), "final_trail": float(pInfo['SqOff2Percent'])
                     }
                 })
-            
+        
+        logging.info(f"Workbook cache after reading {excelFilePath}: {Util.getWorkbookCacheStats()}")
         return toReturnPortJson, toReturnStgyParaDf
     
     @staticmethod
@@ -2004,12 +2474,12 @@ class Util:
 
         stgysParaForBt = []
 
-        userStgyParameters = pd.read_excel(excelFilePath, sheet_name="GeneralParameter")
+        userStgyParameters = Util.readExcelSheet(excelFilePath=excelFilePath, sheetName="GeneralParameter")
         # Restrict to NIFTY only for TV-007 evidence when requested
         if str(os.environ.get('TV007_INDICATOR_EVIDENCE', '0')).strip().lower() in {'1','true','yes','on'}:
             if 'Index' in userStgyParameters.columns:
                 userStgyParameters = userStgyParameters[userStgyParameters['Index'].astype(str).str.upper() == 'NIFTY']
-        userLegParameters = pd.read_excel(excelFilePath, sheet_name="LegParameter")
+        userLegParameters = Util.readExcelSheet(excelFilePath=excelFilePath, sheetName="LegParameter")
         if isTvBasedPortfolio:
             userLegParameters['Lots'] = tvSignalInfoo['lots']
 
@@ -2146,6 +2616,16 @@ class Util:
 
         return stgysParaForBt
 
+    @staticmethod
+    def getLongestRun(mask: np.ndarray) -> int:
+        """Length of the longest run of True values in a boolean array"""
+
+        if not mask.any():
+            return 0
+
+        boundaries = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+        return int((boundaries[1::2] - boundaries[::2]).max())
+
     @staticmethod
     def getBacktestStats(tradesDf: pd.DataFrame, initialCapital: float):
         """This function is used to prepare backtesting stats"""
@@ -2153,97 +2633,63 @@ class Util:
         number_of_trading_days_in_a_year = 252
         risk_free_interest_rate = 5
 
-        intraday_trade_log = tradesDf[["entryDate", "bookedPnL"]].rename(columns={"entryDate": "Date", "bookedPnL": "PNL"})
-        intraday_trade_log['Day'] = intraday_trade_log['Date'].apply(lambda x: x.strftime("%A"))
-        intraday_trade_log['Month'] = intraday_trade_log['Date'].apply(lambda x: x.strftime("%b"))
-        intraday_trade_log = intraday_trade_log[["Date", "Day", "Month", "PNL"]]
-
-        monthly_df = intraday_trade_log.groupby(by=["Month"], as_index=False).sum(numeric_only=True)
-        monthly_df.rename(columns={"bookedPnL":"PNL"}, inplace=True)
-        
-        # Convert PNL data to tensor
-        pnl_tensor = Util.to_tensor(intraday_trade_log['PNL'].values)
-        
-        # Initialize tensors for equity and rate of return calculations
-        equity_tensor = torch.zeros_like(pnl_tensor)
-        rate_of_return_tensor = torch.zeros_like(pnl_tensor)
-        
-        # Calculate equity and rate of return using tensor operations
-        equity_tensor[0] = initialCapital + pnl_tensor[0]
-        rate_of_return_tensor[0] = (pnl_tensor[0]/initialCapital) * 100
-        
-        for i in range(1, len(pnl_tensor)):
-            equity_tensor[i] = equity_tensor[i-1] + pnl_tensor[i]
-            rate_of_return_tensor[i] = (pnl_tensor[i]/equity_tensor[i-1]) * 100
-            
-        # Convert results back to DataFrame columns
-        intraday_trade_log['Equity'] = Util.from_tensor(equity_tensor)
-        intraday_trade_log['Rate_of_Return'] = Util.from_tensor(rate_of_return_tensor)
-        intraday_trade_log['Continuous_Wins'] = 0.0
-        intraday_trade_log['Continuous_Losses'] = 0.0
-
-        # Calculate win rate using tensor operations
-        positive_pnl_mask = pnl_tensor > 0
-        win_rate = torch.sum(positive_pnl_mask).item() / len(pnl_tensor)
-
-        # Calculate mean win/loss using tensor operations
-        mean_win = torch.mean(pnl_tensor[positive_pnl_mask]).item()
-        mean_loss = torch.mean(pnl_tensor[~positive_pnl_mask]).item()
-        risk_reward = abs(mean_win/mean_loss) if mean_loss != 0 else float('inf')
-        expectancy = (win_rate*risk_reward) - ((1-win_rate)*1)
-        
-        # Calculate Sharpe and Sortino ratios using tensor operations
-        mean = torch.mean(rate_of_return_tensor).item() * number_of_trading_days_in_a_year - risk_free_interest_rate
-        sigma = torch.std(rate_of_return_tensor).item() * torch.sqrt(torch.tensor(number_of_trading_days_in_a_year)).item()
-        sharpe_ratio = mean/sigma if sigma != 0 else 0
-        
-        negative_returns_mask = rate_of_return_tensor < 0
-        downside_standard_deviation = torch.std(rate_of_return_tensor[negative_returns_mask]).item() * torch.sqrt(torch.tensor(number_of_trading_days_in_a_year)).item()
-        sortino_ratio = mean/downside_standard_deviation if downside_standard_deviation != 0 else 0
-        
-        # Calculate drawdown using tensor operations
-        cummax_pnl = torch.cummax(pnl_tensor, dim=0)[0]
-        drawdown_tensor = pnl_tensor - cummax_pnl
-        max_drawdown = torch.min(drawdown_tensor).item()
-        
-        max_drawdown_idx = torch.argmin(drawdown_tensor).item()
-        max_drawdown_percent = max_drawdown/equity_tensor[max_drawdown_idx]*100
-
-        # Calculate recovery days
-        recovery_tensor = torch.zeros_like(drawdown_tensor)
-        for i in range(1, len(drawdown_tensor)):
-            if drawdown_tensor[i] < 0:
-                recovery_tensor[i] = recovery_tensor[i-1] + 1
-                
-        intraday_trade_log['Recovery'] = Util.from_tensor(recovery_tensor)
-        
-        intraday_trade_log_equity_high = intraday_trade_log[intraday_trade_log['Recovery'] == 0]
-        intraday_trade_log_equity_high['number_days_between_equity_highs'] = (intraday_trade_log_equity_high['Date'] - intraday_trade_log_equity_high['Date'].shift())
-        recover = intraday_trade_log_equity_high['number_days_between_equity_highs'].apply(lambda x: x.days if not pd.isnull(x) else None).max()
-        recovery_days = np.nan if pd.isnull(recover) else int(recover)
-        
-        # Calculate CAGR using tensor operations
-        number_of_trading_days_for_this_backtest = (intraday_trade_log.iloc[-1]['Date'] - intraday_trade_log.iloc[0]['Date']).days
-        if number_of_trading_days_for_this_backtest != 0:
-            cagr = (((equity_tensor[-1]/initialCapital)**(1/(number_of_trading_days_for_this_backtest/365)))-1)*100
-            cagr = cagr.item()
-        else:
-            cagr = 0
-            
-        calmar_ratio = 0 if max_drawdown_percent == 0 else abs(cagr/max_drawdown_percent)
-        
-        # Calculate trade statistics using tensor operations
-        number_of_wins = torch.sum(positive_pnl_mask).item()
-        number_of_losses = len(pnl_tensor) - number_of_wins
-        average_profit_per_trade = torch.mean(pnl_tensor[positive_pnl_mask]).item()
-        average_loss_per_trade = torch.mean(pnl_tensor[~positive_pnl_mask]).item()
-        max_pnl = torch.max(pnl_tensor).item()
-        min_pnl = torch.min(pnl_tensor).item()
-        median_of_trade = torch.median(pnl_tensor).item()
-        
-        gross_profit = torch.sum(pnl_tensor[positive_pnl_mask]).item()
-        gross_loss = torch.sum(pnl_tensor[~positive_pnl_mask]).item()
-        
+        tradeDates = tradesDf['entryDate'].reset_index(drop=True)
+        pnl = tradesDf['bookedPnL'].to_numpy(dtype=np.float64)
+
+        with np.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+
+            # Equity after each day and return on the equity the day started with
+            equity = initialCapital + np.cumsum(pnl)
+            openingEquity = np.concatenate(([initialCapital], equity[:-1]))
+            rate_of_return = (pnl / openingEquity) * 100
+
+            positive_pnl_mask = pnl > 0
+            win_rate = int(positive_pnl_mask.sum()) / len(pnl)
+
+            mean_win = float(np.mean(pnl[positive_pnl_mask]))
+            mean_loss = float(np.mean(pnl[~positive_pnl_mask]))
+            risk_reward = abs(mean_win/mean_loss) if mean_loss != 0 else float('inf')
+            expectancy = (win_rate*risk_reward) - ((1-win_rate)*1)
+
+            # Sharpe and Sortino ratios, sample standard deviation
+            mean = float(np.mean(rate_of_return)) * number_of_trading_days_in_a_year - risk_free_interest_rate
+            sigma = float(np.std(rate_of_return, ddof=1)) * np.sqrt(number_of_trading_days_in_a_year)
+            sharpe_ratio = mean/sigma if sigma != 0 else 0
+
+            downside_standard_deviation = float(np.std(rate_of_return[rate_of_return < 0], ddof=1)) * np.sqrt(number_of_trading_days_in_a_year)
+            sortino_ratio = mean/downside_standard_deviation if downside_standard_deviation != 0 else 0
+
+            # Drawdown is measured against the running maximum of daily pnl
+            drawdown = pnl - np.maximum.accumulate(pnl)
+            max_drawdown_idx = int(np.argmin(drawdown))
+            max_drawdown = float(drawdown[max_drawdown_idx])
+            max_drawdown_percent = max_drawdown/equity[max_drawdown_idx]*100
+
+            # Days between consecutive equity highs, first day always counts as a high
+            equityHighMask = ~(drawdown < 0)
+            equityHighMask[0] = True
+            recover = pd.to_datetime(tradeDates[equityHighMask]).diff().dt.days.max()
+            recovery_days = np.nan if pd.isnull(recover) else int(recover)
+
+            number_of_trading_days_for_this_backtest = (tradeDates.iloc[-1] - tradeDates.iloc[0]).days
+            if number_of_trading_days_for_this_backtest != 0:
+                cagr = float((((equity[-1]/initialCapital)**(1/(number_of_trading_days_for_this_backtest/365)))-1)*100)
+            else:
+                cagr = 0
+
+            calmar_ratio = 0 if max_drawdown_percent == 0 else abs(cagr/max_drawdown_percent)
+
+            number_of_wins = int(positive_pnl_mask.sum())
+            number_of_losses = len(pnl) - number_of_wins
+            max_pnl = float(np.max(pnl))
+            min_pnl = float(np.min(pnl))
+            # Lower median, matches torch.median on even length series
+            median_of_trade = float(np.partition(pnl, (len(pnl)-1)//2)[(len(pnl)-1)//2])
+
+            gross_profit = float(pnl[positive_pnl_mask].sum())
+            gross_loss = float(pnl[~positive_pnl_mask].sum())
+
         if gross_loss != 0:
             profit_factor = abs(gross_profit/gross_loss)
             outlier_adjusted_profit_factor = abs((gross_profit-max_pnl)/gross_loss)
@@ -2251,26 +2697,20 @@ class Util:
             profit_factor = 0.0
             outlier_adjusted_profit_factor = 0.0
 
-        # Calculate continuous wins/losses
-        for i in range(1, len(pnl_tensor)):
-            if pnl_tensor[i-1] > 0:
-                intraday_trade_log['Continuous_Wins'].iloc[i] = intraday_trade_log['Continuous_Wins'].iloc[i-1]+1
-            if pnl_tensor[i-1] < 0:
-                intraday_trade_log['Continuous_Losses'].iloc[i] = intraday_trade_log['Continuous_Losses'].iloc[i-1]+1
-
-        consecutive_wins = intraday_trade_log['Continuous_Wins'].max()
-        consecutive_losses = intraday_trade_log['Continuous_Losses'].max()
+        # Streaks are counted on the days preceding the last one
+        consecutive_wins = float(Util.getLongestRun(mask=pnl[:-1] > 0))
+        consecutive_losses = float(Util.getLongestRun(mask=pnl[:-1] < 0))
 
         metrics = {
-            'Backtest Start Date': intraday_trade_log.iloc[0]['Date'], 
-            'Backtest End Date': intraday_trade_log.iloc[-1]['Date'], 
+            'Backtest Start Date': tradeDates.iloc[0], 
+            'Backtest End Date': tradeDates.iloc[-1], 
             "Margin Required": initialCapital,
-            'Number of Trading Days': intraday_trade_log.shape[0], 
+            'Number of Trading Days': len(pnl), 
             'Number of +ve days': number_of_wins, 
             'Number of -ve days': number_of_losses, 
-            'Total PnL': round(float(Util.from_tensor(torch.sum(pnl_tensor))), 2),
-            'Average Profit': round(float(average_profit_per_trade), 2),
-            'Average Loss': round(average_loss_per_trade, 2),
+            'Total PnL': round(float(pnl.sum()), 2),
+            'Average Profit': round(float(mean_win), 2),
+            'Average Loss': round(mean_loss, 2),
             'Maximum Trade Profit': round(max_pnl, 2),
             'Maximum Trade Loss': round(min_pnl, 2),
             'Median Trade': round(median_of_trade, 2),
@@ -2314,16 +2754,7 @@ class Util:
             
             finalResult.append(yrBifurcation)
 
-        finalResult = pd.DataFrame(finalResult)
-
-        totalRecord = pd.DataFrame(finalResult.sum()).transpose()
-        totalRecord['Year'] = 'Total'
-        
-        finalResult = pd.concat([finalResult, totalRecord])
-        finalResult = finalResult.reset_index(drop=True)
-        finalResult['Total'] = finalResult.drop(columns=['Year']).sum(axis=1)
-
-        return finalResult
+        return Util.addYearWiseTotals(finalResult=pd.DataFrame(finalResult))
 
     @staticmethod
     def getMonthWiseStats(tradesDf: pd.DataFrame) -> pd.DataFrame:
@@ -2348,7 +2779,11 @@ class Util:
             
             finalResult.append(yrBifurcation)
 
-        finalResult = pd.DataFrame(finalResult)
+        return Util.addYearWiseTotals(finalResult=pd.DataFrame(finalResult))
+
+    @staticmethod
+    def addYearWiseTotals(finalResult: pd.DataFrame) -> pd.DataFrame:
+        """Append Total row and Total column to a year bifurcation table"""
 
         totalRecord = pd.DataFrame(finalResult.sum()).transpose()
         totalRecord['Year'] = 'Total'
@@ -2359,6 +2794,111 @@ class Util:
 
         return finalResult
 
+    @staticmethod
+    def getPeriodWiseStatsByKey(dailyPnlDf: pd.DataFrame, period: str) -> dict:
+        """Day wise (period="day") or month wise (period="month") year bifurcation of every key in a long (key, entryDate, bookedPnL) frame, 
+        aggregated in a single groupby and then split per key"""
+
+        entryDates = pd.to_datetime(dailyPnlDf['entryDate'])
+        if period == "day":
+            periodNames, periodLabels = config.VALID_TRADING_WEEKDAYS, entryDates.dt.day_name()
+        else:
+            periodNames, periodLabels = config.VALID_MONTHS, entryDates.dt.month_name()
+
+        periodPnl = dailyPnlDf[['key', 'bookedPnL']].assign(Year=entryDates.dt.year.astype("int64"), period=periodLabels)
+        periodPnl = periodPnl.groupby(by=['key', 'Year', 'period'])['bookedPnL'].sum().unstack('period')
+        periodPnl = periodPnl.reindex(columns=periodNames)
+
+        periodWiseStats = {}
+        for __key in dailyPnlDf['key'].unique():
+
+            __keyPnl = periodPnl.loc[__key]
+            # periods this key never traded in stay integer zero, as in getDayWiseStats/getMonthWiseStats
+            neverTraded = __keyPnl.columns[__keyPnl.isna().all()]
+            __keyPnl = __keyPnl.fillna(0)
+            for __col in neverTraded:
+                __keyPnl[__col] = 0
+
+            __keyPnl = __keyPnl.reset_index()
+            __keyPnl.columns.name = None
+
+            periodWiseStats[__key] = Util.addYearWiseTotals(finalResult=__keyPnl)
+
+        return periodWiseStats
+
+    @staticmethod
+    def getPeriodTablesByKey(dailyPnlDf: pd.DataFrame, keyMargins: dict) -> dict:
+        """Day, month and margin percent wise tables of every key in a long (key, entryDate, bookedPnL) frame, margin percent against keyMargins"""
+
+        tableMargin = dailyPnlDf['key'].map(lambda x: keyMargins.get(x, 0))
+        marginWiseDf = dailyPnlDf[tableMargin != 0].copy()
+        marginWiseDf['bookedPnL'] = (marginWiseDf['bookedPnL'] / tableMargin[tableMargin != 0]) * 100
+
+        marginPercentWise = Util.getPeriodWiseStatsByKey(dailyPnlDf=marginWiseDf, period="month")
+        for __key in dailyPnlDf.loc[tableMargin == 0, 'key'].unique():
+            zeroMarginDf = dailyPnlDf.loc[dailyPnlDf['key'] == __key, ['entryDate']].assign(bookedPnL=0)
+            marginPercentWise[__key] = Util.getMonthWiseStats(tradesDf=zeroMarginDf)
+
+        return {
+            "dayWise": Util.getPeriodWiseStatsByKey(dailyPnlDf=dailyPnlDf, period="day"), 
+            "monthWise": Util.getPeriodWiseStatsByKey(dailyPnlDf=dailyPnlDf, period="month"), 
+            "marginPercentWise": {__key: marginPercentWise[__key] for __key in dailyPnlDf['key'].unique()}
+        }
+
+    @staticmethod
+    def getStrategyWiseResults(parsedOrderDf: pd.DataFrame, marginReqByEachStgy: dict, strategyWiseTables: bool = True, onResult=None) -> dict:
+        """Stats, transactions and day/month/margin wise tables of every strategy and of the combined portfolio, from one pass over the order frame.
+        Tables are keyed by strategy name plus "portfolio", stats are the Particulars table with Combined first.
+        With onResult, stats and tables are built key by key instead ("portfolio" first) and onResult is called as soon as each key is ready, 
+        with the getStrategyStreamEvent arguments of that key"""
+
+        # daily booked pnl of every strategy in long form, (strategy, entryDate) sorted
+        dailyPnlDf = parsedOrderDf[['strategy', 'entry_datetime', 'netPnlAfterExpenses']].copy()
+        dailyPnlDf['entry_datetime'] = dailyPnlDf['entry_datetime'].dt.date
+        dailyPnlDf = dailyPnlDf.groupby(by=['strategy', 'entry_datetime'], as_index=False)['netPnlAfterExpenses'].sum()
+        dailyPnlDf = dailyPnlDf.rename(columns={"strategy": "key", "entry_datetime": "entryDate", 'netPnlAfterExpenses': "bookedPnL"})
+
+        portfolioPnLDf = dailyPnlDf.groupby(by=['entryDate'], as_index=False)['bookedPnL'].sum()
+        portfolioMargin = sum(list(marginReqByEachStgy.values()))
+        keyMargins = {**marginReqByEachStgy, "portfolio": portfolioMargin}
+
+        stgywiseTransactionDf = {"portfolio": parsedOrderDf.sort_values(by=['strategy'], kind="stable").reset_index(drop=True)}
+        for __stgy, __stgyOrders in parsedOrderDf.groupby(by=['strategy'], sort=True):
+            stgywiseTransactionDf[__stgy[0]] = __stgyOrders
+
+        stgyPnlDfs = [("portfolio", portfolioPnLDf.assign(key="portfolio"))]
+        stgyPnlDfs += [(__stgy[0], __stgyPnL) for __stgy, __stgyPnL in dailyPnlDf.groupby(by=['key'], sort=True)]
+
+        stgyStats, periodTables = {}, {"dayWise": {}, "monthWise": {}, "marginPercentWise": {}}
+        for __key, __pnlDf in stgyPnlDfs:
+            
+            statsColumn = "Combined" if __key == "portfolio" else __key
+            stgyStats[statsColumn] = Util.getBacktestStats(tradesDf=__pnlDf[['entryDate', 'bookedPnL']], initialCapital=keyMargins.get(__key, 0))
+            if onResult is None:
+                continue
+
+            # portfolio and, when asked for, every strategy get the year bifurcation tables
+            if (__key == "portfolio") or strategyWiseTables:
+                for __table, __tableByKey in Util.getPeriodTablesByKey(dailyPnlDf=__pnlDf, keyMargins=keyMargins).items():
+                    periodTables[__table].update(__tableByKey)
+
+            keyStatsDf = pd.DataFrame({statsColumn: pd.Series(stgyStats[statsColumn], dtype=object)}).rename_axis("Particulars").reset_index()
+            onResult(
+                strategyName=__key, statsDf=keyStatsDf, dayWiseDf=periodTables['dayWise'].get(__key, pd.DataFrame()), 
+                monthWiseDf=periodTables['monthWise'].get(__key, pd.DataFrame()), marginPercentWiseDf=periodTables['marginPercentWise'].get(__key, pd.DataFrame()), 
+                statsColumn=statsColumn
+            )
+
+        if onResult is None:
+            tablePnlDf = dailyPnlDf if strategyWiseTables else dailyPnlDf.iloc[0:0]
+            tablePnlDf = pd.concat([tablePnlDf, portfolioPnLDf.assign(key="portfolio")], ignore_index=True)
+            periodTables = Util.getPeriodTablesByKey(dailyPnlDf=tablePnlDf, keyMargins=keyMargins)
+
+        finalStatsDf = pd.DataFrame({__name: pd.Series(__metrics, dtype=object) for __name, __metrics in stgyStats.items()})
+        finalStatsDf = finalStatsDf.rename_axis("Particulars").reset_index()
+
+        return {"statsDf": finalStatsDf, "transactions": stgywiseTransactionDf, **periodTables}
+
     @staticmethod
     def getBacktestResults(btPara: dict) -> dict:
 
@@ -2406,7 +2946,8 @@ class Util:
                          f"entry_search_interval={btPara_processed['entry_search_interval']}, "
                          f"entry_price_source={btPara_processed['entry_price_source']}")
             
-            btResp = requests.post(urii, json=btPara_processed, timeout=30)
+            requestBody, requestHeaders = Util.encodeEngineRequest(btPara=btPara_processed)
+            btResp = Util.getEngineSession(urii=urii).post(urii, data=requestBody, headers=requestHeaders, timeout=30)
             
             # Check response status
             if btResp.status_code != 200:
@@ -2414,18 +2955,25 @@ class Util:
                 logging.error(f"Response: {btResp.text[:500]}")
                 respp = {}
             else:
-                respp = btResp.json() or {}
+                respp = Util.decodeEngineResponse(btResp=btResp) or {}
                 # Always retain response structure, even if orders are empty,
                 # so Excel generation can proceed with metrics and empty Trans sheets.
                 strategies = respp.get('strategies', {})
                 orders_list = strategies.get('orders', []) if isinstance(strategies, dict) else []
 
-                # Normalize orders into records (attach portfolio_name) if present
+                # Attach portfolio_name to orders if present, records are tagged in place and columnar bodies go straight to a frame
                 try:
-                    if isinstance(orders_list, list) and len(orders_list) > 0:
-                        orders_df = pd.DataFrame(orders_list)
-                        orders_df['portfolio_name'] = btPara['portfolio']['name']
-                        strategies['orders'] = orders_df.to_dict('records')
+                    if not isinstance(orders_list, list):
+                        orders_list = Util.getOrdersFrame(orders=orders_list)
+
+                    if len(orders_list) > 0:
+                        if isinstance(orders_list, list):
+                            for __order in orders_list:
+                                __order['portfolio_name'] = btPara['portfolio']['name']
+                        else:
+                            orders_list['portfolio_name'] = btPara['portfolio']['name']
+
+                        strategies['orders'] = orders_list
                         respp['strategies'] = strategies
                         logging.info(f"Backend returned {len(strategies['orders'])} orders")
                     else:
@@ -2445,548 +2993,1469 @@ class Util:
         logging.info(f"{endTime}, Completed backtesting portfolio: {btPara['portfolio']['id']}, Time taken: {durationn} \n")
         
         return respp
-    
+
     @staticmethod
-    def getMarginFor(position: list) -> float:
+    def getEngineWireSettings() -> dict:
+        """
+        Request encoding and response format negotiated with the engine, resolved once per process (at worker start, see startWorkerServices).
+        Values needing an optional package that is not installed are rejected with an error log and plain JSON is used instead.
+        """
 
-        for ii in range(1,3):
+        if not Util.ENGINE_WIRE_SETTINGS:
 
-            try:
+            toggles = config.get_effective_toggles(logger=logging)
 
-                r1 = requests.post(
-                    url="https://margin-calc-arom-prod.angelbroking.com/margin-calculator/SPAN", headers=Util.MARGIN_REQ_HEADERS, json={"position": position}
-                )
-                if r1.status_code != 200:
-                    logging.error(f"Unable to fetch margin, received following response: {r1.text}, {position}")
-                    time.sleep(1)
-                    continue
+            requestEncoding = toggles['ENGINE_REQUEST_ENCODING'].strip().lower()
+            if requestEncoding not in ["", "gzip", "zstd"]:
+                logging.info(f"Invalid ENGINE_REQUEST_ENCODING received i.e. {requestEncoding}, sending plain JSON.")
+                requestEncoding = ""
 
-                resp = r1.json()['margin']
-                return resp['netPremium'] if resp['totalMargin'] == 0 else resp['totalMargin']
+            responseFormat = toggles['ENGINE_RESPONSE_FORMAT'].strip().lower()
+            if responseFormat not in Util.ENGINE_RESPONSE_ACCEPT:
+                logging.info(f"Invalid ENGINE_RESPONSE_FORMAT received i.e. {responseFormat}, requesting JSON.")
+                responseFormat = "json"
 
-            except Exception:
-                logging.error(traceback.format_exc())
-                time.sleep(ii)
-        
-        return 0
-    
-    @staticmethod
-    def parseBacktestingResponse(btResponse: dict, slippagePercent: float) -> tuple:
-        
-        if len(btResponse['orders']) == 0:
-            return pd.DataFrame(), {}, pd.DataFrame()
-        
-        orderdf = pd.DataFrame(btResponse['orders'])
-        if orderdf.empty:
-            return pd.DataFrame(), {}, pd.DataFrame()
+            missingModules = [__module for __module in Util.ENGINE_WIRE_MODULES.get(requestEncoding, []) if importlib.util.find_spec(__module) is None]
+            if missingModules:
+                logging.error(f"ENGINE_REQUEST_ENCODING {requestEncoding} needs {', '.join(missingModules)} (requirements-optional.txt), sending plain JSON.")
+                requestEncoding = ""
 
-        orderdf = orderdf.rename(columns={
-            "entry_time": "entry_datetime", "exit_time": "exit_datetime", "option_type": "instrument_type", "qty": "filled_quantity", 
-            "entry_number": "re_entry_no", "strategy_name": "strategy", "original_tv_exit_time": "original_tv_exit"
-        })
+            missingModules = [__module for __module in Util.ENGINE_WIRE_MODULES.get(responseFormat, []) if importlib.util.find_spec(__module) is None]
+            if missingModules:
+                logging.error(f"ENGINE_RESPONSE_FORMAT {responseFormat} needs {', '.join(missingModules)} (requirements-optional.txt), requesting JSON.")
+                responseFormat = "json"
 
-        # Precision timing post-fix (client-side correction):
-        # If precision mode is enabled, force next-bar OPEN for both entry and time-exit pricing
-        # to counteract any backend that still returns same-bar fills.
-        try:
-            import os as _os
-            import mysql.connector as _mysql
-            try:
-                import config as _AppConfig
-                _freq = int(getattr(_AppConfig, 'BT_FREQUENCY', 60))
-            except Exception:
-                _AppConfig = None
-                _freq = int(_os.environ.get('BT_FREQUENCY', _os.environ.get('BTFREQUENCY', '60')))
-
-            _precision_mode = (int(_os.environ.get('DB_EXECUTE_AT_DETECTION', '0')) == 1) or (_os.environ.get('DB_EXECUTION_PRICE','OPEN').upper() == 'CLOSE')
-            if _precision_mode and not orderdf.empty:
-                # Build a small cache for option opens to minimize DB hits
-                _cache = {}
-                def _yyMMdd(d):
-                    return int(pd.to_datetime(d).strftime('%y%m%d'))
-                def _sec_of_day(dt):
-                    t = pd.to_datetime(dt)
-                    return t.hour*3600 + t.minute*60 + t.second
-                def _tbl(sym, inst):
-                    return f"{str(sym).lower()}_call" if str(inst).upper().startswith('C') else f"{str(sym).lower()}_put"
-                def _fetch_open(sym, inst, date_i, time_i, expiry_i, strike_i):
-                    key = (sym, inst, date_i, time_i, expiry_i, strike_i)
-                    if key in _cache:
-                        return _cache[key]
-                    q = ("SELECT open FROM " + _tbl(sym, inst) +
-                         " WHERE date=%s AND time=%s AND expiry=%s AND strike=%s LIMIT 1")
-                    _cur.execute(q, (date_i, time_i, expiry_i, int(strike_i)))
-                    r = _cur.fetchall()
-                    val = None
-                    if r:
-                        val = float(r[0][0]) / 100.0
-                    _cache[key] = val
-                    return val
-
-                # Open DB connection once
-                if _AppConfig:
-                    _conn = _mysql.connect(host=_AppConfig.MYSQL_HOST, user=_AppConfig.MYSQL_USER, password=_AppConfig.MYSQL_PASSWORD, database=_AppConfig.MYSQL_DATABASE)
-                else:
-                    _conn = _mysql.connect(host=_os.environ.get('MYSQL_HOST','106.51.63.60'), user=_os.environ.get('MYSQL_USER','mahesh'), password=_os.environ.get('MYSQL_PASSWORD','mahesh_123'), database=_os.environ.get('MYSQL_DATABASE','historicaldb'))
-                _cur = _conn.cursor()
+            Util.ENGINE_WIRE_SETTINGS = {"requestEncoding": requestEncoding, "responseFormat": responseFormat}
 
-                # Iterate orders and correct prices to next-minute OPEN
-                for idx, row in orderdf.iterrows():
-                    try:
-                        sym = row.get('symbol')
-                        inst = row.get('instrument_type')
-                        strike = row.get('strike')
-                        expiry_dt = row.get('expiry')  # already date()
-                        if pd.isna(sym) or pd.isna(inst) or pd.isna(strike) or pd.isna(expiry_dt):
-                            continue
-                        expiry_i = int(pd.to_datetime(expiry_dt).strftime('%y%m%d'))
-                        # Entry correction
-                        et = row.get('entry_datetime')
-                        if pd.notna(et):
-                            date_i = _yyMMdd(pd.to_datetime(et).date())
-                            detect_ts = _sec_of_day(et)
-                            exec_ts = detect_ts + _freq
-                            next_open = _fetch_open(sym, inst, date_i, exec_ts, expiry_i, strike)
-                            if next_open is not None:
-                                orderdf.at[idx, 'entry_price'] = next_open
-                        # Exit correction (only for time-exit to be conservative)
-                        rsn = str(row.get('reason',''))
-                        xt = row.get('exit_datetime')
-                        if pd.notna(xt) and 'Exit Time Hit' in rsn:
-                            date_i = _yyMMdd(pd.to_datetime(xt).date())
-                            detect_ts = _sec_of_day(xt)
-                            exec_ts = detect_ts + _freq
-                            next_open = _fetch_open(sym, inst, date_i, exec_ts, expiry_i, strike)
-                            if next_open is not None:
-                                orderdf.at[idx, 'exit_price'] = next_open
-                    except Exception:
-                        continue
-                try:
-                    _cur.close(); _conn.close()
-                except Exception:
-                    pass
-                try:
-                    import logging as _logging
-                    _logging.info(f"[PRECISION_FIX] Response correction applied (parse): freq={_freq}")
-                except Exception:
-                    pass
-        except Exception:
-            # Non-fatal: if DB unavailable or any issue, keep backend values
-            pass
+        return Util.ENGINE_WIRE_SETTINGS
 
-        orderdf['entry_price_slippage'] = np.where(
-            orderdf['side'] == "SELL", orderdf['entry_price'] * (1 - slippagePercent), orderdf['entry_price'] * (1 + slippagePercent)
-        )
+    @staticmethod
+    def encodeEngineRequest(btPara: dict) -> tuple:
+        """Serialise engine payload into (body, headers), compressing it when ENGINE_REQUEST_ENCODING is set"""
 
-        orderdf['exit_price_slippage'] = np.where(
-            orderdf['side'] == "SELL", orderdf['exit_price'] * (1 + slippagePercent), orderdf['exit_price'] * (1 - slippagePercent)
-        )
+        wireSettings = Util.getEngineWireSettings()
 
-        # Persist slippage percent per row so later Excel-stage recomputation can reuse it
-        orderdf['slippage_percent'] = float(slippagePercent)
+        requestBody = json.dumps(btPara, allow_nan=False).encode("utf-8")
+        requestHeaders = {"Content-Type": "application/json", "Accept": Util.ENGINE_RESPONSE_ACCEPT[wireSettings['responseFormat']]}
 
-        orderdf['pointsAfterSlippage'] = np.where(
-            orderdf['side'] == "SELL", orderdf['entry_price_slippage'] - orderdf['exit_price_slippage'], orderdf['exit_price_slippage'] - orderdf['entry_price_slippage']
-        )
-        orderdf['pnlAfterSlippage'] = orderdf['pointsAfterSlippage'] * orderdf['filled_quantity']
+        if wireSettings['responseFormat'] == "arrow":
+            requestHeaders['X-Orders-Format'] = "arrow"
 
-        orderdf['points'] = np.where(
-            orderdf['side'] == "SELL", orderdf['entry_price'] - orderdf['exit_price'], orderdf['exit_price'] - orderdf['entry_price']
-        )
-        
-        if config.TAXES != 0:
-            orderdf['expenses'] = orderdf['entry_price_slippage'] + orderdf['exit_price_slippage']
-            orderdf['expenses'] *= orderdf['filled_quantity']
-            orderdf['expenses'] *= config.TAXES
-        else:
-            orderdf['expenses'] = 0
-        
-        orderdf['netPnlAfterExpenses'] = orderdf['pnlAfterSlippage'] - orderdf['expenses']
+        if wireSettings['requestEncoding'] == "gzip":
+            requestBody = gzip.compress(requestBody, compresslevel=5)
+            requestHeaders['Content-Encoding'] = "gzip"
 
-        for columnName in ["entry", "exit"]:
+        elif wireSettings['requestEncoding'] == "zstd":
+            import zstandard
+            requestBody = zstandard.ZstdCompressor(level=3).compress(requestBody)
+            requestHeaders['Content-Encoding'] = "zstd"
 
-            orderdf[f'{columnName}_datetime'] = pd.to_datetime(orderdf[f'{columnName}_datetime'], format="%a, %d %b %Y %H:%M:%S GMT")
+        return requestBody, requestHeaders
 
-            orderdf[f'{columnName}_date'] = orderdf[f'{columnName}_datetime'].dt.date
-            orderdf[f'{columnName}_time'] = orderdf[f'{columnName}_datetime'].dt.time
-            orderdf[f'{columnName}_day'] = orderdf[f'{columnName}_datetime'].dt.strftime("%A")
-        
-        orderdf['expiry'] = orderdf['expiry'].apply(lambda x: datetime.strptime(str(int(x)), "%y%m%d"))
-        orderdf['expiry'] = orderdf['expiry'].dt.date
-        orderdf['strike'] = orderdf['strike'].astype(float).astype(int)
+    @staticmethod
+    def decodeEngineResponse(btResp: requests.Response) -> dict:
+        """Decode engine response by its Content-Type, gzip/zstd content-encoding is already undone by requests"""
 
-        # Secondary precision correction using derived entry/exit times
-        try:
-            import os as _os
-            from app.config import Config as _AppConfig
-            import mysql.connector as _mysql
-            _precision_mode = (int(_os.environ.get('DB_EXECUTE_AT_DETECTION', '0')) == 1) or (_os.environ.get('DB_EXECUTION_PRICE','OPEN').upper() == 'CLOSE')
-            if _precision_mode and not orderdf.empty:
-                _conn = _mysql.connect(host=_AppConfig.MYSQL_HOST, user=_AppConfig.MYSQL_USER, password=_AppConfig.MYSQL_PASSWORD, database=_AppConfig.MYSQL_DATABASE)
-                _cur = _conn.cursor()
-                _cache = {}
-                def _tbl(sym, inst):
-                    return f"{str(sym).lower()}_call" if str(inst).upper().startswith('C') else f"{str(inst).lower()}" if '_' in str(inst) else f"{str(sym).lower()}_put"
-                def _fetch(sym, inst, date_i, ts, expiry_i, strike_i):
-                    key=(sym,inst,date_i,ts,expiry_i,strike_i)
-                    if key in _cache: return _cache[key]
-                    table = f"{str(sym).lower()}_call" if str(inst).upper().startswith('C') else f"{str(sym).lower()}_put"
-                    _cur.execute(f"SELECT open FROM {table} WHERE date=%s AND time=%s AND expiry=%s AND strike=%s LIMIT 1", (date_i, ts, expiry_i, int(strike_i)))
-                    r=_cur.fetchall(); val=None
-                    if r: val = float(r[0][0])/100.0
-                    _cache[key]=val; return val
-                _e,_x=0,0
-                for idx,row in orderdf.iterrows():
-                    try:
-                        sym=row.get('symbol'); inst=row.get('instrument_type'); strike=row.get('strike'); expiry=row.get('expiry')
-                        if pd.isna(sym) or pd.isna(inst) or pd.isna(strike) or pd.isna(expiry):
-                            continue
-                        date_i = int(pd.to_datetime(row['entry_date']).strftime('%y%m%d'))
-                        t=row['entry_time']; ts = t.hour*3600+t.minute*60+t.second
-                        next_ts = ts + _AppConfig.BT_FREQUENCY
-                        nx = _fetch(sym,inst,date_i,next_ts,int(pd.to_datetime(expiry).strftime('%y%m%d')),strike)
-                        if nx is not None:
-                            orderdf.at[idx,'entry_price']=nx; _e+=1
-                        # Exit time-based only
-                        rsn = str(row.get('reason',''))
-                        if 'Exit Time Hit' in rsn:
-                            date_ex = int(pd.to_datetime(row['exit_date']).strftime('%y%m%d'))
-                            t2 = row['exit_time']; ts2 = t2.hour*3600+t2.minute*60+t2.second
-                            next_ts2 = ts2 + _AppConfig.BT_FREQUENCY
-                            nx2 = _fetch(sym,inst,date_ex,next_ts2,int(pd.to_datetime(expiry).strftime('%y%m%d')),strike)
-                            if nx2 is not None:
-                                orderdf.at[idx,'exit_price']=nx2; _x+=1
-                    except Exception:
-                        continue
-                try:
-                    _cur.close(); _conn.close()
-                except Exception:
-                    pass
-                try:
-                    import logging as _logging
-                    _logging.info(f"[PRECISION_FIX] Adjusted next-bar OPEN prices (phase2): entries={_e}, exits={_x}")
-                except Exception:
-                    pass
-        except Exception:
-            pass
+        contentType = btResp.headers.get("Content-Type", "").split(";")[0].strip().lower()
 
-        marginDf = orderdf[['strategy', 'leg_id', 'entry_datetime', 'filled_quantity', 'symbol', 'strike', 'instrument_type', 'side']]
-        marginDf['entry_date'] = marginDf['entry_datetime'].dt.date
-        marginDf = marginDf.sort_values(by=['entry_date'], ascending=False)
-        marginDf = marginDf.drop_duplicates(subset=['strategy', 'leg_id'])
+        if contentType in ["application/x-msgpack", "application/msgpack"]:
+            import msgpack
+            return msgpack.unpackb(btResp.content, raw=False, strict_map_key=False)
 
-        stgyTransactionRecord = {}
-        uniqueStgys = marginDf['strategy'].unique()
+        return btResp.json()
 
-        for stgyName in uniqueStgys:
-            stgyTransactionRecord[stgyName] = []
-            stgyDf = marginDf[(marginDf['strategy'] == stgyName)]
+    @staticmethod
+    def getOrdersFrame(orders) -> pd.DataFrame:
+        """Build order frame straight from whichever layout the engine sent: records, columns or an Arrow IPC stream"""
 
-            for info in stgyDf.itertuples():
+        if isinstance(orders, pd.DataFrame):
+            return orders
 
-                contractInfo = Util.MARGIN_INFO.get(info.symbol)
-                if contractInfo is None:
-                    continue
+        if isinstance(orders, (bytes, bytearray)):
+            import pyarrow
+            return pyarrow.ipc.open_stream(orders).read_pandas()
 
-                contractInfo = contractInfo[0]
+        return pd.DataFrame(orders)
 
-                stgyTransactionRecord[stgyName].append({
-                    "contract": contractInfo['contract'], "exchange": contractInfo['exchange'], "product": "OPTION", "qty": info.filled_quantity, 
-                    "strikePrice": info.strike, "tradeType": info.side.upper(), "optionType": info.instrument_type.upper()
-                })
-            
-            if len(stgyTransactionRecord[stgyName]) == 0:
-                del stgyTransactionRecord[stgyName]
-        
-        marginReqForEachStgy = {stgyName: Util.getMarginFor(position=stgyTransactionRecord[stgyName]) for stgyName in stgyTransactionRecord}
-        tickpnldf = Util.convertTickPnlDictToDaywiseDf(toConvert=btResponse)
+    @staticmethod
+    def concatOrders(ordersChunks: list):
+        """Join orders of several engine responses, records stay records unless a chunk arrived columnar"""
 
-        return orderdf, marginReqForEachStgy, tickpnldf
+        if all(isinstance(__chunk, list) for __chunk in ordersChunks):
+            return [__order for __chunk in ordersChunks for __order in __chunk]
 
-    @staticmethod
-    def convertTickPnlDictToDaywiseDf(toConvert: dict) -> pd.DataFrame:
-        
-        daymaxprofitloss = {}
-        for __tradingdate in toConvert['strategy_profits']:
-            
-            daymaxprofitloss[__tradingdate] = {"max_profit": 0, "max_profit_time": 0, "max_loss": 0, "max_loss_time": 0}
+        return pd.concat([Util.getOrdersFrame(orders=__chunk) for __chunk in ordersChunks], ignore_index=True)
 
-            for __tradingtime in toConvert['strategy_profits'][__tradingdate]:
+    @staticmethod
+    def getEngineSession(urii: str) -> requests.Session:
+        """Keep-alive session shared by every engine call made to the same BT_URII target"""
 
-                if toConvert['strategy_profits'][__tradingdate][__tradingtime] <= 0:
-                    continue
+        target = urlsplit(urii).netloc
 
-                if toConvert['strategy_profits'][__tradingdate][__tradingtime] > daymaxprofitloss[__tradingdate]['max_profit']:
-                    daymaxprofitloss[__tradingdate].update({"max_profit": toConvert['strategy_profits'][__tradingdate][__tradingtime], "max_profit_time": __tradingtime})
-                
-            for __tradingtime in toConvert['strategy_losses'][__tradingdate]:
+        with Util.ENGINE_SESSIONS_LOCK:
 
-                if toConvert['strategy_losses'][__tradingdate][__tradingtime] >= 0:
-                    continue
+            if target not in Util.ENGINE_SESSIONS:
 
-                if abs(toConvert['strategy_losses'][__tradingdate][__tradingtime]) > abs(daymaxprofitloss[__tradingdate]["max_loss"]):
-                    daymaxprofitloss[__tradingdate].update({
-                        "max_loss": toConvert['strategy_losses'][__tradingdate][__tradingtime],
-                        "max_loss_time": __tradingtime
-                    })
+                toggles = config.get_effective_toggles(logger=logging)
 
-        daymaxprofitloss = pd.DataFrame.from_dict(daymaxprofitloss, orient="index").reset_index().rename(columns={
-            "index": "Date", "max_profit": "Max Profit", "max_loss": "Max Loss", "max_profit_time": "Max Profit Time", "max_loss_time": "Max Loss Time"
-        })
-        if not daymaxprofitloss.empty:
-            daymaxprofitloss['Date'] = daymaxprofitloss['Date'].apply(lambda x: datetime.strptime(str(int(x)), "%y%m%d").date())
+                # engine runs are side-effect free, so POST is retried the same as GET on connect failures and gateway errors
+                retries = Retry(
+                    total=toggles['ENGINE_MAX_RETRIES'], connect=toggles['ENGINE_MAX_RETRIES'], read=0, status=toggles['ENGINE_MAX_RETRIES'],
+                    backoff_factor=toggles['ENGINE_RETRY_BACKOFF'], status_forcelist=[502, 503, 504], allowed_methods=frozenset(["GET", "POST"]), 
+                    raise_on_status=False
+                )
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=toggles['ENGINE_POOL_SIZE'], max_retries=retries, pool_block=True)
 
-            for tt in ['Max Profit Time', 'Max Loss Time']:
-                daymaxprofitloss[tt] = daymaxprofitloss[tt].apply(lambda x: "" if x == 0 else (datetime(2021,1,1)+timedelta(seconds=int(x))).strftime("%H:%M:%S"))
-        
-        return daymaxprofitloss
-    
-    @staticmethod
-    def getRecordsForOutputJson(responseDict: dict) -> list:
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
 
-        toReturn = []
-        
-        for __key in responseDict:
+                Util.ENGINE_SESSIONS[target] = session
+                logging.info(f"Created engine connection pool for {target}, pool size: {toggles['ENGINE_POOL_SIZE']}")
 
-            __df = responseDict[__key].copy()
-            __df.columns = [__i.lower() for __i in __df.columns]
+            return Util.ENGINE_SESSIONS[target]
 
-            if "year" in __df.columns:
-                __df = __df[__df['year'] != "Total"]
-                __df['strategy'] = __key
-                toReturn += __df.to_dict("records")
-        
-        return toReturn
-    
     @staticmethod
-    def prepareOutputJson(btResultFile: str, btStatsTableData: pd.DataFrame, stgywiseTransactionDf: dict, stgyDayWiseStats: dict, stgyMonthWiseStats: dict, stgyMarginPercentageWiseStats: dict) -> None:
+    def getParallelSettings(taskCount: int) -> tuple:
+        """Resolve (backend, workers) for engine dispatch from PARALLEL_BACKEND/MAX_WORKERS runtime toggles, read once per process."""
 
-        __metricStats = btStatsTableData.copy()
-        __metricStats['Particulars'] = __metricStats['Particulars'].apply(lambda x: Util.METRICS_KEY_NAME[x])
-        __metricStats.columns = [__t.lower() for __t in __metricStats.columns]
-        __metricStats = __metricStats.rename(columns={"particulars": "strategy"})
-        __metricStats = __metricStats.set_index("strategy").transpose()
-        for __dtCol in ["backteststartdate", "backtestenddate"]:
-            __metricStats[__dtCol] = __metricStats[__dtCol].apply(lambda x : x.strftime("%y%m%d"))
-        
-        __metricStats = __metricStats.to_dict("index")
+        if not Util.PARALLEL_SETTINGS:
 
-        __metrics = []
-        for __stgy in __metricStats:
-            __toappend = __metricStats[__stgy].copy()
-            __toappend.update({"strategy": __stgy})
-            __metrics.append(__toappend)
-        
-        transDf = stgywiseTransactionDf['portfolio'][Util.COLUMN_ORDER].copy()
-        transDf["expiry"] = transDf["expiry"].apply(lambda x: x.strftime("%y%m%d"))
+            toggles = config.get_effective_toggles(logger=logging)
 
-        for __tradeType in ["entry", "exit"]:
-            transDf[f'{__tradeType}_date'] = transDf[f'{__tradeType}_date'].apply(lambda x: x.strftime("%y%m%d"))
-            transDf[f'{__tradeType}_time'] = transDf[f'{__tradeType}_time'].apply(lambda x: x.strftime("%H%M%S"))
+            backend = str(toggles['PARALLEL_BACKEND']).strip().lower()
+            if backend == "":
+                backend = "threads" if toggles['PARALLEL_POLICY_AUTO'] == "1" else "sequential"
+            elif backend not in ["threads", "processes"]:
+                logging.info(f"Parallel backend {backend} is not available for engine dispatch, using threads instead.")
+                backend = "threads"
 
-        outputJson = {
-            "metrics": __metrics, "transactions": transDf.to_dict("records"), 
-            "daywisestats": Util.getRecordsForOutputJson(responseDict=stgyDayWiseStats), 
-            "monthwisestats": Util.getRecordsForOutputJson(responseDict=stgyMonthWiseStats), 
-            "marginpercentwisestats": Util.getRecordsForOutputJson(responseDict=stgyMarginPercentageWiseStats)
-        }
+            workers = toggles['MAX_WORKERS']
+            if workers == "":
+                workers = toggles['PROCESS_DEFAULT_WORKERS'] if backend == "processes" else toggles['THREAD_DEFAULT_WORKERS']
 
-        with open(btResultFile, "+w") as ff:
-            ff.write(simplejson.dumps(outputJson, ignore_nan=True, indent=4))
+            Util.PARALLEL_SETTINGS = {"backend": backend, "workers": int(workers)}
 
-    @staticmethod
-    def prepareOutputFile(btResultFile: str, btStatsTableData: pd.DataFrame, stgywiseTransactionDf: dict, stgyDayWiseStats: dict, stgyMonthWiseStats: dict, stgyMarginPercentageWiseStats: dict, onlyStgyResults: bool, excelFileExists: bool, dailyMaxProfitLossDf: pd.DataFrame, initialCapital: float = 0.0) -> None:
-        """Prepare output using modular or legacy pipeline based on feature flag."""
-        if False:  # is_feature_enabled('use_modular_output') - disabled since btrun module not available
-            from btrun.output.generators import prepare_backtest_output_file
-            return prepare_backtest_output_file(
-                bt_result_file=btResultFile,
-                stats_table=btStatsTableData,
-                strategy_transactions=stgywiseTransactionDf,
-                strategy_day_stats=stgyDayWiseStats,
-                strategy_month_stats=stgyMonthWiseStats,
-                strategy_margin_stats=stgyMarginPercentageWiseStats,
-                only_strategy_results=onlyStgyResults,
-                excel_file_exists=excelFileExists,
-                daily_max_profit_loss=dailyMaxProfitLossDf,
-                initial_capital=initialCapital,
-            )
-        return Util._prepare_output_file_legacy(
-            btResultFile,
-            btStatsTableData,
-            stgywiseTransactionDf,
-            stgyDayWiseStats,
-            stgyMonthWiseStats,
-            stgyMarginPercentageWiseStats,
-            onlyStgyResults,
-            excelFileExists,
-            dailyMaxProfitLossDf,
-            initialCapital=initialCapital,
-        )
+        backend = Util.PARALLEL_SETTINGS['backend']
+        workers = max(1, min(Util.PARALLEL_SETTINGS['workers'], taskCount))
+        if workers == 1:
+            backend = "sequential"
+
+        return backend, workers
 
     @staticmethod
-    def _prepare_output_file_legacy(btResultFile: str, btStatsTableData: pd.DataFrame, stgywiseTransactionDf: dict, stgyDayWiseStats: dict, stgyMonthWiseStats: dict, stgyMarginPercentageWiseStats: dict, onlyStgyResults: bool, excelFileExists: bool, dailyMaxProfitLossDf: pd.DataFrame, initialCapital: float = 0.0) -> None:
+    def getBacktestResultsConcurrently(btParas: list, onResult=None) -> list:
+        """Run Util.getBacktestResults for every payload with bounded concurrency, responses are returned in payload order.
+        onResult(position, response) is called from the calling thread as each response arrives"""
 
-        startTime = datetime.now()
-        logging.info(f"{startTime}, Started writing stats to excel file.")
+        if len(btParas) == 0:
+            return []
+
+        backend, workers = Util.getParallelSettings(taskCount=len(btParas))
 
-        if excelFileExists:
-            excelObjj = pd.ExcelWriter(btResultFile, engine='openpyxl', mode="a", if_sheet_exists="overlay")
+        startTime = datetime.now()
+        logging.info(f"{startTime}, Dispatching {len(btParas)} portfolio(s) to engine, backend: {backend}, max in flight: {workers}")
+
+        if backend == "sequential":
+            toReturn = []
+            for __pos, btPara in enumerate(btParas):
+                toReturn.append(Util.getBacktestResults(btPara=btPara))
+                if onResult:
+                    onResult(__pos, toReturn[__pos])
         else:
-            excelObjj = pd.ExcelWriter(btResultFile, engine='openpyxl', mode="w")
-        
-        colOrder = Util.COLUMN_ORDER.copy()
-        
-        with excelObjj as writer: 
+            executorClass = ProcessPoolExecutor if backend == "processes" else ThreadPoolExecutor
+            with executorClass(max_workers=workers) as executor:
+                if onResult is None:
+                    toReturn = list(executor.map(Util.getBacktestResults, btParas))
+                else:
+                    toReturn = [{} for __ in btParas]
+                    futurePositions = {executor.submit(Util.getBacktestResults, btPara): __pos for __pos, btPara in enumerate(btParas)}
+                    for __future in as_completed(futurePositions):
+                        toReturn[futurePositions[__future]] = __future.result()
+                        onResult(futurePositions[__future], toReturn[futurePositions[__future]])
 
-            # Defer writing Metrics and daily extremes until after we compute corrections
-            raw_metrics_df = btStatsTableData.copy()
-            daily_max_df = dailyMaxProfitLossDf.copy()
+        endTime = datetime.now()
+        logging.info(f"{endTime}, Completed dispatching {len(btParas)} portfolio(s), Time taken: {round((endTime-startTime).total_seconds(),2)}")
 
-            # Buffers to control sheet ordering
-            corrected_portfolio_df = None
-            portfolio_day_df, portfolio_month_df, portfolio_margin_df = None, None, None
-            strategy_results = {}  # stgy -> (day_df, month_df, margin_df)
-            queued_strategy_trans = {}
-            for stgyName in stgywiseTransactionDf:
+        return toReturn
+
+    @staticmethod
+    def isPortfolioBatchable(btPara: dict) -> bool:
+        """Portfolio level stoploss/target/trailing would act across every signal of a batch, hence only flat portfolios are batched"""
+
+        if not btPara:
+            return False
+
+        portfolioPara = btPara['portfolio']
+        lockAndTrail = portfolioPara['lock_and_trail']
+
+        return (
+            (float(portfolioPara['stop_loss']['value']) == 0) and (float(portfolioPara['take_profit']['value']) == 0) and
+            (float(portfolioPara['trailing_stop_loss']['profit_move']['value']) == 0) and (float(portfolioPara['trailing_stop_loss']['stop_loss_move']['value']) == 0) and
+            (lockAndTrail['Type'] == "LOCKTYPE.REGULAR") and (float(lockAndTrail['lock']) == 0) and (float(lockAndTrail['trail']) == 0)
+        )
+
+    @staticmethod
+    def getTVSignalSettings() -> dict:
+        """TV signal dispatch toggles (TV_SIGNAL_BATCH_SIZE, TV_SIGNAL_RESULT_STORE, TV_SIGNAL_RESULT_STORE_MAX_RESULTS), resolved once per process"""
+
+        if not Util.TV_SIGNAL_SETTINGS:
+            toggles = config.get_effective_toggles(logger=logging)
+            Util.TV_SIGNAL_SETTINGS = {
+                "batchSize": max(toggles['TV_SIGNAL_BATCH_SIZE'] or 1, 1), "resultStore": toggles['TV_SIGNAL_RESULT_STORE'].strip(), 
+                "maxStoredResults": max(toggles['TV_SIGNAL_RESULT_STORE_MAX_RESULTS'] or 0, 0)
+            }
+
+        return Util.TV_SIGNAL_SETTINGS
+
+    @staticmethod
+    def getBacktestResultsBatched(btParas: list, signalKeys: list, batchSize: int, onResult=None) -> list:
+        """Pack signal bounded portfolios into single engine requests and split the response back per payload by strategy name, TV strategy names 
+        already carry their _T{tradeno} suffix so payloads whose names clash go to separate requests. onResult(position, response) is called per 
+        payload as its batch arrives"""
+
+        if batchSize <= 1:
+            return Util.getBacktestResultsConcurrently(btParas=btParas, onResult=onResult)
+
+        batches, currentBatch, currentNames = [], [], set()
+
+        for __pos, __btPara in enumerate(btParas):
+
+            __signalKey = str(signalKeys[__pos])
+            __names = {__stgy['name'] for __stgy in __btPara['portfolio']['strategies']}
+
+            canJoin = (
+                (len(currentBatch) != 0) and (len(currentBatch) < batchSize) and (__signalKey != "") and (str(signalKeys[currentBatch[0]]) != "") and
+                Util.isPortfolioBatchable(btPara=__btPara) and Util.isPortfolioBatchable(btPara=btParas[currentBatch[0]]) and
+                currentNames.isdisjoint(__names) and
+                ({**btParas[currentBatch[0]], "start_date": 0, "end_date": 0, "portfolio": {**btParas[currentBatch[0]]['portfolio'], "strategies": []}} ==
+                 {**__btPara, "start_date": 0, "end_date": 0, "portfolio": {**__btPara['portfolio'], "strategies": []}})
+            )
+            if (len(currentBatch) != 0) and (not canJoin):
+                batches.append(currentBatch)
+                currentBatch, currentNames = [], set()
+
+            currentBatch.append(__pos)
+            currentNames.update(__names)
+
+        if len(currentBatch) != 0:
+            batches.append(currentBatch)
+
+        batchedParas, strategyOwner = [], []
+        for __batch in batches:
+
+            if len(__batch) == 1:
+                batchedParas.append(btParas[__batch[0]])
+                strategyOwner.append({})
+                continue
+
+            __owner, __strategies = {}, []
+            for __pos in __batch:
+                for __stgy in btParas[__pos]['portfolio']['strategies']:
+                    __owner[__stgy['name']] = __pos
+                    __strategies.append(__stgy)
+
+            batchedParas.append({
+                **btParas[__batch[0]],
+                "start_date": min(btParas[__pos]['start_date'] for __pos in __batch), "end_date": max(btParas[__pos]['end_date'] for __pos in __batch),
+                "portfolio": {**btParas[__batch[0]]['portfolio'], "strategies": __strategies}
+            })
+            strategyOwner.append(__owner)
+
+        logging.info(f"Packed {len(btParas)} signal portfolio(s) into {len(batchedParas)} engine request(s), batch size: {batchSize}")
+
+        toReturn = [{} for __ in btParas]
+
+        def splitBatchResponse(__batchNo: int, __btResp: dict) -> None:
+
+            __batch, __owner = batches[__batchNo], strategyOwner[__batchNo]
+
+            if len(__batch) == 1:
+                toReturn[__batch[0]] = __btResp
+                if onResult:
+                    onResult(__batch[0], __btResp)
+                return
+
+            if not __btResp:
+                return
+
+            splitOrders = {__pos: [] for __pos in __batch}
+            batchOrders = __btResp['strategies']['orders']
+
+            if isinstance(batchOrders, pd.DataFrame):
+
+                batchOrders = batchOrders[batchOrders['strategy_name'].isin(__owner)]
+                ownerPos = batchOrders['strategy_name'].map(__owner)
+
+                for __pos, __posOrders in batchOrders.groupby(ownerPos, sort=False):
+                    splitOrders[__pos] = __posOrders.reset_index(drop=True)
+
+            else:
+                for __order in batchOrders:
+
+                    if __order['strategy_name'] not in __owner:
+                        logging.info(f"Unable to map strategy {__order['strategy_name']} back to its signal, order ignored.")
+                        continue
+
+                    splitOrders[__owner[__order['strategy_name']]].append(__order)
+
+            # engine reports profit/loss maps for the whole batch, merging only sums them so they are kept with one signal
+            pnlOwner = next((__pos for __pos in __batch if len(splitOrders[__pos]) != 0), None)
+
+            for __pos in __batch:
+                toReturn[__pos] = {"strategies": {
+                    "orders": splitOrders[__pos],
+                    "strategy_profits": __btResp['strategies'].get('strategy_profits', {}) if __pos == pnlOwner else {},
+                    "strategy_losses": __btResp['strategies'].get('strategy_losses', {}) if __pos == pnlOwner else {}
+                }}
+            
+            if onResult:
+                for __pos in __batch:
+                    onResult(__pos, toReturn[__pos])
+
+        batchedResponses = Util.getBacktestResultsConcurrently(btParas=batchedParas, onResult=splitBatchResponse if onResult else None)
+        if onResult is None:
+            for __batchNo, __btResp in enumerate(batchedResponses):
+                splitBatchResponse(__batchNo, __btResp)
+
+        return toReturn
+
+    @staticmethod
+    def getTVSignalResultKey(btPara: dict) -> str:
+        """Hash of the engine payload of a single TV signal backtest and config.VERSION_NO, the engine response depends on nothing else"""
+
+        return Util.getResultCacheKey(payload=btPara)
+
+    @staticmethod
+    def pruneTVSignalResultStore(storeFolder: str) -> None:
+        """Drop the least recently stored or used responses of the TV signal result store beyond TV_SIGNAL_RESULT_STORE_MAX_RESULTS"""
+
+        maxStoredResults = Util.getTVSignalSettings()['maxStoredResults']
+        if maxStoredResults == 0:
+            return
+
+        storedResults = []
+        for __entry in os.scandir(storeFolder):
+            try:
+                if __entry.name.endswith(".pkl"):
+                    storedResults.append((__entry.stat().st_mtime, __entry.path))
+            except FileNotFoundError:
+                continue
+
+        if len(storedResults) <= maxStoredResults:
+            return
+
+        storedResults.sort()
+        for __, __resultFile in storedResults[:len(storedResults)-maxStoredResults]:
+            try:
+                os.remove(__resultFile)
+            except FileNotFoundError: # dropped by another worker meanwhile
+                continue
+
+        logging.info(f"TV signal result store: dropped {len(storedResults)-maxStoredResults} oldest results")
+
+    @staticmethod
+    def getBacktestResultsStored(btParas: list, signalKeys: list, resultKeys: list, batchSize: int, onResult=None) -> list:
+        """
+        Util.getBacktestResultsBatched, going through the TV_SIGNAL_RESULT_STORE folder (one pickle per result key) so only signals not 
+        seen before reach the engine. Batched responses carry profit/loss maps of the whole batch, hence the store is used unbatched only.
+        Reading a stored result refreshes its mtime, so pruneTVSignalResultStore drops least recently stored or used results first.
+        """
+
+        storeFolder = Util.getTVSignalSettings()['resultStore']
+        if (storeFolder == "") or (batchSize > 1):
+            if storeFolder != "":
+                logging.info(f"TV signal result store is not used when TV_SIGNAL_BATCH_SIZE is {batchSize}.")
+            return Util.getBacktestResultsBatched(btParas=btParas, signalKeys=signalKeys, batchSize=batchSize, onResult=onResult)
+
+        os.makedirs(storeFolder, exist_ok=True)
+
+        toReturn, toRun = [{} for __ in btParas], []
+        for __pos, __resultKey in enumerate(resultKeys):
+
+            resultFile = os.path.join(storeFolder, f"{__resultKey}.pkl")
+            if not os.path.exists(resultFile):
+                toRun.append(__pos)
+                continue
+
+            try:
+                with open(resultFile, "rb") as f:
+                    toReturn[__pos] = pickle.load(f)
+                os.utime(resultFile)
+            except Exception:
+                logging.error(f"Unable to read stored TV signal result {resultFile}, running it again. {traceback.format_exc()}")
+                toRun.append(__pos)
+                continue
+
+            if onResult:
+                onResult(__pos, toReturn[__pos])
+
+        logging.info(f"TV signal result store: {len(btParas)-len(toRun)} stored, {len(toRun)} to run")
+
+        freshResponses = Util.getBacktestResultsBatched(
+            btParas=[btParas[__pos] for __pos in toRun], signalKeys=[signalKeys[__pos] for __pos in toRun], batchSize=1, 
+            onResult=(lambda __runNo, __btResp: onResult(toRun[__runNo], __btResp)) if onResult else None
+        )
+
+        for __pos, __btResp in zip(toRun, freshResponses):
+
+            toReturn[__pos] = __btResp
+            if not __btResp: # engine failures are retried on next run
+                continue
+
+            resultFile = os.path.join(storeFolder, f"{resultKeys[__pos]}.pkl")
+            try:
+                with open(f"{resultFile}.tmp", "wb") as f:
+                    pickle.dump(__btResp, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(f"{resultFile}.tmp", resultFile)
+            except Exception:
+                logging.error(f"Unable to store TV signal result {resultFile}. {traceback.format_exc()}")
+
+        if len(toRun) != 0:
+            Util.pruneTVSignalResultStore(storeFolder=storeFolder)
+
+        return toReturn
+
+    @staticmethod
+    def getResultCacheKey(payload) -> str:
+        """Canonical hash of a normalized engine payload and config.VERSION_NO"""
+
+        canonical = json.dumps([payload, config.VERSION_NO], sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def getCachedResult(resultKey: str) -> Optional[dict]:
+        """Backtest response stored for resultKey, None when missing, older than RESULT_CACHE_TTL_SECONDS or its Excel export is gone"""
+
+        if Util.RESULT_CACHE_SIZE is None:
+            toggles = config.get_effective_toggles(logger=logging)
+            Util.RESULT_CACHE_TTL_SECONDS = max(toggles['RESULT_CACHE_TTL_SECONDS'] or 0, 0)
+            Util.RESULT_CACHE_SIZE = max(toggles['RESULT_CACHE_SIZE'] or 0, 0)
+
+        with Util.RESULT_CACHE_LOCK:
+
+            cachedResult = Util.RESULT_CACHE.get(resultKey)
+            if cachedResult is None:
+                return None
+            
+            isExpired = (Util.RESULT_CACHE_TTL_SECONDS != 0) and (time.monotonic() - cachedResult['storedAt'] > Util.RESULT_CACHE_TTL_SECONDS)
+            if isExpired or ((cachedResult['excelFile'] != "") and (not os.path.exists(cachedResult['excelFile']))):
+                Util.RESULT_CACHE.pop(resultKey)
+                return None
+            
+            Util.RESULT_CACHE.move_to_end(resultKey)
+        
+        logging.info(f"Serving cached backtest result {resultKey}, Excel file: {cachedResult['excelFile']}")
+        return cachedResult['response']
+
+    @staticmethod
+    def storeCachedResult(resultKey: str, response: dict, excelFile: str = "") -> None:
+        """
+        Keep a successful backtest response (and the path of its Excel file or frames folder) for getCachedResult, least recently used 
+        results are evicted
+        """
+
+        if not Util.RESULT_CACHE_SIZE:
+            return
+
+        with Util.RESULT_CACHE_LOCK:
+            Util.RESULT_CACHE[resultKey] = {"response": response, "excelFile": excelFile, "storedAt": time.monotonic()}
+            Util.RESULT_CACHE.move_to_end(resultKey)
+
+            while len(Util.RESULT_CACHE) > Util.RESULT_CACHE_SIZE:
+                Util.RESULT_CACHE.popitem(last=False)
+
+    @staticmethod
+    def mergeTickPnlDict(mergeInto: dict, toMerge: dict) -> None:
+        """Add per date/time strategy_profits and strategy_losses of an engine response into an accumulated dict"""
+
+        for __pnlKey in ['strategy_profits', 'strategy_losses']:
+            for __tradingdate in toMerge.get(__pnlKey, {}):
+
+                if __tradingdate not in mergeInto['strategy_profits']:
+                    mergeInto['strategy_profits'][__tradingdate] = {}
+
+                if __tradingdate not in mergeInto['strategy_losses']:
+                    mergeInto['strategy_losses'][__tradingdate] = {}
+
+                for __tradingtime in toMerge[__pnlKey][__tradingdate]:
+
+                    if __tradingtime not in mergeInto[__pnlKey][__tradingdate]:
+                        mergeInto[__pnlKey][__tradingdate][__tradingtime] = toMerge[__pnlKey][__tradingdate][__tradingtime]
+                    else:
+                        mergeInto[__pnlKey][__tradingdate][__tradingtime] += toMerge[__pnlKey][__tradingdate][__tradingtime]
+
+    @staticmethod
+    def getMarginFor(position: list, marginCalcUrl: str = "") -> Optional[float]:
+
+        marginCalcUrl = marginCalcUrl or Util.getMarginSettings()['marginCalcUrl']
+        marginUrl = f"{marginCalcUrl}/margin-calculator/SPAN"
+
+        for ii in range(1,3):
+
+            try:
+
+                r1 = Util.getEngineSession(urii=marginUrl).post(url=marginUrl, headers=Util.MARGIN_REQ_HEADERS, json={"position": position}, timeout=30)
+                if r1.status_code != 200:
+                    logging.error(f"Unable to fetch margin, received following response: {r1.text}, {position}")
+                    time.sleep(1)
+                    continue
+
+                resp = r1.json()['margin']
+                return resp['netPremium'] if resp['totalMargin'] == 0 else resp['totalMargin']
+
+            except Exception:
+                logging.error(traceback.format_exc())
+                time.sleep(ii)
+        
+        return None
+    
+    @staticmethod
+    def getPositionHash(position: list) -> str:
+        """Order independent hash of a SPAN position list (contract, exchange, qty, strike, side, option type)"""
+
+        canonical = sorted(
+            json.dumps([__leg['contract'], __leg['exchange'], __leg['product'], float(__leg['qty']), float(__leg['strikePrice']), __leg['tradeType'], __leg['optionType']]) 
+            for __leg in position
+        )
+        return hashlib.sha1("|".join(canonical).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def loadMarginCache() -> None:
+        """Margins are valid for the trading day, same as marginSymbolInfo.json, earlier days are discarded"""
+
+        today = datetime.now().strftime("%Y-%m-%d")
+        if Util.MARGIN_CACHE.get("date") == today:
+            return
+
+        Util.MARGIN_CACHE = {"date": today, "margins": {}}
+        if os.path.exists(Util.MARGIN_CACHE_FILE_PATH):
+            try:
+                with open(Util.MARGIN_CACHE_FILE_PATH, "r") as f:
+                    fileCache = json.load(f)
+                if fileCache.get("date") == today:
+                    Util.MARGIN_CACHE = fileCache
+            except Exception:
+                logging.error(f"Unable to read margin cache, starting empty. {traceback.format_exc()}")
+
+    @staticmethod
+    def getMarginSettings() -> dict:
+        """MARGIN_CALC_URL and MARGIN_MAX_WORKERS, resolved once per process"""
+
+        if not Util.MARGIN_SETTINGS:
+            toggles = config.get_effective_toggles(logger=logging)
+            Util.MARGIN_SETTINGS = {"marginCalcUrl": toggles['MARGIN_CALC_URL'].rstrip("/"), "maxWorkers": toggles['MARGIN_MAX_WORKERS'] or 1}
+
+        return Util.MARGIN_SETTINGS
+
+    @staticmethod
+    def getMarginsFor(positions: dict) -> dict:
+        """Margin of every position list in positions (name -> position list). Distinct positions not in the daily cache are 
+        priced concurrently, failed lookups give 0 and are not cached"""
+
+        if len(positions) == 0:
+            return {}
+
+        positionHashes = {__name: Util.getPositionHash(position=positions[__name]) for __name in positions}
+
+        with Util.MARGIN_CACHE_LOCK:
+            Util.loadMarginCache()
+            toFetch = {__hash: positions[__name] for __name, __hash in positionHashes.items() if __hash not in Util.MARGIN_CACHE['margins']}
+
+        if len(toFetch) != 0:
+
+            marginSettings = Util.getMarginSettings()
+            marginCalcUrl = marginSettings['marginCalcUrl']
+            workers = max(1, min(marginSettings['maxWorkers'], len(toFetch)))
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                fetched = dict(zip(toFetch.keys(), executor.map(lambda x: Util.getMarginFor(position=x, marginCalcUrl=marginCalcUrl), toFetch.values())))
+
+            with Util.MARGIN_CACHE_LOCK:
+                Util.loadMarginCache()
+                Util.MARGIN_CACHE['margins'].update({__hash: __margin for __hash, __margin in fetched.items() if __margin is not None})
+
+                # every gunicorn worker persists the cache, so the temporary file is unique per process and thread
+                tmpPath = f"{Util.MARGIN_CACHE_FILE_PATH}.{os.getpid()}.{threading.get_ident()}.tmp"
+                try:
+                    with open(tmpPath, "w") as f:
+                        json.dump(Util.MARGIN_CACHE, f)
+                    os.replace(tmpPath, Util.MARGIN_CACHE_FILE_PATH)
+                except Exception:
+                    logging.error(f"Unable to persist margin cache. {traceback.format_exc()}")
+
+            logging.info(f"Margin fetched for {len(toFetch)} of {len(positions)} positions, rest served from cache.")
+        
+        else:
+            fetched = {}
+
+        with Util.MARGIN_CACHE_LOCK:
+            return {
+                __name: Util.MARGIN_CACHE['margins'].get(__hash, fetched.get(__hash)) or 0 for __name, __hash in positionHashes.items()
+            }
+
+    @staticmethod
+    def isPrecisionMode() -> bool:
+        """Precision mode (DB_EXECUTE_AT_DETECTION=1 or DB_EXECUTION_PRICE=CLOSE) fills entries and time exits at next-bar OPEN"""
+        return (int(os.environ.get('DB_EXECUTE_AT_DETECTION', '0')) == 1) or (os.environ.get('DB_EXECUTION_PRICE', 'OPEN').upper() == 'CLOSE')
+
+    @staticmethod
+    def getPrecisionFrequency() -> int:
+        """Bar size in seconds used to find the next bar in precision mode"""
+        return int(getattr(config, 'BT_FREQUENCY', os.environ.get('BT_FREQUENCY', os.environ.get('BTFREQUENCY', '60'))))
+
+    @staticmethod
+    def getHistoricalDbPool():
+        """Connection pool for historicaldb, created on first use, MYSQL_* env variables override config"""
+
+        with Util.HISTORICAL_DB_POOL_LOCK:
+            if Util.HISTORICAL_DB_POOL is None:
+                from mysql.connector import pooling
+                Util.HISTORICAL_DB_POOL = pooling.MySQLConnectionPool(
+                    pool_name="historicaldb", pool_size=max(1, min(config.get_effective_toggles(logger=logging)['HISTORICAL_DB_POOL_SIZE'] or 1, 32)), 
+                    host=os.environ.get('MYSQL_HOST', config.MYSQL_HOST), user=os.environ.get('MYSQL_USER', config.MYSQL_USER), 
+                    password=os.environ.get('MYSQL_PASSWORD', config.MYSQL_PASSWORD), database=os.environ.get('MYSQL_DATABASE', config.MYSQL_DATABASE)
+                )
+
+        return Util.HISTORICAL_DB_POOL
+
+    @staticmethod
+    def getNextBarKeys(symbols: pd.Series, instrumentTypes: pd.Series, strikes: pd.Series, expiries: pd.Series, barAt: pd.Series, toCorrect: pd.Series, frequency: int) -> pd.DataFrame:
+        """Option table and (date, time, expiry, strike) key of the bar following barAt, for rows flagged in toCorrect and having a complete key"""
+
+        keysDf = pd.DataFrame({
+            "table": symbols.astype(str).str.lower() + np.where(instrumentTypes.astype(str).str.upper().str.startswith('C'), "_call", "_put"), 
+            "date": pd.to_numeric(barAt.dt.strftime('%y%m%d'), errors="coerce"), 
+            "time": barAt.dt.hour*3600 + barAt.dt.minute*60 + barAt.dt.second + frequency, 
+            "expiry": pd.to_numeric(expiries, errors="coerce"), "strike": pd.to_numeric(strikes, errors="coerce")
+        }, index=symbols.index)
+
+        keysDf = keysDf[toCorrect & keysDf[Util.NEXT_BAR_KEY_COLUMNS].notna().all(axis=1)]
+        return keysDf.astype({__col: "int64" for __col in Util.NEXT_BAR_KEY_COLUMNS})
+
+    @staticmethod
+    def getNextBarOpens(keysDf: pd.DataFrame) -> pd.Series:
+        """OPEN in rupees for every row of a getNextBarKeys frame, NaN where the bar is missing. 
+        Distinct keys are fetched per table with chunked (date, time, expiry, strike) IN queries over one pooled connection"""
+
+        if keysDf.empty:
+            return pd.Series(np.nan, index=keysDf.index, dtype=float)
+
+        chunkSize = 500
+        fetched = []
+
+        conn = Util.getHistoricalDbPool().get_connection()
+        try:
+            cur = conn.cursor()
+            for __table, __tableKeys in keysDf.groupby(by=['table']):
+
+                uniqueKeys = list(__tableKeys[Util.NEXT_BAR_KEY_COLUMNS].drop_duplicates().itertuples(index=False, name=None))
+                for __start in range(0, len(uniqueKeys), chunkSize):
+
+                    chunkKeys = uniqueKeys[__start: __start+chunkSize]
+                    cur.execute(
+                        f"SELECT date, time, expiry, strike, open FROM {__table[0]} WHERE (date, time, expiry, strike) IN ({', '.join(['(%s, %s, %s, %s)'] * len(chunkKeys))})", 
+                        [int(__v) for __key in chunkKeys for __v in __key]
+                    )
+                    fetched.append(pd.DataFrame(cur.fetchall(), columns=Util.NEXT_BAR_KEY_COLUMNS + ["open"]).assign(table=__table[0]))
+            cur.close()
+        finally:
+            conn.close()
+
+        fetchedDf = pd.concat(fetched, ignore_index=True) if fetched else pd.DataFrame(columns=["table"] + Util.NEXT_BAR_KEY_COLUMNS + ["open"])
+        fetchedDf = fetchedDf.astype({__col: "int64" for __col in Util.NEXT_BAR_KEY_COLUMNS})
+        fetchedDf = fetchedDf.drop_duplicates(subset=["table"] + Util.NEXT_BAR_KEY_COLUMNS, keep="first")
+        fetchedDf['open'] = fetchedDf['open'].astype(float) / 100.0
+
+        opens = keysDf.merge(fetchedDf, how="left", on=["table"] + Util.NEXT_BAR_KEY_COLUMNS)['open']
+        opens.index = keysDf.index
+
+        return opens
+
+    @staticmethod
+    def applyNextBarOpens(toCorrect: pd.DataFrame, priceColumn: str, opens: pd.Series) -> int:
+        """Write fetched next-bar opens into priceColumn, rows without a bar keep their price. Returns number of rows corrected"""
+
+        opens = opens.dropna()
+        toCorrect.loc[opens.index, priceColumn] = opens.values
+
+        return len(opens)
+
+    @staticmethod
+    def correctOrdersToNextBarOpen(orderdf: pd.DataFrame) -> None:
+        """Precision mode correction of raw engine orders, entries and time exits are repriced at next-bar OPEN in place"""
+
+        frequency = Util.getPrecisionFrequency()
+        hasKey = orderdf[['symbol', 'instrument_type', 'strike', 'expiry']].notna().all(axis=1)
+
+        orderKeys = {}
+        for __leg in ["entry", "exit"]:
+
+            legAt = pd.to_datetime(orderdf[f'{__leg}_datetime'], format="%a, %d %b %Y %H:%M:%S GMT", errors="coerce")
+            toCorrect = hasKey if __leg == "entry" else (hasKey & orderdf.get('reason', pd.Series("", index=orderdf.index)).astype(str).str.contains('Exit Time Hit', regex=False))
+
+            orderKeys[__leg] = Util.getNextBarKeys(
+                symbols=orderdf['symbol'], instrumentTypes=orderdf['instrument_type'], strikes=pd.to_numeric(orderdf['strike'], errors="coerce").round(), 
+                expiries=orderdf['expiry'], barAt=legAt, toCorrect=toCorrect, frequency=frequency
+            )
+
+        # one round of queries for both legs, most time exits share bars with other orders' entries
+        allKeys = pd.concat([orderKeys['entry'], orderKeys['exit']], ignore_index=True)
+        allOpens = Util.getNextBarOpens(keysDf=allKeys)
+
+        entryOpens = pd.Series(allOpens.values[:len(orderKeys['entry'])], index=orderKeys['entry'].index)
+        exitOpens = pd.Series(allOpens.values[len(orderKeys['entry']):], index=orderKeys['exit'].index)
+
+        correctedEntries = Util.applyNextBarOpens(toCorrect=orderdf, priceColumn='entry_price', opens=entryOpens)
+        correctedExits = Util.applyNextBarOpens(toCorrect=orderdf, priceColumn='exit_price', opens=exitOpens)
+
+        logging.info(f"[PRECISION_FIX] Adjusted next-bar OPEN prices (parse): entries={correctedEntries}, exits={correctedExits}, freq={frequency}")
+
+    @staticmethod
+    def parseBacktestingResponse(btResponse: dict, slippagePercent: float) -> tuple:
+        
+        if len(btResponse['orders']) == 0:
+            return pd.DataFrame(), {}, pd.DataFrame()
+        
+        orderdf = Util.getOrdersFrame(orders=btResponse['orders'])
+        if orderdf.empty:
+            return pd.DataFrame(), {}, pd.DataFrame()
+
+        orderdf = orderdf.rename(columns={
+            "entry_time": "entry_datetime", "exit_time": "exit_datetime", "option_type": "instrument_type", "qty": "filled_quantity", 
+            "entry_number": "re_entry_no", "strategy_name": "strategy", "original_tv_exit_time": "original_tv_exit"
+        })
+
+        # Precision timing post-fix (client-side correction): in precision mode force next-bar OPEN for entry and time-exit pricing,
+        # before pnl is derived, to counteract any backend that still returns same-bar fills
+        if Util.isPrecisionMode():
+            try:
+                Util.correctOrdersToNextBarOpen(orderdf=orderdf)
+            except Exception:
+                # Non-fatal: if DB unavailable or any issue, keep backend values
+                logging.warning(f"[PRECISION_FIX] Response correction skipped: {traceback.format_exc()}")
+
+        orderdf['entry_price_slippage'] = np.where(
+            orderdf['side'] == "SELL", orderdf['entry_price'] * (1 - slippagePercent), orderdf['entry_price'] * (1 + slippagePercent)
+        )
+
+        orderdf['exit_price_slippage'] = np.where(
+            orderdf['side'] == "SELL", orderdf['exit_price'] * (1 + slippagePercent), orderdf['exit_price'] * (1 - slippagePercent)
+        )
+
+        # Persist slippage percent per row so later Excel-stage recomputation can reuse it
+        orderdf['slippage_percent'] = float(slippagePercent)
+
+        orderdf['pointsAfterSlippage'] = np.where(
+            orderdf['side'] == "SELL", orderdf['entry_price_slippage'] - orderdf['exit_price_slippage'], orderdf['exit_price_slippage'] - orderdf['entry_price_slippage']
+        )
+        orderdf['pnlAfterSlippage'] = orderdf['pointsAfterSlippage'] * orderdf['filled_quantity']
+
+        orderdf['points'] = np.where(
+            orderdf['side'] == "SELL", orderdf['entry_price'] - orderdf['exit_price'], orderdf['exit_price'] - orderdf['entry_price']
+        )
+        
+        if config.TAXES != 0:
+            orderdf['expenses'] = orderdf['entry_price_slippage'] + orderdf['exit_price_slippage']
+            orderdf['expenses'] *= orderdf['filled_quantity']
+            orderdf['expenses'] *= config.TAXES
+        else:
+            orderdf['expenses'] = 0
+        
+        orderdf['netPnlAfterExpenses'] = orderdf['pnlAfterSlippage'] - orderdf['expenses']
+
+        for columnName in ["entry", "exit"]:
+
+            orderdf[f'{columnName}_datetime'] = pd.to_datetime(orderdf[f'{columnName}_datetime'], format="%a, %d %b %Y %H:%M:%S GMT")
+
+            orderdf[f'{columnName}_date'] = orderdf[f'{columnName}_datetime'].dt.date
+            orderdf[f'{columnName}_time'] = orderdf[f'{columnName}_datetime'].dt.time
+            orderdf[f'{columnName}_day'] = orderdf[f'{columnName}_datetime'].dt.strftime("%A")
+        
+        orderdf['expiry'] = orderdf['expiry'].apply(lambda x: datetime.strptime(str(int(x)), "%y%m%d"))
+        orderdf['expiry'] = orderdf['expiry'].dt.date
+        orderdf['strike'] = orderdf['strike'].astype(float).astype(int)
+
+        marginDf = orderdf[['strategy', 'leg_id', 'entry_datetime', 'filled_quantity', 'symbol', 'strike', 'instrument_type', 'side']]
+        marginDf['entry_date'] = marginDf['entry_datetime'].dt.date
+        marginDf = marginDf.sort_values(by=['entry_date'], ascending=False)
+        marginDf = marginDf.drop_duplicates(subset=['strategy', 'leg_id'])
+
+        stgyTransactionRecord = {}
+        uniqueStgys = marginDf['strategy'].unique()
+
+        for stgyName in uniqueStgys:
+            stgyTransactionRecord[stgyName] = []
+            stgyDf = marginDf[(marginDf['strategy'] == stgyName)]
+
+            for info in stgyDf.itertuples():
+
+                contractInfo = Util.MARGIN_INFO.get(info.symbol)
+                if contractInfo is None:
+                    continue
+
+                contractInfo = contractInfo[0]
+
+                stgyTransactionRecord[stgyName].append({
+                    "contract": contractInfo['contract'], "exchange": contractInfo['exchange'], "product": "OPTION", "qty": info.filled_quantity, 
+                    "strikePrice": info.strike, "tradeType": info.side.upper(), "optionType": info.instrument_type.upper()
+                })
+            
+            if len(stgyTransactionRecord[stgyName]) == 0:
+                del stgyTransactionRecord[stgyName]
+        
+        marginReqForEachStgy = Util.getMarginsFor(positions=stgyTransactionRecord)
+        tickpnldf = Util.convertTickPnlDictToDaywiseDf(toConvert=btResponse)
+
+        return orderdf, marginReqForEachStgy, tickpnldf
+
+    @staticmethod
+    def convertTickPnlDictToDaywiseDf(toConvert: dict) -> pd.DataFrame:
+        
+        daymaxprofitloss = {}
+        for __tradingdate in toConvert['strategy_profits']:
+            
+            daymaxprofitloss[__tradingdate] = {"max_profit": 0, "max_profit_time": 0, "max_loss": 0, "max_loss_time": 0}
+
+            for __tradingtime in toConvert['strategy_profits'][__tradingdate]:
+
+                if toConvert['strategy_profits'][__tradingdate][__tradingtime] <= 0:
+                    continue
+
+                if toConvert['strategy_profits'][__tradingdate][__tradingtime] > daymaxprofitloss[__tradingdate]['max_profit']:
+                    daymaxprofitloss[__tradingdate].update({"max_profit": toConvert['strategy_profits'][__tradingdate][__tradingtime], "max_profit_time": __tradingtime})
+                
+            for __tradingtime in toConvert['strategy_losses'][__tradingdate]:
+
+                if toConvert['strategy_losses'][__tradingdate][__tradingtime] >= 0:
+                    continue
+
+                if abs(toConvert['strategy_losses'][__tradingdate][__tradingtime]) > abs(daymaxprofitloss[__tradingdate]["max_loss"]):
+                    daymaxprofitloss[__tradingdate].update({
+                        "max_loss": toConvert['strategy_losses'][__tradingdate][__tradingtime],
+                        "max_loss_time": __tradingtime
+                    })
+
+        daymaxprofitloss = pd.DataFrame.from_dict(daymaxprofitloss, orient="index").reset_index().rename(columns={
+            "index": "Date", "max_profit": "Max Profit", "max_loss": "Max Loss", "max_profit_time": "Max Profit Time", "max_loss_time": "Max Loss Time"
+        })
+        if not daymaxprofitloss.empty:
+            daymaxprofitloss['Date'] = daymaxprofitloss['Date'].apply(lambda x: datetime.strptime(str(int(x)), "%y%m%d").date())
+
+            for tt in ['Max Profit Time', 'Max Loss Time']:
+                daymaxprofitloss[tt] = daymaxprofitloss[tt].apply(lambda x: "" if x == 0 else (datetime(2021,1,1)+timedelta(seconds=int(x))).strftime("%H:%M:%S"))
+        
+        return daymaxprofitloss
+    
+    @staticmethod
+    def getRecordsForOutputJson(responseDict: dict, layout: str = "records"):
+        """Rows (with their strategy) of the year wise stats tables, as records or with layout "columns" as {column: values}"""
+
+        toReturn = []
+        
+        for __key in responseDict:
+
+            __df = responseDict[__key]
+            __df = __df.set_axis([__i.lower() for __i in __df.columns], axis=1)
+
+            if "year" in __df.columns:
+                __df = __df[__df['year'] != "Total"].assign(strategy=__key)
+                toReturn.append(__df)
+        
+        if layout == "columns":
+            return pd.concat(toReturn, ignore_index=True).to_dict("list") if toReturn else {}
+
+        return [__record for __df in toReturn for __record in __df.to_dict("records")]
+    
+    @staticmethod
+    def getStrategyStreamEvent(strategyName: str, statsDf: pd.DataFrame, dayWiseDf: pd.DataFrame, monthWiseDf: pd.DataFrame, marginPercentWiseDf: pd.DataFrame, statsColumn: str = "") -> dict:
+        """Metrics and day/month/margin wise rows of one strategy (stats from statsColumn, default strategyName), in the same keys as the output json"""
+
+        metrics = dict(zip(statsDf['Particulars'].map(Util.METRICS_KEY_NAME), statsDf[statsColumn or strategyName]))
+        for __dtCol in ["backteststartdate", "backtestenddate"]:
+            metrics[__dtCol] = metrics[__dtCol].strftime("%y%m%d")
+        
+        return {
+            "strategy": strategyName, "metrics": metrics, 
+            "daywisestats": Util.getRecordsForOutputJson(responseDict={strategyName: dayWiseDf}), 
+            "monthwisestats": Util.getRecordsForOutputJson(responseDict={strategyName: monthWiseDf}), 
+            "marginpercentwisestats": Util.getRecordsForOutputJson(responseDict={strategyName: marginPercentWiseDf})
+        }
+
+    @staticmethod
+    def getOrdersStreamEvent(signalType: str, tradeNo, btResp: dict) -> dict:
+        """Engine orders of one TV signal as records"""
+
+        orders = btResp['strategies']['orders']
+        return {
+            "signalType": signalType, "tradeno": tradeNo, 
+            "orders": orders.to_dict("records") if isinstance(orders, pd.DataFrame) else orders
+        }
+
+    @staticmethod
+    def getOutputJsonLayout(layout: str = "") -> str:
+        """Output json layout asked for by a request ("records" | "columns"), OUTPUT_JSON_LAYOUT when not given or unknown"""
+
+        if Util.OUTPUT_JSON_LAYOUT is None:
+            defaultLayout = config.get_effective_toggles(logger=logging)['OUTPUT_JSON_LAYOUT'].strip().lower()
+            Util.OUTPUT_JSON_LAYOUT = "columns" if defaultLayout == "columns" else "records"
+
+        layout = str(layout or "").strip().lower()
+        return layout if layout in ["records", "columns"] else Util.OUTPUT_JSON_LAYOUT
+
+    @staticmethod
+    def getOutputJson(btStatsTableData: pd.DataFrame, stgywiseTransactionDf: dict, stgyDayWiseStats: dict, stgyMonthWiseStats: dict, stgyMarginPercentageWiseStats: dict, layout: str = "records") -> dict:
+        """
+        Output json of a backtest (metrics, portfolio transactions, day/month/margin wise stats), values may still be NaN or numpy scalars.
+        With layout "columns" transactions and stats tables are {column: values} instead of lists of records (metrics stay records).
+        """
+
+        __metricStats = btStatsTableData.copy()
+        __metricStats['Particulars'] = __metricStats['Particulars'].apply(lambda x: Util.METRICS_KEY_NAME[x])
+        __metricStats.columns = [__t.lower() for __t in __metricStats.columns]
+        __metricStats = __metricStats.rename(columns={"particulars": "strategy"})
+        __metricStats = __metricStats.set_index("strategy").transpose()
+        for __dtCol in ["backteststartdate", "backtestenddate"]:
+            __metricStats[__dtCol] = __metricStats[__dtCol].apply(lambda x : x.strftime("%y%m%d"))
+        
+        __metricStats = __metricStats.to_dict("index")
+
+        __metrics = []
+        for __stgy in __metricStats:
+            __toappend = __metricStats[__stgy].copy()
+            __toappend.update({"strategy": __stgy})
+            __metrics.append(__toappend)
+        
+        transDf = stgywiseTransactionDf['portfolio'][Util.COLUMN_ORDER]
+        transDf = transDf.assign(**{
+            "expiry": Util.getYYMMDDStrings(dates=transDf['expiry']), 
+            "entry_date": Util.getYYMMDDStrings(dates=transDf['entry_date']), "exit_date": Util.getYYMMDDStrings(dates=transDf['exit_date']), 
+            "entry_time": Util.getHHMMSSStrings(times=transDf['entry_time']), "exit_time": Util.getHHMMSSStrings(times=transDf['exit_time'])
+        })
+
+        outputJson = {
+            "metrics": __metrics, "transactions": transDf.to_dict("list" if layout == "columns" else "records"), 
+            "daywisestats": Util.getRecordsForOutputJson(responseDict=stgyDayWiseStats, layout=layout), 
+            "monthwisestats": Util.getRecordsForOutputJson(responseDict=stgyMonthWiseStats, layout=layout), 
+            "marginpercentwisestats": Util.getRecordsForOutputJson(responseDict=stgyMarginPercentageWiseStats, layout=layout)
+        }
+        if layout == "columns":
+            outputJson['layout'] = "columns"
+
+        return outputJson
+
+    @staticmethod
+    def prepareOutputJson(btResultFile: str, btStatsTableData: pd.DataFrame, stgywiseTransactionDf: dict, stgyDayWiseStats: dict, stgyMonthWiseStats: dict, stgyMarginPercentageWiseStats: dict) -> None:
+
+        outputJson = Util.getOutputJson(
+            btStatsTableData=btStatsTableData, stgywiseTransactionDf=stgywiseTransactionDf, stgyDayWiseStats=stgyDayWiseStats, 
+            stgyMonthWiseStats=stgyMonthWiseStats, stgyMarginPercentageWiseStats=stgyMarginPercentageWiseStats
+        )
+
+        with open(btResultFile, "+w") as ff:
+            ff.write(simplejson.dumps(outputJson, ignore_nan=True, indent=4))
+
+    @staticmethod
+    def persistOutputJson(btResultFile: str, outputJson: dict) -> None:
+        """Write outputJson to btResultFile (as prepareOutputJson does) on a background thread, the response does not wait for the disk"""
+
+        def persist() -> None:
+            try:
+                with open(f"{btResultFile}.tmp", "w") as ff:
+                    ff.write(simplejson.dumps(outputJson, ignore_nan=True, indent=4))
+                os.replace(f"{btResultFile}.tmp", btResultFile)
+            except Exception:
+                logging.error(f"Unable to write {btResultFile}. {traceback.format_exc()}")
+
+        with Util.OUTPUT_PERSIST_LOCK:
+            if Util.OUTPUT_PERSIST_EXECUTOR is None:
+                Util.OUTPUT_PERSIST_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outputjson")
+        
+        Util.OUTPUT_PERSIST_EXECUTOR.submit(persist)
+
+    @staticmethod
+    def toJsonBytes(value) -> bytes:
+        """
+        Compact JSON for HTTP responses, NaN/inf as null and numpy scalars as numbers (like the output json files). Uses orjson when 
+        installed, simplejson otherwise
+        """
+
+        def toSerializable(x):
+            return x.item() if isinstance(x, np.generic) else str(x)
+
+        try:
+            import orjson
+        except ImportError:
+            return simplejson.dumps(value, ignore_nan=True, default=toSerializable).encode("utf-8")
+
+        return orjson.dumps(value, default=toSerializable, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+
+    @staticmethod
+    def getTransactionStoreSettings() -> dict:
+        """TRANSACTION_STORE_PATH, TRANSACTION_STORE_MAX_RESULTS and RESPONSE_TRANSACTIONS, resolved once per process"""
+
+        if not Util.TRANSACTION_STORE_SETTINGS:
+            toggles = config.get_effective_toggles(logger=logging)
+            Util.TRANSACTION_STORE_SETTINGS = {
+                "storePath": toggles['TRANSACTION_STORE_PATH'].strip(), "maxResults": max(toggles['TRANSACTION_STORE_MAX_RESULTS'] or 0, 0),
+                "responseTransactions": toggles['RESPONSE_TRANSACTIONS'].strip().lower()
+            }
 
-                transactionDf = stgywiseTransactionDf[stgyName].copy()
-                if transactionDf.empty:
-                    continue
+        return Util.TRANSACTION_STORE_SETTINGS
+
+    @staticmethod
+    def getTransactionStore() -> Optional[sqlite3.Connection]:
+        """
+        Connection to the TRANSACTION_STORE_PATH SQLite file (None when disabled), tables are created on first use. Transactions are kept 
+        in the output json format, one row per transaction with its result id and position, indexed by strategy, entry date and leg.
+        """
+
+        storePath = Util.getTransactionStoreSettings()['storePath']
+        if storePath == "":
+            return None
+
+        conn = sqlite3.connect(storePath, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+
+        if storePath not in Util.TRANSACTION_STORE_READY:
+            columnList = ", ".join(f'"{__col}"' for __col in Util.COLUMN_ORDER)
+            with Util.TRANSACTION_STORE_LOCK:
+                
+                conn.execute("PRAGMA journal_mode=WAL")
+                for __numpyType in [np.int64, np.int32, np.float64, np.float32, np.bool_]:
+                    sqlite3.register_adapter(__numpyType, lambda x: x.item())
+                conn.execute("CREATE TABLE IF NOT EXISTS results (result_id TEXT PRIMARY KEY, stored_at TEXT, transaction_count INTEGER)")
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS transactions (result_id TEXT, row_no INTEGER, {columnList}, "
+                    "PRIMARY KEY (result_id, row_no))"
+                )
+                conn.execute('CREATE INDEX IF NOT EXISTS transactions_strategy ON transactions (result_id, strategy, entry_date)')
+                conn.execute('CREATE INDEX IF NOT EXISTS transactions_date ON transactions (result_id, entry_date)')
+                conn.execute('CREATE INDEX IF NOT EXISTS transactions_leg ON transactions (result_id, leg_id)')
+                conn.commit()
+                
+                Util.TRANSACTION_STORE_READY.add(storePath)
+
+        return conn
+
+    @staticmethod
+    def storeResultTransactions(resultId: str, transactions) -> None:
+        """
+        Keep the transactions of an output json (records or columns layout) under resultId for getResultTransactions. The result is 
+        registered straight away and its rows are written on the background output thread, readers wait for them. A failed write marks 
+        the result with TRANSACTION_STORE_FAILED. Results beyond TRANSACTION_STORE_MAX_RESULTS are dropped oldest first.
+        """
+
+        conn = Util.getTransactionStore()
+        if conn is None:
+            return
+        
+        try:
+            with Util.TRANSACTION_STORE_LOCK, conn:
+                conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, NULL)", (resultId, datetime.now().isoformat(timespec="seconds")))
+        finally:
+            conn.close()
+
+        if isinstance(transactions, dict):
+            rows = zip(*[transactions[__col] for __col in Util.COLUMN_ORDER])
+            transactionCount = len(transactions[Util.COLUMN_ORDER[0]])
+        else:
+            rows = ([__record[__col] for __col in Util.COLUMN_ORDER] for __record in transactions)
+            transactionCount = len(transactions)
 
-                # Carry slippage percent (for recompute later) if present
-                _slip_series = transactionDf['slippage_percent'] if 'slippage_percent' in transactionDf.columns else None
+        maxResults = Util.getTransactionStoreSettings()['maxResults']
 
-                # Select only columns that exist to avoid KeyError when optional columns are absent
-                # Use a per-sheet column order to avoid modifying shared colOrder
-                order_to_use = [c for c in Util.COLUMN_ORDER if c in transactionDf.columns]
-                transactionDf = transactionDf[order_to_use].rename(columns=Util.COLUMN_RENAME_MAPPING)
+        def store() -> None:
 
-                # Final-stage precision correction (Excel view) — enforce next-bar OPEN in precision mode
+            conn = Util.getTransactionStore()
+            try:
+                with Util.TRANSACTION_STORE_LOCK, conn:
+
+                    conn.execute("DELETE FROM transactions WHERE result_id = ?", (resultId,))
+                    conn.executemany(
+                        f"INSERT INTO transactions VALUES ({', '.join(['?'] * (len(Util.COLUMN_ORDER) + 2))})", 
+                        ((resultId, __rowNo, *__row) for __rowNo, __row in enumerate(rows))
+                    )
+                    conn.execute("UPDATE results SET transaction_count = ? WHERE result_id = ?", (transactionCount, resultId))
+
+                    if maxResults != 0:
+                        expired = [__row[0] for __row in conn.execute("SELECT result_id FROM results ORDER BY stored_at DESC, rowid DESC LIMIT -1 OFFSET ?", (maxResults,))]
+                        conn.executemany("DELETE FROM transactions WHERE result_id = ?", [(__resultId,) for __resultId in expired])
+                        conn.executemany("DELETE FROM results WHERE result_id = ?", [(__resultId,) for __resultId in expired])
+            except Exception:
+                logging.error(f"Unable to store transactions of {resultId}. {traceback.format_exc()}")
                 try:
-                    import os as _os
-                    import mysql.connector as _mysql
+                    with Util.TRANSACTION_STORE_LOCK, conn:
+                        conn.execute("UPDATE results SET transaction_count = ? WHERE result_id = ?", (Util.TRANSACTION_STORE_FAILED, resultId))
+                except Exception:
+                    logging.error(f"Unable to mark transactions of {resultId} as failed. {traceback.format_exc()}")
+            finally:
+                conn.close()
+
+        with Util.OUTPUT_PERSIST_LOCK:
+            if Util.OUTPUT_PERSIST_EXECUTOR is None:
+                Util.OUTPUT_PERSIST_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outputjson")
+        
+        Util.OUTPUT_PERSIST_EXECUTOR.submit(store)
+
+    @staticmethod
+    def getResultTransactions(resultId: str, filters: dict = {}, fromDate: str = "", toDate: str = "", page: int = 1, pageSize: int = 500, sortBy: str = "", descending: bool = False, layout: str = "records") -> Optional[dict]:
+        """
+        One page of the stored transactions of a result, filtered on TRANSACTION_FILTERS columns (equality) and entry date (yymmdd, inclusive) 
+        and sorted on any transaction column (stored order by default). None when the result is unknown, RuntimeError when its transactions 
+        could not be stored (write failed, or pending beyond TRANSACTION_STORE_ABANDON_SECONDS), {"resultId", "pending": True} right away 
+        while they are still being written so the caller retries, as with job results.
+        """
+
+        conn = Util.getTransactionStore()
+        if conn is None:
+            return None
+
+        try:
+            stored = conn.execute("SELECT transaction_count, stored_at FROM results WHERE result_id = ?", (resultId,)).fetchone()
+            if stored is None:
+                return None
+            isAbandoned = (stored[0] is None) and (
+                (datetime.now() - datetime.fromisoformat(stored[1])).total_seconds() > Util.TRANSACTION_STORE_ABANDON_SECONDS
+            )
+            if (stored[0] == Util.TRANSACTION_STORE_FAILED) or isAbandoned:
+                raise RuntimeError(f"transactions of {resultId} could not be stored")
+            if stored[0] is None:
+                return {"resultId": resultId, "pending": True}
+
+            conditions, values = ["result_id = ?"], [resultId]
+            for __param, __value in filters.items():
+                if (__param in Util.TRANSACTION_FILTERS) and (__value not in [None, ""]):
+                    # query parameters are text, numeric columns (leg ids) are matched on the number too
+                    candidates = [__value]
                     try:
-                        from app.config import Config as _AppConfig
-                        _freqE = int(getattr(_AppConfig, 'BT_FREQUENCY', 60))
-                        _db_host, _db_user, _db_pass, _db_name = _AppConfig.MYSQL_HOST, _AppConfig.MYSQL_USER, _AppConfig.MYSQL_PASSWORD, _AppConfig.MYSQL_DATABASE
-                    except Exception:
-                        _AppConfig = None
-                        _freqE = int(_os.environ.get('BT_FREQUENCY', _os.environ.get('BTFREQUENCY', '60')))
-                        _db_host, _db_user, _db_pass, _db_name = (
-                            _os.environ.get('MYSQL_HOST','106.51.63.60'),
-                            _os.environ.get('MYSQL_USER','mahesh'),
-                            _os.environ.get('MYSQL_PASSWORD','mahesh_123'),
-                            _os.environ.get('MYSQL_DATABASE','historicaldb'),
-                        )
-                    _precision_mode = (int(_os.environ.get('DB_EXECUTE_AT_DETECTION', '0')) == 1) or (_os.environ.get('DB_EXECUTION_PRICE','OPEN').upper() == 'CLOSE')
-                    if _precision_mode and not transactionDf.empty:
-                        _conn = _mysql.connect(host=_db_host, user=_db_user, password=_db_pass, database=_db_name)
-                        _cur = _conn.cursor()
-                        _cache = {}
-                        def _fetch_open(sym, is_call, date_i, ts, expiry_i, strike_i):
-                            key=(sym,is_call,date_i,ts,expiry_i,strike_i)
-                            if key in _cache: return _cache[key]
-                            table = f"{str(sym).lower()}_call" if is_call else f"{str(sym).lower()}_put"
-                            _cur.execute(f"SELECT open FROM {table} WHERE date=%s AND time=%s AND expiry=%s AND strike=%s LIMIT 1", (date_i, ts, expiry_i, int(strike_i)))
-                            r=_cur.fetchall(); val=None
-                            if r: val=float(r[0][0])/100.0
-                            _cache[key]=val; return val
-                        _e,_x=0,0
-                        for ridx, r in transactionDf.iterrows():
+                        candidates.append(int(__value) if float(__value).is_integer() else float(__value))
+                    except (TypeError, ValueError):
+                        pass
+                    conditions.append(f'"{Util.TRANSACTION_FILTERS[__param]}" IN ({", ".join(["?"] * len(candidates))})')
+                    values += candidates
+            if fromDate:
+                conditions.append("entry_date >= ?")
+                values.append(fromDate)
+            if toDate:
+                conditions.append("entry_date <= ?")
+                values.append(toDate)
+            whereClause = " AND ".join(conditions)
+
+            if sortBy not in Util.COLUMN_ORDER:
+                sortBy = "row_no"
+            orderClause = f'"{sortBy}" {"DESC" if descending else "ASC"}, row_no {"DESC" if descending else "ASC"}'
+
+            pageSize = min(max(int(pageSize), 1), Util.TRANSACTION_MAX_PAGE_SIZE)
+            page = max(int(page), 1)
+
+            total = conn.execute(f"SELECT COUNT(*) FROM transactions WHERE {whereClause}", values).fetchone()[0]
+            columnList = ", ".join(f'"{__col}"' for __col in Util.COLUMN_ORDER)
+            rows = conn.execute(
+                f"SELECT {columnList} FROM transactions WHERE {whereClause} ORDER BY {orderClause} LIMIT ? OFFSET ?", 
+                [*values, pageSize, (page-1)*pageSize]
+            ).fetchall()
+        finally:
+            conn.close()
+
+        if layout == "columns":
+            transactions = dict(zip(Util.COLUMN_ORDER, map(list, zip(*rows)))) if rows else {__col: [] for __col in Util.COLUMN_ORDER}
+        else:
+            transactions = [dict(zip(Util.COLUMN_ORDER, __row)) for __row in rows]
+
+        return {"resultId": resultId, "page": page, "pageSize": pageSize, "total": total, "transactions": transactions}
+
+    @staticmethod
+    def isPagedResponse(transactions: str = "") -> bool:
+        """Whether a response leaves out its transactions ("paged") as asked by the request or RESPONSE_TRANSACTIONS, needs the transaction store"""
+
+        storeSettings = Util.getTransactionStoreSettings()
+        transactions = str(transactions or "").strip().lower()
+        if transactions not in ["inline", "paged"]:
+            transactions = storeSettings['responseTransactions']
+
+        return (transactions == "paged") and (storeSettings['storePath'] != "")
+
+    @staticmethod
+    def getResponseWithoutTransactions(btResult: dict) -> dict:
+        """Backtest response with only the transaction count, transactions are then fetched by pages (see getResultTransactions)"""
+
+        if (btResult.get("status") != "success") or ("transactions" not in btResult['data']):
+            return btResult
+
+        transactions = btResult['data']['transactions']
+        transactionCount = len(transactions[Util.COLUMN_ORDER[0]]) if isinstance(transactions, dict) else len(transactions)
+
+        return {
+            **btResult, "data": {**{__key: __value for __key, __value in btResult['data'].items() if __key != "transactions"}, "transactioncount": transactionCount}
+        }
+
+    @staticmethod
+    def prepareOutputFile(btResultFile: str, btStatsTableData: pd.DataFrame, stgywiseTransactionDf: dict, stgyDayWiseStats: dict, stgyMonthWiseStats: dict, stgyMarginPercentageWiseStats: dict, onlyStgyResults: bool, excelFileExists: bool, dailyMaxProfitLossDf: pd.DataFrame, initialCapital: float = 0.0) -> None:
+        """Prepare output using modular or legacy pipeline based on feature flag."""
+        if False:  # is_feature_enabled('use_modular_output') - disabled since btrun module not available
+            from btrun.output.generators import prepare_backtest_output_file
+            return prepare_backtest_output_file(
+                bt_result_file=btResultFile,
+                stats_table=btStatsTableData,
+                strategy_transactions=stgywiseTransactionDf,
+                strategy_day_stats=stgyDayWiseStats,
+                strategy_month_stats=stgyMonthWiseStats,
+                strategy_margin_stats=stgyMarginPercentageWiseStats,
+                only_strategy_results=onlyStgyResults,
+                excel_file_exists=excelFileExists,
+                daily_max_profit_loss=dailyMaxProfitLossDf,
+                initial_capital=initialCapital,
+            )
+        return Util._prepare_output_file_legacy(
+            btResultFile,
+            btStatsTableData,
+            stgywiseTransactionDf,
+            stgyDayWiseStats,
+            stgyMonthWiseStats,
+            stgyMarginPercentageWiseStats,
+            onlyStgyResults,
+            excelFileExists,
+            dailyMaxProfitLossDf,
+            initialCapital=initialCapital,
+        )
+
+    @staticmethod
+    def _prepare_output_file_legacy(btResultFile: str, btStatsTableData: pd.DataFrame, stgywiseTransactionDf: dict, stgyDayWiseStats: dict, stgyMonthWiseStats: dict, stgyMarginPercentageWiseStats: dict, onlyStgyResults: bool, excelFileExists: bool, dailyMaxProfitLossDf: pd.DataFrame, initialCapital: float = 0.0) -> None:
+
+        startTime = datetime.now()
+        logging.info(f"{startTime}, Started writing stats to excel file.")
+
+        colOrder = Util.COLUMN_ORDER.copy()
+        
+        # sheet name -> [(startrow, frame)], in the order sheets are created
+        sheets = {}
+
+        # Defer writing Metrics and daily extremes until after we compute corrections
+        raw_metrics_df = btStatsTableData.copy()
+        daily_max_df = dailyMaxProfitLossDf.copy()
+
+        # Buffers to control sheet ordering
+        corrected_portfolio_df = None
+        portfolio_day_df, portfolio_month_df, portfolio_margin_df = None, None, None
+        strategy_results = {}  # stgy -> (day_df, month_df, margin_df)
+        queued_strategy_trans = {}
+        for stgyName in stgywiseTransactionDf:
+
+            transactionDf = stgywiseTransactionDf[stgyName].copy()
+            if transactionDf.empty:
+                continue
+
+            # Carry slippage percent (for recompute later) if present
+            _slip_series = transactionDf['slippage_percent'] if 'slippage_percent' in transactionDf.columns else None
+
+            # Select only columns that exist to avoid KeyError when optional columns are absent
+            # Use a per-sheet column order to avoid modifying shared colOrder
+            order_to_use = [c for c in Util.COLUMN_ORDER if c in transactionDf.columns]
+            transactionDf = transactionDf[order_to_use].rename(columns=Util.COLUMN_RENAME_MAPPING)
+
+            # Final-stage precision correction (Excel view) — enforce next-bar OPEN in precision mode
+            try:
+                _freqE = Util.getPrecisionFrequency()
+                if Util.isPrecisionMode() and not transactionDf.empty:
+                    _valid = transactionDf[['Index', 'Strike', 'CE/PE', 'Expiry']].notna().all(axis=1)
+                    _entryKeys = Util.getNextBarKeys(
+                        symbols=transactionDf['Index'], instrumentTypes=transactionDf['CE/PE'], strikes=transactionDf['Strike'], 
+                        expiries=pd.to_datetime(transactionDf['Expiry']).dt.strftime('%y%m%d'), 
+                        barAt=pd.to_datetime(transactionDf['Entry Date'].astype(str) + " " + transactionDf['Enter On'].astype(str), errors="coerce"), 
+                        toCorrect=_valid, frequency=_freqE
+                    )
+                    _exitKeys = Util.getNextBarKeys(
+                        symbols=transactionDf['Index'], instrumentTypes=transactionDf['CE/PE'], strikes=transactionDf['Strike'], 
+                        expiries=pd.to_datetime(transactionDf['Expiry']).dt.strftime('%y%m%d'), 
+                        barAt=pd.to_datetime(transactionDf['Exit Date'].astype(str) + " " + transactionDf['Exit On'].astype(str), errors="coerce"), 
+                        toCorrect=_valid & transactionDf.get('Reason', pd.Series("", index=transactionDf.index)).astype(str).str.contains('Exit Time Hit', regex=False), 
+                        frequency=_freqE
+                    )
+                    _e = Util.applyNextBarOpens(toCorrect=transactionDf, priceColumn='Entry at', opens=Util.getNextBarOpens(keysDf=_entryKeys))
+                    _x = Util.applyNextBarOpens(toCorrect=transactionDf, priceColumn='Exit at', opens=Util.getNextBarOpens(keysDf=_exitKeys))
+                    # After correcting Entry/Exit prices, recompute Points and PNL based on displayed values
+                    try:
+                        # Recompute per-trade Points from displayed prices
+                        def _recalc_points(row):
                             try:
-                                sym = r.get('Index'); strike=r.get('Strike'); inst=r.get('CE/PE'); exp=r.get('Expiry');
-                                if pd.isna(sym) or pd.isna(strike) or pd.isna(inst) or pd.isna(exp):
-                                    continue
-                                is_call = str(inst).upper().startswith('C')
-                                # Entry
-                                edate = pd.to_datetime(r.get('Entry Date')).strftime('%y%m%d')
-                                etime = str(r.get('Enter On'))
-                                if etime:
-                                    h,m,s = [int(x) for x in etime.split(':')]
-                                    ts = h*3600+m*60+s
-                                    nxt = ts + _freqE
-                                    nx = _fetch_open(sym,is_call,int(edate),nxt,int(pd.to_datetime(exp).strftime('%y%m%d')),int(strike))
-                                    if nx is not None:
-                                        transactionDf.at[ridx,'Entry at']=nx; _e+=1
-                                # Exit (time-exit only)
-                                reason = str(r.get('Reason',''))
-                                if 'Exit Time Hit' in reason:
-                                    exdate = pd.to_datetime(r.get('Exit Date')).strftime('%y%m%d')
-                                    extime = str(r.get('Exit On'))
-                                    if extime:
-                                        hh,mm,ss = [int(x) for x in extime.split(':')]
-                                        ts2 = hh*3600+mm*60+ss
-                                        nxt2 = ts2 + _freqE
-                                        nx2 = _fetch_open(sym,is_call,int(exdate),nxt2,int(pd.to_datetime(exp).strftime('%y%m%d')),int(strike))
-                                        if nx2 is not None:
-                                            transactionDf.at[ridx,'Exit at']=nx2; _x+=1
+                                ent = float(row.get('Entry at', 0))
+                                ext = float(row.get('Exit at', 0))
+                                side = str(row.get('Trade', '')).strip().upper()
+                                pts = (ent - ext) if side == 'SELL' else (ext - ent)
+                                return round(pts, 2)
                             except Exception:
-                                continue
-                        try:
-                            _cur.close(); _conn.close()
-                        except Exception:
-                            pass
-                        # After correcting Entry/Exit prices, recompute Points and PNL based on displayed values
-                        try:
-                            # Recompute per-trade Points from displayed prices
-                            def _recalc_points(row):
-                                try:
-                                    ent = float(row.get('Entry at', 0))
-                                    ext = float(row.get('Exit at', 0))
-                                    side = str(row.get('Trade', '')).strip().upper()
-                                    pts = (ent - ext) if side == 'SELL' else (ext - ent)
-                                    return round(pts, 2)
-                                except Exception:
-                                    return row.get('Points', 0)
-                            transactionDf['Points'] = transactionDf.apply(_recalc_points, axis=1)
+                                return row.get('Points', 0)
+                        transactionDf['Points'] = transactionDf.apply(_recalc_points, axis=1)
 
-                            # Recompute Points After Slippage, AfterSlippage (PNL after slippage), Taxes, Net PNL
-                            def _calc_with_slip(row):
-                                try:
-                                    ent = float(row.get('Entry at', 0))
-                                    ext = float(row.get('Exit at', 0))
-                                    side = str(row.get('Trade', '')).strip().upper()
-                                    qty = float(row.get('Qty', 0))
-                                    s = 0.0
-                                    if _slip_series is not None and row.name in _slip_series.index:
-                                        try:
-                                            s = float(_slip_series.loc[row.name])
-                                        except Exception:
-                                            s = 0.0
-                                    # Slippage-adjusted price legs
-                                    if side == 'SELL':
-                                        ent_s = ent * (1 - s)
-                                        ext_s = ext * (1 + s)
-                                        pts_after = round(ent_s - ext_s, 2)
-                                    else:
-                                        ent_s = ent * (1 + s)
-                                        ext_s = ext * (1 - s)
-                                        pts_after = round(ext_s - ent_s, 2)
-                                    pnl_after = pts_after * qty
-                                    taxes = (ent_s + ext_s) * qty * config.TAXES if config.TAXES != 0 else 0
-                                    net_pnl = pnl_after - taxes
-                                    return pts_after, pnl_after, taxes, net_pnl
-                                except Exception:
-                                    return row.get('Points After Slippage', 0), row.get('AfterSlippage', 0), row.get('Taxes', 0), row.get('Net PNL', 0)
-
-                            vals = transactionDf.apply(_calc_with_slip, axis=1, result_type='expand')
-                            transactionDf['Points After Slippage'] = vals[0]
-                            transactionDf['AfterSlippage'] = vals[1]
-                            transactionDf['Taxes'] = vals[2]
-                            transactionDf['Net PNL'] = vals[3]
-
-                            # Recompute plain PNL as Points * Qty for consistency
-                            if 'Qty' in transactionDf.columns:
-                                transactionDf['PNL'] = transactionDf['Points'] * transactionDf['Qty']
-                        except Exception as _pex:
-                            logging.warning(f"[PRECISION_FIX] Points/PNL/slippage recompute skipped: {_pex}")
-                        logging.info(f"[PRECISION_FIX] Excel correction applied: entries={_e}, exits={_x}, freq={_freqE}")
-                except Exception as _ex:
-                    logging.warning(f"[PRECISION_FIX] Excel correction skipped: {_ex}")
-
-                # Compute slippage-adjusted MaxProfit/MaxLoss (new columns) based on per-row slippage and displayed prices
-                try:
+                        # Recompute Points After Slippage, AfterSlippage (PNL after slippage), Taxes, Net PNL
+                        def _calc_with_slip(row):
+                            try:
+                                ent = float(row.get('Entry at', 0))
+                                ext = float(row.get('Exit at', 0))
+                                side = str(row.get('Trade', '')).strip().upper()
+                                qty = float(row.get('Qty', 0))
+                                s = 0.0
+                                if _slip_series is not None and row.name in _slip_series.index:
+                                    try:
+                                        s = float(_slip_series.loc[row.name])
+                                    except Exception:
+                                        s = 0.0
+                                # Slippage-adjusted price legs
+                                if side == 'SELL':
+                                    ent_s = ent * (1 - s)
+                                    ext_s = ext * (1 + s)
+                                    pts_after = round(ent_s - ext_s, 2)
+                                else:
+                                    ent_s = ent * (1 + s)
+                                    ext_s = ext * (1 - s)
+                                    pts_after = round(ext_s - ent_s, 2)
+                                pnl_after = pts_after * qty
+                                taxes = (ent_s + ext_s) * qty * config.TAXES if config.TAXES != 0 else 0
+                                net_pnl = pnl_after - taxes
+                                return pts_after, pnl_after, taxes, net_pnl
+                            except Exception:
+                                return row.get('Points After Slippage', 0), row.get('AfterSlippage', 0), row.get('Taxes', 0), row.get('Net PNL', 0)
+
+                        vals = transactionDf.apply(_calc_with_slip, axis=1, result_type='expand')
+                        transactionDf['Points After Slippage'] = vals[0]
+                        transactionDf['AfterSlippage'] = vals[1]
+                        transactionDf['Taxes'] = vals[2]
+                        transactionDf['Net PNL'] = vals[3]
+
+                        # Recompute plain PNL as Points * Qty for consistency
+                        if 'Qty' in transactionDf.columns:
+                            transactionDf['PNL'] = transactionDf['Points'] * transactionDf['Qty']
+                    except Exception as _pex:
+                        logging.warning(f"[PRECISION_FIX] Points/PNL/slippage recompute skipped: {_pex}")
+                    logging.info(f"[PRECISION_FIX] Excel correction applied: entries={_e}, exits={_x}, freq={_freqE}")
+            except Exception as _ex:
+                logging.warning(f"[PRECISION_FIX] Excel correction skipped: {_ex}")
+
+            # Compute slippage-adjusted MaxProfit/MaxLoss (new columns) based on per-row slippage and displayed prices
+            try:
+                def _max_adj(row):
+                    try:
+                        ent = float(row.get('Entry at', 0))
+                        qty = float(row.get('Qty', 0))
+                        side = str(row.get('Trade', '')).strip().upper()
+                        s = 0.0
+                        if _slip_series is not None and row.name in _slip_series.index:
+                            try:
+                                s = float(_slip_series.loc[row.name])
+                            except Exception:
+                                s = 0.0
+                        mp = float(row.get('MaxProfit', 0))
+                        ml = float(row.get('MaxLoss', 0))
+                        # Derive extreme prices from points = value/qty
+                        best_pts = mp/qty if qty else 0.0
+                        worst_pts = ml/qty if qty else 0.0
+                        if side == 'SELL':
+                            ext_best = ent - best_pts
+                            ext_worst = ent + worst_pts
+                            ent_s = ent*(1 - s)
+                            ext_best_s = ext_best*(1 + s)
+                            ext_worst_s = ext_worst*(1 + s)
+                            mp_adj = (ent_s - ext_best_s)*qty
+                            ml_adj = (ext_worst_s - ent_s)*qty
+                        else:
+                            ext_best = ent + best_pts
+                            ext_worst = ent - worst_pts
+                            ent_s = ent*(1 + s)
+                            ext_best_s = ext_best*(1 - s)
+                            ext_worst_s = ext_worst*(1 - s)
+                            mp_adj = (ext_best_s - ent_s)*qty
+                            ml_adj = (ent_s - ext_worst_s)*qty
+                        return round(mp_adj, 2), round(ml_adj, 2)
+                    except Exception:
+                        return row.get('MaxProfit', 0), row.get('MaxLoss', 0)
+                max_vals = transactionDf.apply(_max_adj, axis=1, result_type='expand')
+                transactionDf['MaxProfitAdj'] = max_vals[0]
+                transactionDf['MaxLossAdj'] = max_vals[1]
+            except Exception as _e:
+                logging.warning(f"[PRECISION_FIX] MaxProfit/MaxLoss slippage-adj skipped: {_e}")
+
+            # Recompute Day/Month wise stats from corrected Net PNL
+            try:
+                corrected_trades = pd.DataFrame({
+                    'entryDate': pd.to_datetime(transactionDf['Entry Date']).dt.date,
+                    'bookedPnL': transactionDf['Net PNL']
+                })
+                corrected_day = Util.getDayWiseStats(tradesDf=corrected_trades)
+                corrected_month = Util.getMonthWiseStats(tradesDf=corrected_trades)
+            except Exception:
+                # Fallback to provided stats if recomputation fails
+                corrected_day = stgyDayWiseStats[stgyName]
+                corrected_month = stgyMonthWiseStats[stgyName]
+
+            # Buffer results to control final sheet order (write PORTFOLIO Results with summaries later)
+            if stgyName == 'portfolio':
+                portfolio_day_df = corrected_day.copy()
+                portfolio_month_df = corrected_month.copy()
+                portfolio_margin_df = stgyMarginPercentageWiseStats[stgyName].copy()
+            else:
+                strategy_results[stgyName] = (
+                    corrected_day.copy(),
+                    corrected_month.copy(),
+                    stgyMarginPercentageWiseStats[stgyName].copy()
+                )
+
+            # Capture corrected transaction for later writing to control sheet order
+            if stgyName == 'portfolio':
+                corrected_portfolio_df = transactionDf.copy()
+            else:
+                # For non-portfolio strategies, queue them to write as a final group
+                queued_strategy_trans[stgyName] = transactionDf.copy()
+
+            if not onlyStgyResults: # only portfolio stats required
+                break
+
+        # 1) Write PORTFOLIO Results first among summaries
+        try:
+            if portfolio_day_df is not None and portfolio_month_df is not None and portfolio_margin_df is not None:
+                sheets["PORTFOLIO Results"] = [
+                    (0, portfolio_day_df), (portfolio_day_df.shape[0] + 3, portfolio_month_df), 
+                    (portfolio_day_df.shape[0] + portfolio_month_df.shape[0] + 6, portfolio_margin_df)
+                ]
+        except Exception as _pr_ex:
+            logging.warning(f"[PRECISION_FIX] Failed writing PORTFOLIO Results in summary group: {_pr_ex}")
+
+        # Overwrite Metrics with corrected day-wise Net PNL from corrected portfolio if available
+        wrote_metrics = False
+        try:
+            if corrected_portfolio_df is not None:
+                portfolio_pnl = corrected_portfolio_df[['Entry Date','Net PNL']].copy()
+                portfolio_pnl.columns = ['entryDate','bookedPnL']
+                # Ensure entryDate is datetime.date
+                portfolio_pnl['entryDate'] = pd.to_datetime(portfolio_pnl['entryDate']).dt.date
+                corrected_metrics = Util.getBacktestStats(tradesDf=portfolio_pnl, initialCapital=initialCapital)
+                if not isinstance(corrected_metrics, pd.DataFrame):
+                    raise TypeError(f"recomputed metrics are a {type(corrected_metrics).__name__}, not a DataFrame")
+                sheets["Metrics"] = [(0, corrected_metrics)]
+                wrote_metrics = True
+        except Exception as _mex:
+            logging.warning(f"[PRECISION_FIX] Metrics recompute skipped: {_mex}")
+        if not wrote_metrics:
+            try:
+                sheets["Metrics"] = [(0, raw_metrics_df)]
+                wrote_metrics = True
+            except Exception as _m2:
+                logging.warning(f"[PRECISION_FIX] Metrics fallback write failed: {_m2}")
+
+        # Add MaxProfitAdj/MaxLossAdj to "Max Profit and Loss" sheet using per-trade adjusted extremes
+        try:
+            # Ensure date columns are comparable
+            if not daily_max_df.empty:
+                daily_max_df = daily_max_df.copy()
+                if not np.issubdtype(daily_max_df['Date'].dtype, np.datetime64):
+                    # ensure python date or datetime
+                    daily_max_df['Date'] = pd.to_datetime(daily_max_df['Date']).dt.date
+
+            if corrected_portfolio_df is not None and not corrected_portfolio_df.empty:
+                port_df = corrected_portfolio_df.copy()
+                # Guard: if adjusted columns are not present for any reason, compute them
+                if ('MaxProfitAdj' not in port_df.columns) or ('MaxLossAdj' not in port_df.columns):
+                    _slip_series = port_df['slippage_percent'] if 'slippage_percent' in port_df.columns else None
                     def _max_adj(row):
                         try:
                             ent = float(row.get('Entry at', 0))
@@ -3000,7 +4469,6 @@ class Util:
                                     s = 0.0
                             mp = float(row.get('MaxProfit', 0))
                             ml = float(row.get('MaxLoss', 0))
-                            # Derive extreme prices from points = value/qty
                             best_pts = mp/qty if qty else 0.0
                             worst_pts = ml/qty if qty else 0.0
                             if side == 'SELL':
@@ -3022,197 +4490,294 @@ class Util:
                             return round(mp_adj, 2), round(ml_adj, 2)
                         except Exception:
                             return row.get('MaxProfit', 0), row.get('MaxLoss', 0)
-                    max_vals = transactionDf.apply(_max_adj, axis=1, result_type='expand')
-                    transactionDf['MaxProfitAdj'] = max_vals[0]
-                    transactionDf['MaxLossAdj'] = max_vals[1]
-                except Exception as _e:
-                    logging.warning(f"[PRECISION_FIX] MaxProfit/MaxLoss slippage-adj skipped: {_e}")
-
-                # Recompute Day/Month wise stats from corrected Net PNL
-                try:
-                    corrected_trades = pd.DataFrame({
-                        'entryDate': pd.to_datetime(transactionDf['Entry Date']).dt.date,
-                        'bookedPnL': transactionDf['Net PNL']
-                    })
-                    corrected_day = Util.getDayWiseStats(tradesDf=corrected_trades)
-                    corrected_month = Util.getMonthWiseStats(tradesDf=corrected_trades)
-                except Exception:
-                    # Fallback to provided stats if recomputation fails
-                    corrected_day = stgyDayWiseStats[stgyName]
-                    corrected_month = stgyMonthWiseStats[stgyName]
-
-                # Buffer results to control final sheet order (write PORTFOLIO Results with summaries later)
-                if stgyName == 'portfolio':
-                    portfolio_day_df = corrected_day.copy()
-                    portfolio_month_df = corrected_month.copy()
-                    portfolio_margin_df = stgyMarginPercentageWiseStats[stgyName].copy()
-                else:
-                    strategy_results[stgyName] = (
-                        corrected_day.copy(),
-                        corrected_month.copy(),
-                        stgyMarginPercentageWiseStats[stgyName].copy()
+                    max_vals = port_df.apply(_max_adj, axis=1, result_type='expand')
+                    port_df['MaxProfitAdj'] = max_vals[0]
+                    port_df['MaxLossAdj'] = max_vals[1]
+
+                # Aggregate per day to derive adjustment scale factors
+                port_df['Entry Date'] = pd.to_datetime(port_df['Entry Date']).dt.date
+                agg = port_df.groupby('Entry Date').agg({
+                    'MaxProfit': 'sum', 'MaxProfitAdj': 'sum',
+                    'MaxLoss': 'sum', 'MaxLossAdj': 'sum'
+                }).reset_index().rename(columns={'Entry Date': 'Date'})
+
+                # Merge and compute adjusted daily extremes via ratio method
+                if not daily_max_df.empty:
+                    merged = daily_max_df.merge(agg, on='Date', how='left')
+                    # Profit ratio (fallback 1 where denom is 0 or NaN)
+                    profit_ratio = np.where(
+                        (merged['Max Profit'].notna()) & (merged['Max Profit'] != 0),
+                        np.where(merged['MaxProfit'].fillna(0) != 0,
+                                 (merged['MaxProfitAdj'].fillna(0) / merged['MaxProfit'].replace({0: np.nan})),
+                                 1.0),
+                        1.0
                     )
-
-                # Capture corrected transaction for later writing to control sheet order
-                if stgyName == 'portfolio':
-                    corrected_portfolio_df = transactionDf.copy()
-                else:
-                    # For non-portfolio strategies, queue them to write as a final group
-                    queued_strategy_trans[stgyName] = transactionDf.copy()
-
-                if not onlyStgyResults: # only portfolio stats required
-                    break
-
-            # 1) Write PORTFOLIO Results first among summaries
-            try:
-                if portfolio_day_df is not None and portfolio_month_df is not None and portfolio_margin_df is not None:
-                    portfolio_day_df.to_excel(writer, sheet_name=f"PORTFOLIO Results", index=False, startrow=0)
-                    portfolio_month_df.to_excel(writer, sheet_name=f"PORTFOLIO Results", index=False, startrow=portfolio_day_df.shape[0] + 3)
-                    portfolio_margin_df.to_excel(writer, sheet_name=f"PORTFOLIO Results", index=False, startrow=portfolio_day_df.shape[0] + portfolio_month_df.shape[0] + 6)
-            except Exception as _pr_ex:
-                logging.warning(f"[PRECISION_FIX] Failed writing PORTFOLIO Results in summary group: {_pr_ex}")
-
-            # Overwrite Metrics with corrected day-wise Net PNL from corrected portfolio if available
-            wrote_metrics = False
+                    # Loss ratio uses magnitudes
+                    loss_ratio = np.where(
+                        (merged['Max Loss'].notna()) & (merged['Max Loss'] != 0),
+                        np.where(merged['MaxLoss'].fillna(0) != 0,
+                                 (merged['MaxLossAdj'].abs().fillna(0) / merged['MaxLoss'].abs().replace({0: np.nan})),
+                                 1.0),
+                        1.0
+                    )
+                    merged['MaxProfitAdj'] = np.round(merged['Max Profit'] * profit_ratio, 2)
+                    merged['MaxLossAdj'] = -np.round(merged['Max Loss'].abs() * loss_ratio, 2)
+
+                    # Retain original columns + adjusted in required order
+                    cols = ['Date', 'Max Profit', 'MaxProfitAdj', 'Max Profit Time', 'Max Loss', 'MaxLossAdj', 'Max Loss Time']
+                    daily_max_df = merged[cols]
+
+            # Finally, write the updated sheet
+            sheets["Max Profit and Loss"] = [(0, daily_max_df)]
+            logging.info("[PRECISION_FIX] Wrote Max Profit and Loss with adjusted columns (MaxProfitAdj/MaxLossAdj)")
+        except Exception as _dmax_ex:
+            # Fall back to original if any issue
             try:
-                if corrected_portfolio_df is not None:
-                    portfolio_pnl = corrected_portfolio_df[['Entry Date','Net PNL']].copy()
-                    portfolio_pnl.columns = ['entryDate','bookedPnL']
-                    # Ensure entryDate is datetime.date
-                    portfolio_pnl['entryDate'] = pd.to_datetime(portfolio_pnl['entryDate']).dt.date
-                    corrected_metrics = Util.getBacktestStats(tradesDf=portfolio_pnl, initialCapital=initialCapital)
-                    corrected_metrics.to_excel(writer, sheet_name="Metrics", index=False)
-                    wrote_metrics = True
-            except Exception as _mex:
-                logging.warning(f"[PRECISION_FIX] Metrics recompute skipped: {_mex}")
-            if not wrote_metrics:
-                try:
-                    raw_metrics_df.to_excel(writer, sheet_name="Metrics", index=False)
-                    wrote_metrics = True
-                except Exception as _m2:
-                    logging.warning(f"[PRECISION_FIX] Metrics fallback write failed: {_m2}")
+                sheets["Max Profit and Loss"] = [(0, dailyMaxProfitLossDf)]
+            except Exception:
+                pass
+            logging.warning(f"[PRECISION_FIX] Skipped adjusted Max Profit/Loss computation: {_dmax_ex}")
 
-            # Add MaxProfitAdj/MaxLossAdj to "Max Profit and Loss" sheet using per-trade adjusted extremes
-            try:
-                # Ensure date columns are comparable
-                if not daily_max_df.empty:
-                    daily_max_df = daily_max_df.copy()
-                    if not np.issubdtype(daily_max_df['Date'].dtype, np.datetime64):
-                        # ensure python date or datetime
-                        daily_max_df['Date'] = pd.to_datetime(daily_max_df['Date']).dt.date
-
-                if corrected_portfolio_df is not None and not corrected_portfolio_df.empty:
-                    port_df = corrected_portfolio_df.copy()
-                    # Guard: if adjusted columns are not present for any reason, compute them
-                    if ('MaxProfitAdj' not in port_df.columns) or ('MaxLossAdj' not in port_df.columns):
-                        _slip_series = port_df['slippage_percent'] if 'slippage_percent' in port_df.columns else None
-                        def _max_adj(row):
-                            try:
-                                ent = float(row.get('Entry at', 0))
-                                qty = float(row.get('Qty', 0))
-                                side = str(row.get('Trade', '')).strip().upper()
-                                s = 0.0
-                                if _slip_series is not None and row.name in _slip_series.index:
-                                    try:
-                                        s = float(_slip_series.loc[row.name])
-                                    except Exception:
-                                        s = 0.0
-                                mp = float(row.get('MaxProfit', 0))
-                                ml = float(row.get('MaxLoss', 0))
-                                best_pts = mp/qty if qty else 0.0
-                                worst_pts = ml/qty if qty else 0.0
-                                if side == 'SELL':
-                                    ext_best = ent - best_pts
-                                    ext_worst = ent + worst_pts
-                                    ent_s = ent*(1 - s)
-                                    ext_best_s = ext_best*(1 + s)
-                                    ext_worst_s = ext_worst*(1 + s)
-                                    mp_adj = (ent_s - ext_best_s)*qty
-                                    ml_adj = (ext_worst_s - ent_s)*qty
-                                else:
-                                    ext_best = ent + best_pts
-                                    ext_worst = ent - worst_pts
-                                    ent_s = ent*(1 + s)
-                                    ext_best_s = ext_best*(1 - s)
-                                    ext_worst_s = ext_worst*(1 - s)
-                                    mp_adj = (ext_best_s - ent_s)*qty
-                                    ml_adj = (ent_s - ext_worst_s)*qty
-                                return round(mp_adj, 2), round(ml_adj, 2)
-                            except Exception:
-                                return row.get('MaxProfit', 0), row.get('MaxLoss', 0)
-                        max_vals = port_df.apply(_max_adj, axis=1, result_type='expand')
-                        port_df['MaxProfitAdj'] = max_vals[0]
-                        port_df['MaxLossAdj'] = max_vals[1]
-
-                    # Aggregate per day to derive adjustment scale factors
-                    port_df['Entry Date'] = pd.to_datetime(port_df['Entry Date']).dt.date
-                    agg = port_df.groupby('Entry Date').agg({
-                        'MaxProfit': 'sum', 'MaxProfitAdj': 'sum',
-                        'MaxLoss': 'sum', 'MaxLossAdj': 'sum'
-                    }).reset_index().rename(columns={'Entry Date': 'Date'})
-
-                    # Merge and compute adjusted daily extremes via ratio method
-                    if not daily_max_df.empty:
-                        merged = daily_max_df.merge(agg, on='Date', how='left')
-                        # Profit ratio (fallback 1 where denom is 0 or NaN)
-                        profit_ratio = np.where(
-                            (merged['Max Profit'].notna()) & (merged['Max Profit'] != 0),
-                            np.where(merged['MaxProfit'].fillna(0) != 0,
-                                     (merged['MaxProfitAdj'].fillna(0) / merged['MaxProfit'].replace({0: np.nan})),
-                                     1.0),
-                            1.0
-                        )
-                        # Loss ratio uses magnitudes
-                        loss_ratio = np.where(
-                            (merged['Max Loss'].notna()) & (merged['Max Loss'] != 0),
-                            np.where(merged['MaxLoss'].fillna(0) != 0,
-                                     (merged['MaxLossAdj'].abs().fillna(0) / merged['MaxLoss'].abs().replace({0: np.nan})),
-                                     1.0),
-                            1.0
-                        )
-                        merged['MaxProfitAdj'] = np.round(merged['Max Profit'] * profit_ratio, 2)
-                        merged['MaxLossAdj'] = -np.round(merged['Max Loss'].abs() * loss_ratio, 2)
-
-                        # Retain original columns + adjusted in required order
-                        cols = ['Date', 'Max Profit', 'MaxProfitAdj', 'Max Profit Time', 'Max Loss', 'MaxLossAdj', 'Max Loss Time']
-                        daily_max_df = merged[cols]
-
-                # Finally, write the updated sheet
-                daily_max_df.to_excel(writer, sheet_name="Max Profit and Loss", index=False)
-                logging.info("[PRECISION_FIX] Wrote Max Profit and Loss with adjusted columns (MaxProfitAdj/MaxLossAdj)")
-            except Exception as _dmax_ex:
-                # Fall back to original if any issue
-                try:
-                    dailyMaxProfitLossDf.to_excel(writer, sheet_name="Max Profit and Loss", index=False)
-                except Exception:
-                    pass
-                logging.warning(f"[PRECISION_FIX] Skipped adjusted Max Profit/Loss computation: {_dmax_ex}")
+        # 2) Write transactions in required order first: PORTFOLIO Trans
+        try:
+            if corrected_portfolio_df is not None:
+                sheets["PORTFOLIO Trans"] = [(0, corrected_portfolio_df)]
+        except Exception as _tw_ex:
+            logging.warning(f"[PRECISION_FIX] Transaction sheet write ordering issue: {_tw_ex}")
 
-            # 2) Write transactions in required order first: PORTFOLIO Trans
-            try:
-                if corrected_portfolio_df is not None:
-                    corrected_portfolio_df.to_excel(writer, sheet_name="PORTFOLIO Trans", index=False)
-            except Exception as _tw_ex:
-                logging.warning(f"[PRECISION_FIX] Transaction sheet write ordering issue: {_tw_ex}")
+        # 3) Finally, write strategy results (non-portfolio) before strategy trans group to keep trans last
+        try:
+            for _stgy, (_day, _month, _margin) in strategy_results.items():
+                sheet_nm = f"{_stgy.upper()} Results"
+                sheets[sheet_nm] = [(0, _day), (_day.shape[0] + 3, _month), (_day.shape[0] + _month.shape[0] + 6, _margin)]
+        except Exception as _sr_ex:
+            logging.warning(f"[PRECISION_FIX] Strategy Results write issue: {_sr_ex}")
 
-            # 3) Finally, write strategy results (non-portfolio) before strategy trans group to keep trans last
-            try:
-                for _stgy, (_day, _month, _margin) in strategy_results.items():
-                    sheet_nm = f"{_stgy.upper()} Results"
-                    _day.to_excel(writer, sheet_name=sheet_nm, index=False, startrow=0)
-                    _month.to_excel(writer, sheet_name=sheet_nm, index=False, startrow=_day.shape[0] + 3)
-                    _margin.to_excel(writer, sheet_name=sheet_nm, index=False, startrow=_day.shape[0] + _month.shape[0] + 6)
-            except Exception as _sr_ex:
-                logging.warning(f"[PRECISION_FIX] Strategy Results write issue: {_sr_ex}")
-
-            # 4) Finally, write strategy transactions (last group)
-            try:
-                for _stgy, _df in queued_strategy_trans.items():
-                    _df.to_excel(writer, sheet_name=f"{_stgy.upper()} Trans", index=False)
-            except Exception as _tw2_ex:
-                logging.warning(f"[PRECISION_FIX] Strategy Trans sheet write ordering issue: {_tw2_ex}")
+        # 4) Finally, write strategy transactions (last group)
+        try:
+            for _stgy, _df in queued_strategy_trans.items():
+                sheets[f"{_stgy.upper()} Trans"] = [(0, _df)]
+        except Exception as _tw2_ex:
+            logging.warning(f"[PRECISION_FIX] Strategy Trans sheet write ordering issue: {_tw2_ex}")
+
+        Util.writeExcelSheets(btResultFile=btResultFile, sheets=sheets, excelFileExists=excelFileExists)
 
         endTime = datetime.now()
         durationn = round((endTime-startTime).total_seconds(),2)
         
         logging.info(f"{endTime}, Excel file prepared, Time taken: {durationn} \n")
+
+    @staticmethod
+    def writeExcelSheets(btResultFile: str, sheets: dict, excelFileExists: bool = False) -> None:
+        """
+        Write {sheet name: [(startrow, frame)]} to btResultFile in dict order, frames without index like DataFrame.to_excel.
+        With EXCEL_WRITER "streaming" a write-only workbook is used, rows are flushed to disk as they are converted instead of 
+        keeping every cell of the workbook in memory. Appending to an existing workbook needs the in-memory openpyxl writer.
+        """
+
+        if Util.EXCEL_WRITER is None:
+            Util.EXCEL_WRITER = config.get_effective_toggles(logger=logging)['EXCEL_WRITER'].strip().lower()
+
+        if excelFileExists or (Util.EXCEL_WRITER != "streaming"):
+
+            if excelFileExists:
+                excelObjj = pd.ExcelWriter(btResultFile, engine='openpyxl', mode="a", if_sheet_exists="overlay")
+            else:
+                excelObjj = pd.ExcelWriter(btResultFile, engine='openpyxl', mode="w")
+            
+            with excelObjj as writer:
+                for sheetName, frames in sheets.items():
+                    for startRow, frame in frames:
+                        frame.to_excel(writer, sheet_name=sheetName, index=False, startrow=startRow)
+            return
+
+        workbook = openpyxl.Workbook(write_only=True)
+
+        for sheetName, frames in sheets.items():
+
+            worksheet = workbook.create_sheet(title=sheetName)
+            rowsWritten = 0
+
+            for startRow, frame in frames:
+                for _ in range(startRow-rowsWritten):
+                    worksheet.append([])
+                rowsWritten = startRow + Util.appendExcelFrame(worksheet=worksheet, frame=frame)
+
+        workbook.save(btResultFile)
+
+    @staticmethod
+    def appendExcelFrame(worksheet, frame: pd.DataFrame) -> int:
+        """
+        Append the header and rows of frame to a write-only worksheet, EXCEL_WRITE_CHUNK_ROWS rows converted at a time. Cell values 
+        follow DataFrame.to_excel (ExcelFormatter._format_value and ExcelWriter._value_with_fmt): missing values left empty, infinities 
+        as "inf"/"-inf", dates and datetimes with pandas' formats, timedeltas as day fractions, other objects (e.g. times) as text.
+        Returns the number of rows written. tools/check_excel_writer_parity.py compares the output with DataFrame.to_excel.
+        """
+
+        def toCell(value):
+            if value is None or isinstance(value, (str, bool, int, np.bool_, np.integer)):
+                return value
+            if isinstance(value, (float, np.floating)):
+                return ("inf" if value > 0 else "-inf") if np.isinf(value) else value
+            if isinstance(value, datetime):
+                cell = WriteOnlyCell(worksheet, value=value)
+                cell.number_format = "YYYY-MM-DD HH:MM:SS"
+                return cell
+            if isinstance(value, date):
+                cell = WriteOnlyCell(worksheet, value=value)
+                cell.number_format = "YYYY-MM-DD"
+                return cell
+            if isinstance(value, timedelta):
+                cell = WriteOnlyCell(worksheet, value=value.total_seconds() / 86400)
+                cell.number_format = "0"
+                return cell
+            if isinstance(value, Decimal):
+                return value
+            return str(value)
+
+        worksheet.append(list(frame.columns))
+
+        for __start in range(0, len(frame), Util.EXCEL_WRITE_CHUNK_ROWS):
+
+            chunk = frame.iloc[__start:__start+Util.EXCEL_WRITE_CHUNK_ROWS]
+            columnValues = []
+
+            for __colNo in range(chunk.shape[1]):
+
+                series = chunk.iloc[:, __colNo]
+                values = series.astype(object).where(series.notna(), None).tolist()
+
+                if pd.api.types.is_float_dtype(series.dtype):
+                    isInf = np.isinf(series.to_numpy(dtype=float, na_value=np.nan))
+                    if isInf.any():
+                        values = [(("inf" if __value > 0 else "-inf") if __isInf else __value) for __value, __isInf in zip(values, isInf)]
+                
+                elif not (pd.api.types.is_integer_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype)):
+                    values = [toCell(__value) for __value in values]
+
+                columnValues.append(values)
+
+            for __row in zip(*columnValues):
+                worksheet.append(__row)
+
+        return len(frame)+1
+
+    @staticmethod
+    def getOutputFramesFolder(btResultFile: str) -> str:
+        """Folder keeping the frames of a not yet rendered result workbook, next to it"""
+        return f"{os.path.splitext(btResultFile)[0]}.frames"
+
+    @staticmethod
+    def saveOutputFrame(frame: pd.DataFrame, folderPath: str, frameName: str) -> str:
+        """Save frame as Feather, frames Arrow can not hold (mixed object columns, non-string headers) or without pyarrow as pickle"""
+
+        try:
+            # Arrow coerces mixed object columns (e.g. dates and numbers in the stats table) to one type
+            if any(pd.api.types.infer_dtype(frame[__col], skipna=True).startswith("mixed") for __col in frame.columns[frame.dtypes == object]):
+                raise TypeError("mixed column")
+            fileName = f"{frameName}.feather"
+            frame.reset_index(drop=True).to_feather(os.path.join(folderPath, fileName))
+        except Exception:
+            fileName = f"{frameName}.pkl"
+            frame.to_pickle(os.path.join(folderPath, fileName))
+
+        return fileName
+
+    @staticmethod
+    def loadOutputFrame(filePath: str) -> pd.DataFrame:
+
+        if filePath.endswith(".feather"):
+            return pd.read_feather(filePath)
+        return pd.read_pickle(filePath)
+
+    @staticmethod
+    def prepareOutputExport(btResultFile: str, btStatsTableData: pd.DataFrame, stgywiseTransactionDf: dict, stgyDayWiseStats: dict, stgyMonthWiseStats: dict, stgyMarginPercentageWiseStats: dict, onlyStgyResults: bool, dailyMaxProfitLossDf: pd.DataFrame, initialCapital: float = 0.0) -> str:
+        """
+        Excel export of a backtest: with EXCEL_EXPORT "eager" the workbook is written now (prepareOutputFile), with "lazy" only its 
+        frames are kept (getOutputFramesFolder) and renderOutputFile writes the workbook on its first download.
+        Returns the path of the workbook or of its frames folder.
+        """
+
+        if Util.EXCEL_EXPORT is None:
+            Util.EXCEL_EXPORT = config.get_effective_toggles(logger=logging)['EXCEL_EXPORT'].strip().lower()
+
+        if Util.EXCEL_EXPORT == "eager":
+            Util.prepareOutputFile(
+                btResultFile=btResultFile, btStatsTableData=btStatsTableData, stgywiseTransactionDf=stgywiseTransactionDf, stgyDayWiseStats=stgyDayWiseStats, 
+                stgyMonthWiseStats=stgyMonthWiseStats, stgyMarginPercentageWiseStats=stgyMarginPercentageWiseStats, onlyStgyResults=onlyStgyResults, 
+                excelFileExists=False, dailyMaxProfitLossDf=dailyMaxProfitLossDf, initialCapital=initialCapital
+            )
+            return btResultFile
+
+        startTime = datetime.now()
+
+        framesFolder = Util.getOutputFramesFolder(btResultFile=btResultFile)
+        tmpFolder = f"{framesFolder}.{os.getpid()}.{threading.get_ident()}.tmp"
+        os.makedirs(tmpFolder, exist_ok=True)
+
+        strategyNames = list(dict.fromkeys([*stgywiseTransactionDf, *stgyDayWiseStats, *stgyMonthWiseStats, *stgyMarginPercentageWiseStats]))
+        manifest = {
+            "onlyStgyResults": onlyStgyResults, "initialCapital": initialCapital, "strategies": strategyNames, 
+            "stats": Util.saveOutputFrame(frame=btStatsTableData, folderPath=tmpFolder, frameName="stats"), 
+            "dailyMaxProfitLoss": Util.saveOutputFrame(frame=dailyMaxProfitLossDf, folderPath=tmpFolder, frameName="dailymaxprofitloss"), 
+            "transactions": {}, "dayWise": {}, "monthWise": {}, "marginPercentWise": {}
+        }
+
+        for __stgyNo, __stgyName in enumerate(strategyNames):
+            for __tableName, __tables in [
+                ("transactions", stgywiseTransactionDf), ("dayWise", stgyDayWiseStats), ("monthWise", stgyMonthWiseStats), 
+                ("marginPercentWise", stgyMarginPercentageWiseStats)
+            ]:
+                if __stgyName in __tables:
+                    manifest[__tableName][__stgyName] = Util.saveOutputFrame(frame=__tables[__stgyName], folderPath=tmpFolder, frameName=f"{__tableName.lower()}_{__stgyNo}")
+
+        with open(os.path.join(tmpFolder, "manifest.json"), "w") as ff:
+            ff.write(json.dumps(manifest, default=str))
+
+        shutil.rmtree(framesFolder, ignore_errors=True)
+        os.replace(tmpFolder, framesFolder)
+
+        logging.info(f"Excel export deferred, frames kept in {framesFolder}, Time taken: {round((datetime.now()-startTime).total_seconds(), 2)}")
+        return framesFolder
+
+    @staticmethod
+    def renderOutputFile(btResultFile: str) -> Optional[str]:
+        """Workbook of a backtest, written from its frames folder on first call (see prepareOutputExport), None when neither exists"""
+
+        if os.path.exists(btResultFile):
+            return btResultFile
+
+        framesFolder = Util.getOutputFramesFolder(btResultFile=btResultFile)
+
+        with Util.OUTPUT_RENDER_LOCK:
+
+            if os.path.exists(btResultFile):
+                return btResultFile
+            
+            if not os.path.exists(os.path.join(framesFolder, "manifest.json")):
+                return None
+
+            with open(os.path.join(framesFolder, "manifest.json"), "r") as ff:
+                manifest = json.loads(ff.read())
+
+            tables = {
+                __tableName: {__stgyName: Util.loadOutputFrame(filePath=os.path.join(framesFolder, __fileName)) for __stgyName, __fileName in manifest[__tableName].items()}
+                for __tableName in ["transactions", "dayWise", "monthWise", "marginPercentWise"]
+            }
+
+            # the lock only covers this process, other gunicorn workers may render the same result at once
+            renderFile = f"{os.path.splitext(btResultFile)[0]}.{os.getpid()}.{threading.get_ident()}.rendering.xlsx"
+            try:
+                Util.prepareOutputFile(
+                    btResultFile=renderFile, btStatsTableData=Util.loadOutputFrame(filePath=os.path.join(framesFolder, manifest['stats'])), 
+                    stgywiseTransactionDf=tables['transactions'], stgyDayWiseStats=tables['dayWise'], stgyMonthWiseStats=tables['monthWise'], 
+                    stgyMarginPercentageWiseStats=tables['marginPercentWise'], onlyStgyResults=manifest['onlyStgyResults'], excelFileExists=False, 
+                    dailyMaxProfitLossDf=Util.loadOutputFrame(filePath=os.path.join(framesFolder, manifest['dailyMaxProfitLoss'])), 
+                    initialCapital=manifest['initialCapital']
+                )
+                os.replace(renderFile, btResultFile)
+            finally:
+                if os.path.exists(renderFile):
+                    os.remove(renderFile)
+
+        return btResultFile
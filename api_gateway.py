@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
 import requests
 import logging
@@ -6,6 +6,7 @@ import os
 import pandas as pd
 import json
 from werkzeug.utils import secure_filename
+from urllib.parse import quote
 import tempfile
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
@@ -18,9 +19,9 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Backend service URLs
-BACKTEST_SERVICE_URL = "http://localhost:8009"
-TRADINGVIEW_SERVICE_URL = "http://localhost:8011"
-SIMPLE_BACKTEST_SERVICE_URL = "http://localhost:8012"
+BACKTEST_SERVICE_URL = os.environ.get("BACKTEST_SERVICE_URL", "http://localhost:8009")
+TRADINGVIEW_SERVICE_URL = os.environ.get("TRADINGVIEW_SERVICE_URL", "http://localhost:8011")
+SIMPLE_BACKTEST_SERVICE_URL = os.environ.get("SIMPLE_BACKTEST_SERVICE_URL", "http://localhost:8012")
 
 @app.route('/', methods=['GET'])
 def serve_root():
@@ -69,6 +70,10 @@ def login():
         logger.error(f"Error in login: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+def relay_response(response):
+    """Service response body, status and content type as they are, so non-JSON bodies (proxy or server error pages) reach the client too"""
+    return Response(response.content, status=response.status_code, content_type=response.headers.get("Content-Type", "application/json"))
+
 @app.route('/api/backtest/run', methods=['POST'])
 def run_backtest():
     """Proxy to the main backtest service"""
@@ -78,11 +83,12 @@ def run_backtest():
 
         response = requests.post(
             f"{BACKTEST_SERVICE_URL}/backtest",
-            json={"parameters": data},
+            json={"parameters": data, "layout": request.args.get("layout", ""), "transactions": request.args.get("transactions", "")},  # ?layout=columns, ?transactions=paged
             timeout=300  # 5 minute timeout
         )
 
-        return jsonify(response.json()), response.status_code
+        # relay the service body as is, result json is large and already serialized once
+        return relay_response(response)
 
     except requests.exceptions.Timeout:
         return jsonify({"status": "error", "message": "Backtest service timeout"}), 408
@@ -101,11 +107,12 @@ def run_tradingview_backtest_legacy():
 
         response = requests.post(
             f"{TRADINGVIEW_SERVICE_URL}/backtest",
-            json={"parameters": data},
+            json={"parameters": data, "layout": request.args.get("layout", ""), "transactions": request.args.get("transactions", "")},
             timeout=300  # 5 minute timeout
         )
 
-        return jsonify(response.json()), response.status_code
+        # relay the service body as is, result json is large and already serialized once
+        return relay_response(response)
 
     except requests.exceptions.Timeout:
         return jsonify({"status": "error", "message": "TradingView service timeout"}), 408
@@ -115,6 +122,126 @@ def run_tradingview_backtest_legacy():
         logger.error(f"Error in run_tradingview_backtest: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+def proxy_job_request(service_url, service_name, path, method="GET", payload=None):
+    """Forward a backtest job request, these return straight away so the timeout stays short"""
+    try:
+        if method == "POST":
+            response = requests.post(f"{service_url}{path}", json=payload, timeout=30)
+        else:
+            response = requests.get(f"{service_url}{path}", timeout=30)
+
+        return relay_response(response)
+
+    except requests.exceptions.Timeout:
+        return jsonify({"status": "error", "message": f"{service_name} service timeout"}), 408
+    except requests.exceptions.ConnectionError:
+        return jsonify({"status": "error", "message": f"{service_name} service unavailable"}), 503
+    except Exception as e:
+        logger.error(f"Error in {service_name} job request {path}: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route('/api/backtest/jobs', methods=['POST'])
+def submit_backtest_job():
+    """Queue a backtest on the main backtest service, returns the job id"""
+    return proxy_job_request(BACKTEST_SERVICE_URL, "Backtest", "/backtest/jobs", method="POST", payload={"parameters": request.get_json(), "layout": request.args.get("layout", "")})
+
+@app.route('/api/backtest/jobs/<job_id>', methods=['GET'])
+def get_backtest_job(job_id):
+    """Status and progress of a backtest job"""
+    return proxy_job_request(BACKTEST_SERVICE_URL, "Backtest", f"/backtest/jobs/{job_id}")
+
+@app.route('/api/backtest/jobs/<job_id>/result', methods=['GET'])
+def get_backtest_job_result(job_id):
+    """Result of a finished backtest job, 202 while it is still running"""
+    return proxy_job_request(BACKTEST_SERVICE_URL, "Backtest", f"/backtest/jobs/{job_id}/result?{request.query_string.decode()}")
+
+@app.route('/api/tradingview/jobs', methods=['POST'])
+def submit_tradingview_job():
+    """Queue a backtest on the TradingView backtest service, returns the job id"""
+    return proxy_job_request(TRADINGVIEW_SERVICE_URL, "TradingView", "/backtest/jobs", method="POST", payload={"parameters": request.get_json(), "layout": request.args.get("layout", "")})
+
+@app.route('/api/tradingview/jobs/<job_id>', methods=['GET'])
+def get_tradingview_job(job_id):
+    """Status and progress of a TradingView backtest job"""
+    return proxy_job_request(TRADINGVIEW_SERVICE_URL, "TradingView", f"/backtest/jobs/{job_id}")
+
+@app.route('/api/tradingview/jobs/<job_id>/result', methods=['GET'])
+def get_tradingview_job_result(job_id):
+    """Result of a finished TradingView backtest job, 202 while it is still running"""
+    return proxy_job_request(TRADINGVIEW_SERVICE_URL, "TradingView", f"/backtest/jobs/{job_id}/result?{request.query_string.decode()}")
+
+def proxy_stream_request(service_url, service_name):
+    """Forward a streaming backtest and relay its server-sent events as they arrive, no read timeout as events keep coming"""
+    try:
+        response = requests.post(f"{service_url}/backtest/stream", json={"parameters": request.get_json(), "layout": request.args.get("layout", "")}, stream=True, timeout=(10, None))
+
+        if "text/event-stream" not in response.headers.get("Content-Type", ""):
+            return relay_response(response)
+
+        return Response(
+            response.iter_content(chunk_size=None), mimetype="text/event-stream", 
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    except requests.exceptions.Timeout:
+        return jsonify({"status": "error", "message": f"{service_name} service timeout"}), 408
+    except requests.exceptions.ConnectionError:
+        return jsonify({"status": "error", "message": f"{service_name} service unavailable"}), 503
+    except Exception as e:
+        logger.error(f"Error in {service_name} stream request: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route('/api/backtest/stream', methods=['POST'])
+def stream_backtest():
+    """Run a backtest on the main backtest service, streaming per-strategy results"""
+    return proxy_stream_request(BACKTEST_SERVICE_URL, "Backtest")
+
+@app.route('/api/tradingview/stream', methods=['POST'])
+def stream_tradingview_backtest():
+    """Run a TradingView backtest, streaming orders per signal and per-strategy results"""
+    return proxy_stream_request(TRADINGVIEW_SERVICE_URL, "TradingView")
+
+@app.route('/api/backtest/results/<result_id>/transactions', methods=['GET'])
+def get_backtest_transactions(result_id):
+    """Page of backtest transactions (page, pageSize, filters and sorting as query parameters)"""
+    return proxy_job_request(BACKTEST_SERVICE_URL, "Backtest", f"/backtest/results/{quote(result_id)}/transactions?{request.query_string.decode()}")
+
+@app.route('/api/tradingview/results/<result_id>/transactions', methods=['GET'])
+def get_tradingview_transactions(result_id):
+    """Page of TradingView backtest transactions (page, pageSize, filters and sorting as query parameters)"""
+    return proxy_job_request(TRADINGVIEW_SERVICE_URL, "TradingView", f"/backtest/results/{quote(result_id)}/transactions?{request.query_string.decode()}")
+
+def proxy_excel_request(service_url, service_name, result_id):
+    """Forward a result workbook download, the service may write the workbook first so the read timeout is long"""
+    try:
+        response = requests.get(f"{service_url}/backtest/results/{quote(result_id)}/excel", stream=True, timeout=(10, 600))
+
+        if response.status_code != 200:
+            return relay_response(response)
+
+        return Response(
+            response.iter_content(chunk_size=65536), mimetype=response.headers.get("Content-Type"), 
+            headers={"Content-Disposition": response.headers.get("Content-Disposition", f'attachment; filename="{result_id}.xlsx"')}
+        )
+
+    except requests.exceptions.Timeout:
+        return jsonify({"status": "error", "message": f"{service_name} service timeout"}), 408
+    except requests.exceptions.ConnectionError:
+        return jsonify({"status": "error", "message": f"{service_name} service unavailable"}), 503
+    except Exception as e:
+        logger.error(f"Error in {service_name} excel request: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route('/api/backtest/results/<result_id>/excel', methods=['GET'])
+def download_backtest_excel(result_id):
+    """Excel workbook of a backtest by the resultId of its response"""
+    return proxy_excel_request(BACKTEST_SERVICE_URL, "Backtest", result_id)
+
+@app.route('/api/tradingview/results/<result_id>/excel', methods=['GET'])
+def download_tradingview_excel(result_id):
+    """Excel workbook of a TradingView backtest by the resultId of its response"""
+    return proxy_excel_request(TRADINGVIEW_SERVICE_URL, "TradingView", result_id)
+
 @app.route('/api/backtest/save', methods=['POST'])
 def save_portfolio():
     """Mock portfolio save - returns success for demo purposes"""
@@ -163,7 +290,7 @@ def run_simple_backtest():
     try:
         response = requests.post(f"{SIMPLE_BACKTEST_SERVICE_URL}/simple-backtest/run",
                                json=request.get_json(), timeout=300)
-        return jsonify(response.json()), response.status_code
+        return relay_response(response)
     except requests.exceptions.RequestException as e:
         logger.error(f"Error connecting to Simple Backtest service: {str(e)}")
         return jsonify({"status": "error", "message": "Simple Backtest service unavailable"}), 503
@@ -176,7 +303,7 @@ def create_input_template():
     """Create input template JSON file"""
     try:
         response = requests.post(f"{SIMPLE_BACKTEST_SERVICE_URL}/simple-backtest/create-template", timeout=30)
-        return jsonify(response.json()), response.status_code
+        return relay_response(response)
     except requests.exceptions.RequestException as e:
         logger.error(f"Error connecting to Simple Backtest service: {str(e)}")
         return jsonify({"status": "error", "message": "Simple Backtest service unavailable"}), 503
@@ -189,7 +316,7 @@ def get_backtest_results():
     """Get latest backtest results from output file"""
     try:
         response = requests.get(f"{SIMPLE_BACKTEST_SERVICE_URL}/simple-backtest/results", timeout=30)
-        return jsonify(response.json()), response.status_code
+        return relay_response(response)
     except requests.exceptions.RequestException as e:
         logger.error(f"Error connecting to Simple Backtest service: {str(e)}")
         return jsonify({"status": "error", "message": "Simple Backtest service unavailable"}), 503
@@ -202,7 +329,7 @@ def get_input_parameters():
     """Get current input parameters"""
     try:
         response = requests.get(f"{SIMPLE_BACKTEST_SERVICE_URL}/simple-backtest/input", timeout=30)
-        return jsonify(response.json()), response.status_code
+        return relay_response(response)
     except requests.exceptions.RequestException as e:
         logger.error(f"Error connecting to Simple Backtest service: {str(e)}")
         return jsonify({"status": "error", "message": "Simple Backtest service unavailable"}), 503
@@ -216,7 +343,7 @@ def update_input_parameters():
     try:
         response = requests.post(f"{SIMPLE_BACKTEST_SERVICE_URL}/simple-backtest/update-input",
                                json=request.get_json(), timeout=30)
-        return jsonify(response.json()), response.status_code
+        return relay_response(response)
     except requests.exceptions.RequestException as e:
         logger.error(f"Error connecting to Simple Backtest service: {str(e)}")
         return jsonify({"status": "error", "message": "Simple Backtest service unavailable"}), 503
@@ -229,7 +356,7 @@ def load_sample_backtest():
     """Load and run sample backtest data"""
     try:
         response = requests.post(f"{SIMPLE_BACKTEST_SERVICE_URL}/simple-backtest/load-sample", timeout=300)
-        return jsonify(response.json()), response.status_code
+        return relay_response(response)
     except requests.exceptions.RequestException as e:
         logger.error(f"Error connecting to Simple Backtest service: {str(e)}")
         return jsonify({"status": "error", "message": "Simple Backtest service unavailable"}), 503
@@ -243,7 +370,7 @@ def run_backtest_with_data():
     try:
         response = requests.post(f"{SIMPLE_BACKTEST_SERVICE_URL}/simple-backtest/run-with-data",
                                json=request.get_json(), timeout=300)
-        return jsonify(response.json()), response.status_code
+        return relay_response(response)
     except requests.exceptions.RequestException as e:
         logger.error(f"Error connecting to Simple Backtest service: {str(e)}")
         return jsonify({"status": "error", "message": "Simple Backtest service unavailable"}), 503
@@ -293,7 +420,7 @@ def run_standard_backtest():
     """Run standard backtest using JSON files"""
     try:
         response = requests.post(f"{BACKTEST_SERVICE_URL}/standard-backtest/run", timeout=300)
-        return jsonify(response.json()), response.status_code
+        return relay_response(response)
     except requests.exceptions.RequestException as e:
         logger.error(f"Error connecting to Standard Backtest service: {str(e)}")
         return jsonify({"status": "error", "message": "Standard Backtest service unavailable"}), 503
@@ -306,7 +433,7 @@ def get_standard_input():
     """Get current input parameters for standard backtest"""
     try:
         response = requests.get(f"{BACKTEST_SERVICE_URL}/standard-backtest/input", timeout=30)
-        return jsonify(response.json()), response.status_code
+        return relay_response(response)
     except requests.exceptions.RequestException as e:
         logger.error(f"Error connecting to Standard Backtest service: {str(e)}")
         return jsonify({"status": "error", "message": "Standard Backtest service unavailable"}), 503
@@ -320,7 +447,7 @@ def update_sample_backtest():
     try:
         response = requests.post(f"{BACKTEST_SERVICE_URL}/standard-backtest/update-sample",
                                json=request.get_json(), timeout=30)
-        return jsonify(response.json()), response.status_code
+        return relay_response(response)
     except requests.exceptions.RequestException as e:
         logger.error(f"Error connecting to Standard Backtest service: {str(e)}")
         return jsonify({"status": "error", "message": "Standard Backtest service unavailable"}), 503
@@ -334,7 +461,7 @@ def update_input_portfolio():
     try:
         response = requests.post(f"{BACKTEST_SERVICE_URL}/standard-backtest/update-portfolio",
                                json=request.get_json(), timeout=30)
-        return jsonify(response.json()), response.status_code
+        return relay_response(response)
     except requests.exceptions.RequestException as e:
         logger.error(f"Error connecting to Standard Backtest service: {str(e)}")
         return jsonify({"status": "error", "message": "Standard Backtest service unavailable"}), 503
@@ -348,7 +475,7 @@ def run_tradingview_backtest():
     """Run TradingView backtest using JSON files"""
     try:
         response = requests.post(f"{TRADINGVIEW_SERVICE_URL}/tradingview-backtest/run", timeout=300)
-        return jsonify(response.json()), response.status_code
+        return relay_response(response)
     except requests.exceptions.RequestException as e:
         logger.error(f"Error connecting to TradingView Backtest service: {str(e)}")
         return jsonify({"status": "error", "message": "TradingView Backtest service unavailable"}), 503
@@ -361,7 +488,7 @@ def get_tradingview_input():
     """Get current input parameters for TradingView backtest"""
     try:
         response = requests.get(f"{TRADINGVIEW_SERVICE_URL}/tradingview-backtest/input", timeout=30)
-        return jsonify(response.json()), response.status_code
+        return relay_response(response)
     except requests.exceptions.RequestException as e:
         logger.error(f"Error connecting to TradingView Backtest service: {str(e)}")
         return jsonify({"status": "error", "message": "TradingView Backtest service unavailable"}), 503
@@ -375,7 +502,7 @@ def update_tradingview_file():
     try:
         response = requests.post(f"{TRADINGVIEW_SERVICE_URL}/tradingview-backtest/update",
                                json=request.get_json(), timeout=30)
-        return jsonify(response.json()), response.status_code
+        return relay_response(response)
     except requests.exceptions.RequestException as e:
         logger.error(f"Error connecting to TradingView Backtest service: {str(e)}")
         return jsonify({"status": "error", "message": "TradingView Backtest service unavailable"}), 503
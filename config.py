@@ -59,6 +59,77 @@ DEFAULT_OPT_TOGGLES = {
     "PARALLEL_BACKEND": "",
     # Max workers hint; empty means use existing behavior
     "MAX_WORKERS": "",
+    # Number of TV signals packed into one engine request (1 = one request per signal)
+    "TV_SIGNAL_BATCH_SIZE": "1",
+    # Folder keeping every single TV signal engine response by hash of its engine payload, so re-runs only send new signals to the 
+    # engine; empty disables it (used when TV_SIGNAL_BATCH_SIZE is 1)
+    "TV_SIGNAL_RESULT_STORE": "",
+    # Responses kept in the TV signal result store (least recently stored or used dropped first), 0 keeps all
+    "TV_SIGNAL_RESULT_STORE_MAX_RESULTS": "20000",
+    # Keep-alive connections kept per engine target (should cover MAX_WORKERS)
+    "ENGINE_POOL_SIZE": "16",
+    # Retries for engine connection failures and 502/503/504 responses, with exponential backoff factor in seconds
+    "ENGINE_MAX_RETRIES": "2",
+    "ENGINE_RETRY_BACKOFF": "0.5",
+    # Parsed input workbooks kept in memory (LRU, keyed by path, mtime and size), 0 disables the cache
+    "WORKBOOK_CACHE_SIZE": "32",
+    # Persist parsed workbooks as Feather files in a ".sheetcache" folder next to the source, keyed by content hash (0/1, needs pyarrow)
+    "WORKBOOK_SIDECAR_CACHE": "0",
+    # Backtest responses kept in memory per normalized engine payload and VERSION_NO (LRU), 0 disables the cache
+    "RESULT_CACHE_SIZE": "16",
+    # Age in seconds after which a cached backtest response is computed again, 0 keeps it until evicted
+    "RESULT_CACHE_TTL_SECONDS": "3600",
+    # gunicorn serving (serve.py / gunicorn.conf.py): pre-fork workers, threads per worker, request timeout and graceful shutdown seconds
+    "SERVER_WORKERS": "2",
+    "SERVER_THREADS": "8",
+    "SERVER_TIMEOUT_SECONDS": "900",
+    "SERVER_GRACEFUL_TIMEOUT_SECONDS": "120",
+    # Backtest response layout of transactions and stats tables: "records" (list of row objects) | "columns" (arrays per column),
+    # a request can ask for either with a top level "layout" key
+    "OUTPUT_JSON_LAYOUT": "records",
+    # SQLite file keeping the transactions of every result for the paginated transactions endpoint, empty disables it
+    "TRANSACTION_STORE_PATH": "Trades/transactions.db",
+    # Results kept in the transaction store (oldest dropped first), 0 keeps all
+    "TRANSACTION_STORE_MAX_RESULTS": "500",
+    # Transactions in the backtest response: "inline" (all of them) | "paged" (only their count, pages fetched from the transaction 
+    # store), a request can ask for either with a top level "transactions" key
+    "RESPONSE_TRANSACTIONS": "inline",
+    # Result workbook export: "lazy" (frames kept as Feather next to the JSON result, workbook written on first download) | "eager"
+    "EXCEL_EXPORT": "lazy",
+    # Result workbook writer: "streaming" (openpyxl write-only, rows emitted as produced) | "openpyxl" (whole workbook in memory);
+    # appending to an existing workbook always uses the in-memory writer
+    "EXCEL_WRITER": "streaming",
+    # Backtest jobs (submit/status/result endpoints) run concurrently per service process
+    "JOB_MAX_WORKERS": "2",
+    # SQLite file keeping job status and results across worker processes and restarts, empty keeps jobs in memory only (then 
+    # gunicorn.conf.py serves with a single worker)
+    "JOB_STORE_PATH": "Trades/jobs.db",
+    # Pooled historicaldb connections used by the precision mode next-bar OPEN lookups
+    "HISTORICAL_DB_POOL_SIZE": "4",
+    # SPAN margin calculator base URL (contract lists and margin-calculator/SPAN), can point to a local stub
+    "MARGIN_CALC_URL": "https://margin-calc-arom-prod.angelbroking.com",
+    # Concurrent margin calculator requests per backtest
+    "MARGIN_MAX_WORKERS": "8",
+    # Background check interval for lot size / margin contract files (and the daily margin contract download), 0 loads them once at 
+    # worker start only
+    "REFERENCE_DATA_REFRESH_SECONDS": "300",
+    # TV signal diagnostics: per-stage counts and month-wise histograms (0/1)
+    "SIGNAL_DIAGNOSTICS": "0",
+    # Comma-separated yymmdd dates whose signals are counted and sampled at every stage, e.g. "240101"
+    "SIGNAL_DIAGNOSTICS_DATES": "",
+    # Signal rows logged per traced date and stage
+    "SIGNAL_DIAGNOSTICS_SAMPLE": "3",
+    # Backend behind Util.to_tensor/from_tensor: "numpy" | "torch" (imported on first use, CUDA when available)
+    "NUMERIC_BACKEND": "numpy",
+    # Engine request body compression: "" (plain JSON) | "gzip" | "zstd" (needs zstandard, requirements-optional.txt)
+    "ENGINE_REQUEST_ENCODING": "",
+    # Engine response body requested, each needs the engine to support the same contract:
+    #   "json"    - Accept: application/json
+    #   "msgpack" - Accept: application/x-msgpack (JSON accepted as fallback), needs msgpack
+    #   "arrow"   - the same msgpack Accept header plus X-Orders-Format: arrow; the engine answers with a msgpack envelope whose
+    #               strategies.orders is an Arrow IPC stream (bytes), needs msgpack and pyarrow
+    # Formats whose packages are missing are rejected at worker start and JSON is requested instead
+    "ENGINE_RESPONSE_FORMAT": "json",
     # Indicators optimization gates (8.2)
     "GPU_OPT_SMA_CUMSUM": "0",
     "GPU_OPT_STD_CUMSUM": "0",
@@ -136,7 +207,11 @@ def _coerce_value(key: str, value: str) -> object:
     if k in {"GPU_OPT_LEVEL", "ROWGROUP_ROWS", "MAX_STREAMS", "MAX_WORKERS",
              "GPU_POOL_LIMIT_BYTES", "PROCESS_STRATEGY_THRESHOLD", "PROCESS_DEFAULT_WORKERS", "THREAD_DEFAULT_WORKERS",
              "GPU_CHUNK_SIZE_MB", "GPU_MEMORY_LIMIT_PCT", "PINNED_MEMORY_POOLS", "ROWGROUP_PREFETCH", "STREAM_CONCURRENCY",
-             "CAPABILITY_CACHE_TTL", "GDS_DIRECT_IO_SIZE_MB", "UVM_PREFETCH_PAGES", "PARTITION_CACHE_TTL"}:
+             "CAPABILITY_CACHE_TTL", "GDS_DIRECT_IO_SIZE_MB", "UVM_PREFETCH_PAGES", "PARTITION_CACHE_TTL",
+             "TV_SIGNAL_BATCH_SIZE", "TV_SIGNAL_RESULT_STORE_MAX_RESULTS", "ENGINE_POOL_SIZE", "ENGINE_MAX_RETRIES", "WORKBOOK_CACHE_SIZE",
+             "HISTORICAL_DB_POOL_SIZE", "MARGIN_MAX_WORKERS", "REFERENCE_DATA_REFRESH_SECONDS",
+             "SIGNAL_DIAGNOSTICS_SAMPLE", "RESULT_CACHE_SIZE", "RESULT_CACHE_TTL_SECONDS",
+             "TRANSACTION_STORE_MAX_RESULTS", "JOB_MAX_WORKERS", "SERVER_WORKERS", "SERVER_THREADS", "SERVER_TIMEOUT_SECONDS", "SERVER_GRACEFUL_TIMEOUT_SECONDS"}:
         try:
             # Allow blank value to represent "not set"
             return int(v) if str(v).strip() != "" else ""
@@ -148,10 +223,11 @@ def _coerce_value(key: str, value: str) -> object:
              "GPU_OPT_CUDF_ROLLING", "USE_ARROW_CUDA", "GPU_OPT_SOA_LAYOUT",
              "PARALLEL_POLICY_AUTO", "ENABLE_PERF_GUARD",
              "STREAMING_ENABLED", "H2D_OVERLAP_ENABLED", "USE_UVM",
-             "PARTITION_SCANNING_ENABLED", "PARTITION_CACHE_ENABLED", "PARALLEL_PARTITION_DISCOVERY"}:
+             "PARTITION_SCANNING_ENABLED", "PARTITION_CACHE_ENABLED", "PARALLEL_PARTITION_DISCOVERY",
+             "WORKBOOK_SIDECAR_CACHE", "SIGNAL_DIAGNOSTICS"}:
         s = str(v).strip().lower()
         return "1" if s in {"1", "true", "yes", "on"} else "0"
-    if k in {"MIN_PRUNING_BENEFIT"}:
+    if k in {"MIN_PRUNING_BENEFIT", "ENGINE_RETRY_BACKOFF"}:
         try:
             return float(v) if str(v).strip() != "" else DEFAULT_OPT_TOGGLES.get(k, v)
         except Exception:
@@ -0,0 +1,52 @@
+"""
+Gunicorn settings shared by every service (see serve.py).
+Worker/thread counts and timeouts come from config toggles (SERVER_WORKERS, SERVER_THREADS, SERVER_TIMEOUT_SECONDS,
+SERVER_GRACEFUL_TIMEOUT_SECONDS), overridable through environment variables like the other toggles.
+"""
+
+import logging
+from config import get_effective_toggles
+import sys
+
+_toggles = get_effective_toggles()
+
+# pre-fork workers, each with a thread pool so that streaming and job status requests are not stuck behind a running backtest
+worker_class = "gthread"
+workers = max(_toggles['SERVER_WORKERS'] or 1, 1)
+if (workers > 1) and (_toggles['JOB_STORE_PATH'].strip() == ""):
+    # jobs kept in memory are only known to the worker that took them, status/result requests on another worker would 404
+    logging.warning("JOB_STORE_PATH is empty, serving with a single worker instead of %s", workers)
+    workers = 1
+threads = max(_toggles['SERVER_THREADS'] or 1, 1)
+
+# synchronous /backtest requests can run for minutes
+timeout = max(_toggles['SERVER_TIMEOUT_SECONDS'] or 0, 0)
+graceful_timeout = max(_toggles['SERVER_GRACEFUL_TIMEOUT_SECONDS'] or 0, 0)
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+
+
+def post_worker_init(worker):
+    """Validate engine wire toggles and warm Util reference data (lot sizes, margin contracts) and its refresher thread in every worker before it takes requests"""
+
+    if "Util" not in sys.modules:
+        return
+
+    try:
+        sys.modules["Util"].Util.startWorkerServices()
+        worker.log.info(f"Worker {worker.pid}: reference data loaded")
+    except Exception as errormsg:
+        # requests only read what is loaded, the refresher thread (REFERENCE_DATA_REFRESH_SECONDS) retries the load
+        worker.log.error(f"Worker {worker.pid}: unable to load reference data, {errormsg}")
+
+
+def worker_exit(server, worker):
+    """Let running backtest jobs finish within the graceful timeout, queued ones are dropped and marked interrupted (also in JOB_STORE_PATH)"""
+
+    if "BacktestJobs" in sys.modules:
+        backtestJobs = sys.modules["BacktestJobs"].BacktestJobs
+        if backtestJobs.EXECUTOR is not None:
+            logging.info(f"Worker {worker.pid}: waiting for running backtest jobs")
+            backtestJobs.shutdown()
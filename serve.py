@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Production runner for the backtest services.
+
+Usage: python serve.py <backtest|tv|simple|gateway> [port]
+
+Runs the service under gunicorn with gunicorn.conf.py (pre-fork workers with threads, graceful shutdown, reference data
+warmed per worker). Where gunicorn is unavailable (e.g. Windows), falls back to a threaded werkzeug server.
+"""
+
+import os
+import sys
+
+SERVICES = {
+    "backtest": ("BTRunFromFrontend", 8009),
+    "tv": ("BTTVFromFrontend", 8011),
+    "simple": ("SimpleBacktestService", 8012),
+    "gateway": ("api_gateway", 5000),
+}
+
+
+def main():
+
+    if (len(sys.argv) < 2) or (sys.argv[1] not in SERVICES):
+        print(f"Usage: python serve.py <{'|'.join(SERVICES)}> [port]")
+        return 1
+
+    moduleName, port = SERVICES[sys.argv[1]]
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else port
+    host = os.environ.get("SERVER_HOST", "0.0.0.0")
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    try:
+        import gunicorn
+    except ImportError:
+        gunicorn = None
+
+    if (gunicorn is not None) and (os.name != "nt"):
+        os.execvp(sys.executable, [
+            sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "-b", f"{host}:{port}", f"{moduleName}:app"
+        ])
+
+    print("gunicorn is not available, serving with the threaded werkzeug server")
+
+    from werkzeug.serving import run_simple
+    import importlib
+
+    serviceModule = importlib.import_module(moduleName)
+    if "Util" in sys.modules:
+        sys.modules["Util"].Util.startWorkerServices()
+
+    run_simple(host, port, serviceModule.app, threaded=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
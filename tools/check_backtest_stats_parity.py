@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Backtest Stats Parity Check
+Runs Util.getBacktestStats (float64 NumPy) and the shipped baseline it replaced (per-element torch loops on float32
+tensors, as produced by the baseline Util.to_tensor) on randomized daily P&L series and reports every metric that differs.
+
+A metric whose 2-decimal value differs from the float32 baseline is attributed to float32 precision only when the same
+baseline code run on float64 tensors gives the vectorized value, up to one 2-decimal rounding step or 1e-9 relative
+(torch and NumPy sum in a different order). Any other difference is a behaviour change and fails the check.
+
+Usage: python tools/check_backtest_stats_parity.py [number of series] [seed]
+"""
+
+import os
+import sys
+import math
+import warnings
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Util import Util
+
+pd.set_option('mode.chained_assignment', None)
+warnings.simplefilter("ignore")
+
+def baselineBacktestStats(tradesDf: pd.DataFrame, initialCapital: float, dtype: torch.dtype = torch.float32) -> dict:
+    """
+    Util.getBacktestStats as shipped before vectorization. Its Util.to_tensor built float32 tensors (on the GPU when available),
+    dtype only changes for the precision cross-check. The streak loop writes through .loc instead of chained .iloc, which 
+    pandas with copy-on-write silently ignores (the baseline relied on pandas 2 behaviour).
+    """
+
+    number_of_trading_days_in_a_year = 252
+    risk_free_interest_rate = 5
+
+    intraday_trade_log = tradesDf[["entryDate", "bookedPnL"]].rename(columns={"entryDate": "Date", "bookedPnL": "PNL"})
+
+    pnl_tensor = torch.tensor(np.asarray(intraday_trade_log['PNL'].values), dtype=dtype)
+    equity_tensor = torch.zeros_like(pnl_tensor)
+    rate_of_return_tensor = torch.zeros_like(pnl_tensor)
+
+    equity_tensor[0] = initialCapital + pnl_tensor[0]
+    rate_of_return_tensor[0] = (pnl_tensor[0]/initialCapital) * 100
+
+    for i in range(1, len(pnl_tensor)):
+        equity_tensor[i] = equity_tensor[i-1] + pnl_tensor[i]
+        rate_of_return_tensor[i] = (pnl_tensor[i]/equity_tensor[i-1]) * 100
+
+    intraday_trade_log['Continuous_Wins'] = 0.0
+    intraday_trade_log['Continuous_Losses'] = 0.0
+
+    positive_pnl_mask = pnl_tensor > 0
+    win_rate = torch.sum(positive_pnl_mask).item() / len(pnl_tensor)
+
+    mean_win = torch.mean(pnl_tensor[positive_pnl_mask]).item()
+    mean_loss = torch.mean(pnl_tensor[~positive_pnl_mask]).item()
+    risk_reward = abs(mean_win/mean_loss) if mean_loss != 0 else float('inf')
+    expectancy = (win_rate*risk_reward) - ((1-win_rate)*1)
+
+    mean = torch.mean(rate_of_return_tensor).item() * number_of_trading_days_in_a_year - risk_free_interest_rate
+    sigma = torch.std(rate_of_return_tensor).item() * torch.sqrt(torch.tensor(number_of_trading_days_in_a_year)).item()
+    sharpe_ratio = mean/sigma if sigma != 0 else 0
+
+    negative_returns_mask = rate_of_return_tensor < 0
+    downside_standard_deviation = torch.std(rate_of_return_tensor[negative_returns_mask]).item() * torch.sqrt(torch.tensor(number_of_trading_days_in_a_year)).item()
+    sortino_ratio = mean/downside_standard_deviation if downside_standard_deviation != 0 else 0
+
+    cummax_pnl = torch.cummax(pnl_tensor, dim=0)[0]
+    drawdown_tensor = pnl_tensor - cummax_pnl
+    max_drawdown = torch.min(drawdown_tensor).item()
+
+    max_drawdown_idx = torch.argmin(drawdown_tensor).item()
+    max_drawdown_percent = max_drawdown/equity_tensor[max_drawdown_idx]*100
+
+    recovery_tensor = torch.zeros_like(drawdown_tensor)
+    for i in range(1, len(drawdown_tensor)):
+        if drawdown_tensor[i] < 0:
+            recovery_tensor[i] = recovery_tensor[i-1] + 1
+
+    intraday_trade_log['Recovery'] = recovery_tensor.numpy()
+
+    intraday_trade_log_equity_high = intraday_trade_log[intraday_trade_log['Recovery'] == 0]
+    intraday_trade_log_equity_high['number_days_between_equity_highs'] = (intraday_trade_log_equity_high['Date'] - intraday_trade_log_equity_high['Date'].shift())
+    recover = intraday_trade_log_equity_high['number_days_between_equity_highs'].apply(lambda x: x.days if not pd.isnull(x) else None).max()
+    recovery_days = np.nan if pd.isnull(recover) else int(recover)
+
+    number_of_trading_days_for_this_backtest = (intraday_trade_log.iloc[-1]['Date'] - intraday_trade_log.iloc[0]['Date']).days
+    if number_of_trading_days_for_this_backtest != 0:
+        cagr = (((equity_tensor[-1]/initialCapital)**(1/(number_of_trading_days_for_this_backtest/365)))-1)*100
+        cagr = cagr.item()
+    else:
+        cagr = 0
+
+    calmar_ratio = 0 if max_drawdown_percent == 0 else abs(cagr/max_drawdown_percent)
+
+    number_of_wins = torch.sum(positive_pnl_mask).item()
+    number_of_losses = len(pnl_tensor) - number_of_wins
+    max_pnl = torch.max(pnl_tensor).item()
+    min_pnl = torch.min(pnl_tensor).item()
+    median_of_trade = torch.median(pnl_tensor).item()
+
+    gross_profit = torch.sum(pnl_tensor[positive_pnl_mask]).item()
+    gross_loss = torch.sum(pnl_tensor[~positive_pnl_mask]).item()
+
+    if gross_loss != 0:
+        profit_factor = abs(gross_profit/gross_loss)
+        outlier_adjusted_profit_factor = abs((gross_profit-max_pnl)/gross_loss)
+    else:
+        profit_factor = 0.0
+        outlier_adjusted_profit_factor = 0.0
+
+    for i in range(1, len(pnl_tensor)):
+        if pnl_tensor[i-1] > 0:
+            intraday_trade_log.loc[i, 'Continuous_Wins'] = intraday_trade_log.loc[i-1, 'Continuous_Wins']+1
+        if pnl_tensor[i-1] < 0:
+            intraday_trade_log.loc[i, 'Continuous_Losses'] = intraday_trade_log.loc[i-1, 'Continuous_Losses']+1
+
+    return {
+        'Backtest Start Date': intraday_trade_log.iloc[0]['Date'],
+        'Backtest End Date': intraday_trade_log.iloc[-1]['Date'],
+        "Margin Required": initialCapital,
+        'Number of Trading Days': intraday_trade_log.shape[0],
+        'Number of +ve days': number_of_wins,
+        'Number of -ve days': number_of_losses,
+        'Total PnL': round(float(torch.sum(pnl_tensor).numpy()), 2),
+        'Average Profit': round(float(mean_win), 2),
+        'Average Loss': round(mean_loss, 2),
+        'Maximum Trade Profit': round(max_pnl, 2),
+        'Maximum Trade Loss': round(min_pnl, 2),
+        'Median Trade': round(median_of_trade, 2),
+        'Consecutive Wins': intraday_trade_log['Continuous_Wins'].max(),
+        'Consecutive Losses': intraday_trade_log['Continuous_Losses'].max(),
+        'Win Rate': round(float(win_rate), 2),
+        'Expectancy': round(float(expectancy), 2),
+        'Sharpe Ratio': round(float(sharpe_ratio), 2),
+        'Sortino Ratio': round(float(sortino_ratio), 2),
+        'Calmar': round(float(calmar_ratio), 2),
+        'CAGR': round(float(cagr), 2),
+        'Max Drawdown': round(float(max_drawdown), 2),
+        'Max Drawdown Percent': round(float(max_drawdown_percent), 2),
+        'Days Taken to Recover From Drawdown': recovery_days,
+        'Profit Factor (Amount of Profit per unit of Loss)': round(profit_factor, 2),
+        'Outlier Adjusted Profit Factor': round(outlier_adjusted_profit_factor, 2)
+    }
+
+
+def getRandomTradesDf(rng: np.random.Generator) -> tuple:
+    """Random daily P&L series with gaps between trading dates, occasional flat days and an initial capital"""
+
+    days = int(rng.integers(2, 400))
+    startDate = date(2018, 1, 1) + timedelta(days=int(rng.integers(0, 1500)))
+    tradeDates = pd.Timestamp(startDate) + pd.to_timedelta(np.cumsum(rng.integers(1, 5, size=days)), unit="D")
+
+    pnl = np.round(rng.normal(loc=rng.uniform(-500, 800), scale=rng.uniform(100, 20000), size=days), 2)
+    pnl[rng.random(days) < 0.05] = 0
+
+    tradesDf = pd.DataFrame({"entryDate": [__date.date() for __date in tradeDates], "bookedPnL": pnl})
+    initialCapital = float(rng.choice([0, 50000, 250000, 1000000])) if rng.random() < 0.9 else 100000.0
+
+    return tradesDf, initialCapital
+
+
+def isSame(expected, actual, summationTolerance: bool = False) -> bool:
+
+    if pd.isnull(expected) and pd.isnull(actual):
+        return True
+
+    if isinstance(expected, date) or isinstance(actual, date):
+        return expected == actual
+
+    expected, actual = float(expected), float(actual)
+    if math.isinf(expected) or math.isinf(actual):
+        return expected == actual
+
+    if summationTolerance:
+        return math.isclose(expected, actual, rel_tol=1e-9, abs_tol=0.0100001)
+    return expected == actual
+
+
+def main():
+
+    seriesCount = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rng = np.random.default_rng(int(sys.argv[2]) if len(sys.argv) > 2 else 7)
+
+    precisionDifferences, mismatches = 0, 0
+    for __seriesNo in range(seriesCount):
+
+        tradesDf, initialCapital = getRandomTradesDf(rng=rng)
+
+        expected = baselineBacktestStats(tradesDf=tradesDf, initialCapital=initialCapital)
+        actual = Util.getBacktestStats(tradesDf=tradesDf, initialCapital=initialCapital)
+        expected64 = None
+
+        for __metric in expected:
+
+            if isSame(expected[__metric], actual[__metric]):
+                continue
+
+            if expected64 is None:
+                expected64 = baselineBacktestStats(tradesDf=tradesDf, initialCapital=initialCapital, dtype=torch.float64)
+            if isSame(expected64[__metric], actual[__metric], summationTolerance=True):
+                precisionDifferences += 1
+                continue
+
+            mismatches += 1
+            print(f"series {__seriesNo} ({len(tradesDf)} days, capital {initialCapital}) {__metric}: baseline={expected[__metric]} baseline float64={expected64[__metric]} vectorized={actual[__metric]}")
+
+    print("=" * 60)
+    print(f"{seriesCount} series compared, {precisionDifferences} metrics differ from the float32 baseline by precision only, {mismatches} metric mismatches")
+    return mismatches == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
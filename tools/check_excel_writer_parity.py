@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Excel Writer Parity Check
+Writes the same randomized result sheets with Util.writeExcelSheets through DataFrame.to_excel (EXCEL_WRITER "openpyxl")
+and through the streaming write-only writer (EXCEL_WRITER "streaming"), then reports every cell whose value, type or
+number format differs.
+
+Usage: python tools/check_excel_writer_parity.py [rows] [seed]
+"""
+
+import os
+import sys
+import tempfile
+import warnings
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+import pandas as pd
+import openpyxl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Util import Util
+
+warnings.simplefilter("ignore")
+
+
+def getRandomSheets(rows: int, rng: np.random.Generator) -> dict:
+    """Sheets shaped like a result workbook: a stats table of mixed values and transactions with dates, times and missing values"""
+
+    entryDatetimes = pd.Timestamp("2024-01-01 09:15") + pd.to_timedelta(rng.integers(0, 300*24*60, rows), unit="min")
+    pnl = rng.normal(0, 1000, rows).round(2)
+    pnl[rng.random(rows) < 0.05] = np.nan
+    pnl[:2] = [np.inf, -np.inf]
+
+    transactions = pd.DataFrame({
+        "Trade": np.arange(rows), "Strategy": rng.choice(["S1", "S2", None], rows), "Entry Date": entryDatetimes.date, 
+        "Enter On": entryDatetimes.time, "Entry Datetime": entryDatetimes, "Holding": pd.to_timedelta(rng.integers(0, 5*24*60, rows), unit="min"),
+        "Expiry": pd.Series(entryDatetimes.date).where(rng.random(rows) > 0.1), "PnL": pnl, "Lots": rng.integers(1, 10, rows), 
+        "Is Hedge": rng.random(rows) > 0.5, "Remarks": rng.choice(["", "re-entry", "sl hit"], rows)
+    })
+
+    stats = pd.DataFrame({
+        "Particulars": ["Backtest Start Date", "Backtest End Date", "Overall Profit", "Max Drawdown", "Win Rate", "Max Holding", "Last Entry"],
+        "Combined": [date(2024, 1, 1), datetime(2024, 10, 27), 123456.78, -np.inf, np.nan, timedelta(days=2, hours=3), time(15, 20)]
+    })
+
+    return {"Metrics": [(0, stats)], "PORTFOLIO Trans": [(0, transactions)], "Results": [(0, stats), (len(stats)+3, transactions.head(50))]}
+
+
+def getCells(excelFile: str) -> dict:
+    """(sheet, row, column) -> (value, data type, number format) of every non-empty cell"""
+
+    workbook = openpyxl.load_workbook(excelFile)
+    cells = {}
+    for worksheet in workbook.worksheets:
+        for row in worksheet.iter_rows():
+            for cell in row:
+                if cell.value is not None:
+                    cells[(worksheet.title, cell.row, cell.column)] = (cell.value, cell.data_type, cell.number_format)
+    return cells
+
+
+def main():
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = np.random.default_rng(int(sys.argv[2]) if len(sys.argv) > 2 else 7)
+    sheets = getRandomSheets(rows=rows, rng=rng)
+
+    with tempfile.TemporaryDirectory() as tmpFolder:
+
+        expectedFile, actualFile = os.path.join(tmpFolder, "openpyxl.xlsx"), os.path.join(tmpFolder, "streaming.xlsx")
+
+        Util.EXCEL_WRITER = "openpyxl"
+        Util.writeExcelSheets(btResultFile=expectedFile, sheets=sheets)
+        Util.EXCEL_WRITER = "streaming"
+        Util.writeExcelSheets(btResultFile=actualFile, sheets=sheets)
+
+        expected, actual = getCells(expectedFile), getCells(actualFile)
+
+    mismatches = 0
+    for __key in sorted(set(expected) | set(actual)):
+        if expected.get(__key) != actual.get(__key):
+            mismatches += 1
+            if mismatches <= 50:
+                print(f"{__key}: to_excel={expected.get(__key)} streaming={actual.get(__key)}")
+
+    print("=" * 60)
+    print(f"{len(expected)} cells compared, {mismatches} mismatches")
+    return mismatches == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)